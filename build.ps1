@@ -1,5 +1,40 @@
 # characterLive-patch Build Script
 # Use this script to build the exe file with one click
+#
+#   .\build.ps1                       build both profiles and compare their startup
+#   .\build.ps1 -BuildProfile onedir  build one profile only (onefile or onedir)
+
+param(
+    [ValidateSet("both", "onefile", "onedir")]
+    [string]$BuildProfile = "both",
+    # Startup runs per profile; the median is reported
+    [int]$StartupRuns = 3
+)
+
+# Start the exe with --profile-startup and read back the timings it saves
+function Measure-Startup($exePath) {
+    $profileFile = Join-Path (Split-Path $exePath) "logs\startup_profile.json"
+    if (Test-Path $profileFile) {
+        Remove-Item $profileFile
+    }
+    $launched = [DateTimeOffset]::UtcNow.ToUnixTimeMilliseconds() / 1000.0
+    $process = Start-Process -FilePath $exePath -ArgumentList "--profile-startup" -PassThru
+    if (-not $process.WaitForExit(60000)) {
+        $process.Kill()
+        return $null
+    }
+    if (-not (Test-Path $profileFile)) {
+        return $null
+    }
+    $startup = Get-Content $profileFile -Raw | ConvertFrom-Json
+    # "started" is when Python began running the script; a onefile exe unpacks itself before that
+    $unpack = $startup.started - $launched
+    return [PSCustomObject]@{
+        Unpack      = $unpack
+        FirstWindow = $unpack + $startup.marks.'first-window'
+        Ready       = $unpack + $startup.marks.ready
+    }
+}
 
 Write-Host "=================================" -ForegroundColor Cyan
 Write-Host "  characterLive-patch Builder" -ForegroundColor Cyan
@@ -92,17 +127,56 @@ if (Test-Path "dist") {
     Remove-Item -Recurse -Force dist
 }
 
-# Build using build.spec
-Write-Host "Executing build command..." -ForegroundColor Yellow
-pyinstaller build.spec
+# Build using build.spec, once per profile
+$profiles = if ($BuildProfile -eq "both") { @("onefile", "onedir") } else { @($BuildProfile) }
+$executables = @{
+    "onefile" = "dist\characterLive-patch.exe"
+    "onedir"  = "dist\characterLive-patch\characterLive-patch.exe"
+}
+$built = @()
+foreach ($name in $profiles) {
+    Write-Host "Executing build command ($name)..." -ForegroundColor Yellow
+    $env:BUILD_PROFILE = $name
+    pyinstaller build.spec --workpath "build\$name"
+    if (Test-Path $executables[$name]) {
+        $built += $name
+    } else {
+        Write-Host "[ERROR] $name build failed" -ForegroundColor Red
+    }
+}
+Remove-Item Env:\BUILD_PROFILE
 
 Write-Host ""
-if (Test-Path "dist\characterLive-patch.exe") {
+if ($built.Count -eq $profiles.Count) {
     Write-Host "=================================" -ForegroundColor Green
     Write-Host "  [SUCCESS] Build completed!" -ForegroundColor Green
     Write-Host "=================================" -ForegroundColor Green
     Write-Host ""
-    Write-Host "Executable location: dist\characterLive-patch.exe" -ForegroundColor Cyan
+    foreach ($name in $built) {
+        Write-Host "Executable location ($name): $($executables[$name])" -ForegroundColor Cyan
+    }
+    Write-Host ""
+    
+    # Startup numbers: launch to first window and to ready (index and caches loaded)
+    Write-Host "Measuring startup ($StartupRuns run(s) per profile)..." -ForegroundColor Yellow
+    foreach ($name in $built) {
+        $runs = @()
+        for ($i = 0; $i -lt $StartupRuns; $i++) {
+            $run = Measure-Startup (Resolve-Path $executables[$name]).Path
+            if ($run -ne $null) {
+                $runs += $run
+            }
+        }
+        if ($runs.Count -eq 0) {
+            Write-Host "[ERROR] $($name): no startup profile was written" -ForegroundColor Red
+            continue
+        }
+        $median = [Math]::Floor(($runs.Count - 1) / 2)
+        $unpack = ($runs | Sort-Object Unpack)[$median].Unpack
+        $firstWindow = ($runs | Sort-Object FirstWindow)[$median].FirstWindow
+        $ready = ($runs | Sort-Object Ready)[$median].Ready
+        Write-Host ("[OK] {0,-8} unpack {1,6:N0} ms   first window {2,6:N0} ms   ready {3,6:N0} ms" -f $name, ($unpack * 1000), ($firstWindow * 1000), ($ready * 1000)) -ForegroundColor Green
+    }
     Write-Host ""
     
     # Ask to open dist folder
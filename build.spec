@@ -1,5 +1,17 @@
 # -*- mode: python ; coding: utf-8 -*-
 
+import os
+
+# BUILD_PROFILE selects the layout:
+#   onefile  dist\characterLive-patch.exe, one UPX-compressed file that unpacks
+#            its runtime to a temp folder on every launch (default)
+#   onedir   dist\characterLive-patch\characterLive-patch.exe next to its
+#            uncompressed runtime; larger, but starts without unpacking
+build_profile = os.environ.get('BUILD_PROFILE', 'onefile')
+if build_profile not in ('onefile', 'onedir'):
+    raise SystemExit(f"Unknown BUILD_PROFILE {build_profile!r}, expected onefile or onedir")
+onedir = build_profile == 'onedir'
+
 block_cipher = None
 
 a = Analysis(
@@ -20,26 +32,55 @@ a = Analysis(
 
 pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
 
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
-    [],
-    name='characterLive-patch',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    icon='favicon.ico',
-)
-
+if onedir:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        [],
+        exclude_binaries=True,
+        name='characterLive-patch',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=False,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon='favicon.ico',
+    )
+    coll = COLLECT(
+        exe,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        strip=False,
+        upx=False,
+        upx_exclude=[],
+        name='characterLive-patch',
+    )
+else:
+    exe = EXE(
+        pyz,
+        a.scripts,
+        a.binaries,
+        a.zipfiles,
+        a.datas,
+        [],
+        name='characterLive-patch',
+        debug=False,
+        bootloader_ignore_signals=False,
+        strip=False,
+        upx=True,
+        upx_exclude=[],
+        runtime_tmpdir=None,
+        console=False,
+        disable_windowed_traceback=False,
+        argv_emulation=False,
+        target_arch=None,
+        codesign_identity=None,
+        entitlements_file=None,
+        icon='favicon.ico',
+    )
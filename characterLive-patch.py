@@ -3,28 +3,58 @@ characterLive-patch - Utility tool for characterLive project
 Provides various maintenance and management features
 """
 
-import tkinter as tk
-from tkinter import filedialog, scrolledtext, messagebox
-import json
-import os
-import sys
-from pathlib import Path
-import threading
+import time
+
+# Zero point of the startup profile. It is taken before the other imports on
+# purpose, so the profile includes their cost (hence noqa: E402 below).
+STARTED = time.time()
+
+import argparse  # noqa: E402
+import tkinter as tk  # noqa: E402
+from tkinter import filedialog, scrolledtext, messagebox, ttk  # noqa: E402
+import os  # noqa: E402
+
+from characterlive_patch import config as app_config  # noqa: E402
+from characterlive_patch.batch import load_song_names, parse_song_names  # noqa: E402
+from characterlive_patch.copier import DEFAULT_COPY_WORKERS  # noqa: E402
+from characterlive_patch.engine import PatchEngine  # noqa: E402
+from characterlive_patch.formatting import format_bytes, format_duration, format_media  # noqa: E402
+from characterlive_patch.jobs import SHUTDOWN_TIMEOUT, Cancelled, JobScheduler, volume_resources  # noqa: E402
+from characterlive_patch.logpump import LogPump  # noqa: E402
+from characterlive_patch.names import name_key  # noqa: E402
+from characterlive_patch.orphanview import OrphanWindow  # noqa: E402
+from characterlive_patch.preview import PreviewWindow  # noqa: E402
+from characterlive_patch.quarantine import DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_BYTES, PURGE_INTERVAL, PURGE_PAUSE  # noqa: E402
+from characterlive_patch.roots import DEFAULT_SEARCH_ROOTS  # noqa: E402
+from characterlive_patch.startup import StartupProfile  # noqa: E402
+from characterlive_patch.walker import DEFAULT_WORKERS  # noqa: E402
+from characterlive_patch.watcher import FolderWatcher  # noqa: E402
+
+
+# Substring searches for names this short are flagged as matching widely
+SHORT_NAME_LENGTH = 2
+# While typing, whether the name index is stale (a stat per search root) is checked at most this often
+NAME_INDEX_CHECK_INTERVAL = 5.0
 
 
 class CharacterLivePatch:
-    def __init__(self, root):
+    def __init__(self, root, profile=None, profile_startup=False):
         self.root = root
         self.root.title("characterLive-patch")
         self.root.geometry("900x600")
         self.root.resizable(True, True)
         
         # Default path configuration
-        self.default_paths = {
-            'characterlive_path': r'E:\mine\gitspace\characterLive',
-            'singsong_path': r'C:\MiaoMiao\singsong',
-            'sovits_path': r'C:\MiaoMiao\so-vits-svc'
-        }
+        self.default_paths = app_config.DEFAULT_PATHS
+        
+        # Startup marks; with profile_startup they are saved and the window closes once ready
+        self.profile = profile or StartupProfile()
+        self.profile_startup = profile_startup
+        self.startup_job = None
+        
+        # Log records are queued by any thread and drained by the Tk main loop;
+        # the full log is also written to logs/characterLive-patch.log
+        self.log_pump = LogPump(self.root, os.path.join(self.get_app_dir(), "logs", "characterLive-patch.log"))
         
         # Configuration file path
         self.config_file = self.get_config_path()
@@ -32,37 +62,97 @@ class CharacterLivePatch:
         # Load configuration
         self.config = self.load_config()
         
+        # Headless engine; its filename index and caches are stored next to config.json
+        # and read by a job once the window is shown
+        self.engine = PatchEngine(self.get_app_dir(), load=False)
+        self.engine.prometheus = self.config.get('metrics_prometheus', False)
+        self.engine.search_root_config = self.config.get('search_roots', DEFAULT_SEARCH_ROOTS)
+        self.engine.match_tags = self.config.get('match_tags', False)
+        
+        # Operations run as jobs; jobs sharing the filename index or a written volume queue behind each other
+        self.scheduler = JobScheduler(self.config.get('job_limits'))
+        self.watcher = None
+        self.purge_job = None
+        self.name_index_job = None
+        # (paths, filename index generation, time) of the last name index staleness check
+        self.name_index_checked = None
+        
         # Create UI
         self.create_widgets()
         
         # Load saved paths or use defaults
         self.load_saved_paths()
+        
+        # Expired quarantine is purged in the background, first shortly after startup
+        self.root.after(60 * 1000, self.schedule_quarantine_purge)
+        
+        # Closing the window stops running jobs cleanly first
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.refresh_jobs()
+        
+        # Index and cache loading and the config checks wait until the window is on screen
+        self.map_binding = self.root.bind('<Map>', self.on_window_shown, '+')
+    
+    def on_window_shown(self, event):
+        """Once the main window is mapped, start loading the index and caches and checking the configuration"""
+        # Child widgets report their own <Map> through the root's bindings
+        if event.widget is not self.root:
+            return
+        self.root.unbind('<Map>', self.map_binding)
+        self.profile.mark('first-window')
+        self.startup_job = self.scheduler.submit("Load index and caches", self.finish_startup, ['index', 'quarantine'])
+        self.root.after(50, self.wait_for_startup)
+    
+    def finish_startup(self, job):
+        """Read the engine's index and caches, then report configuration problems"""
+        self.engine.load()
+        self.profile.mark('loaded')
+        for warning in app_config.check_config(self.config):
+            self.log_message(f"⚠ Warning: {warning}")
+    
+    def wait_for_startup(self):
+        """Mark startup as ready once loading has finished; when profiling, save the marks and exit"""
+        state = self.startup_job.state
+        if state in ('queued', 'running'):
+            self.root.after(50, self.wait_for_startup)
+            return
+        self.profile.mark('ready')
+        if state == 'failed':
+            # Operations load the index and caches again before they start
+            self.log_message(f"[ERROR] Failed to load index and caches: {self.startup_job.error}")
+        if not self.profile_startup:
+            return
+        self.log_message("Startup profile (time since the script started):")
+        for line in self.profile.report():
+            self.log_message("   " + line)
+        profile_file = os.path.join(self.get_app_dir(), "logs", "startup_profile.json")
+        try:
+            self.profile.save(profile_file)
+            self.log_message(f"Startup profile saved to {profile_file}")
+        except OSError as e:
+            self.log_message(f"[ERROR] Failed to save startup profile: {e}")
+        self.on_close()
+    
+    def get_app_dir(self):
+        """Get application directory"""
+        return app_config.get_app_dir()
     
     def get_config_path(self):
         """Get configuration file path"""
-        if getattr(sys, 'frozen', False):
-            app_dir = os.path.dirname(sys.executable)
-        else:
-            app_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        return os.path.join(app_dir, "config.json")
+        return app_config.get_config_path(self.get_app_dir())
     
     def load_config(self):
         """Load configuration"""
-        if os.path.exists(self.config_file):
-            try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except Exception as e:
-                self.log_message(f"Failed to load config: {e}")
-                return {}
-        return {}
+        try:
+            return app_config.load_config(self.config_file)
+        except Exception as e:
+            self.log_message(f"Failed to load config: {e}")
+            return {}
     
     def save_config(self):
         """Save configuration"""
         try:
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, ensure_ascii=False, indent=4)
+            app_config.save_config(self.config_file, self.config)
             self.log_message("Configuration saved")
         except Exception as e:
             self.log_message(f"Failed to save config: {e}")
@@ -105,10 +195,29 @@ class CharacterLivePatch:
         tk.Label(row4_frame, text="Song name:", width=18, anchor='w').pack(side=tk.LEFT)
         self.songname_entry = tk.Entry(row4_frame)
         self.songname_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        self.songname_entry.bind('<KeyRelease>', lambda e: self.update_match_count())
+        self.match_count_label = tk.Label(row4_frame, text="", width=22, anchor='w', fg='#7f8c8d')
+        self.match_count_label.pack(side=tk.LEFT, padx=(0, 5))
+        tk.Label(row4_frame, text="Jobs:").pack(side=tk.LEFT)
+        self.walk_workers_spinbox = tk.Spinbox(row4_frame, from_=1, to=64, width=3)
+        self.walk_workers_spinbox.pack(side=tk.LEFT, padx=(0, 5))
+        self.staged_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(row4_frame, text="Staged", variable=self.staged_var).pack(side=tk.LEFT, padx=(0, 5))
+        # One setting shown on both rows: tags are used for matching and for transfers
+        self.tags_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(row4_frame, text="Tags", variable=self.tags_var, command=self.on_tags_toggle).pack(side=tk.LEFT, padx=(0, 5))
         self.exact_delete_button = tk.Button(row4_frame, text="Exact Delete", command=lambda: self.on_execute_click(exact=True), bg='#e74c3c', fg='white', font=('Arial', 10, 'bold'))
         self.exact_delete_button.pack(side=tk.LEFT, padx=(0, 5))
         self.execute_button = tk.Button(row4_frame, text="Delete", command=lambda: self.on_execute_click(exact=False), bg='#ff6b6b', fg='white', font=('Arial', 10, 'bold'))
         self.execute_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.preview_button = tk.Button(row4_frame, text="Preview", command=lambda: self.on_preview_click([self.songname_entry.get().strip()], False, self.root))
+        self.preview_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.batch_button = tk.Button(row4_frame, text="Batch...", command=self.open_batch_dialog)
+        self.batch_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.rebuild_index_button = tk.Button(row4_frame, text="Rebuild Index", command=self.on_rebuild_index_click)
+        self.rebuild_index_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.undo_button = tk.Button(row4_frame, text="Undo...", command=self.open_undo_dialog)
+        self.undo_button.pack(side=tk.LEFT, padx=(0, 5))
         
         # Row 5: MP3 transfer function
         row5_frame = tk.Frame(self.root)
@@ -118,10 +227,35 @@ class CharacterLivePatch:
         self.mp3_storage_entry = tk.Entry(row5_frame)
         self.mp3_storage_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
         tk.Button(row5_frame, text="Browse", command=lambda: self.browse_folder(self.mp3_storage_entry)).pack(side=tk.LEFT, padx=(0, 5))
+        self.dedup_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(row5_frame, text="Dedup", variable=self.dedup_var).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Checkbutton(row5_frame, text="Tags", variable=self.tags_var, command=self.on_tags_toggle).pack(side=tk.LEFT, padx=(0, 5))
+        tk.Label(row5_frame, text="Copy jobs:").pack(side=tk.LEFT)
+        self.copy_workers_spinbox = tk.Spinbox(row5_frame, from_=1, to=32, width=3)
+        self.copy_workers_spinbox.pack(side=tk.LEFT, padx=(0, 5))
         self.transfer_button = tk.Button(row5_frame, text="Transfer", command=self.on_transfer_click, bg='#3498db', fg='white', font=('Arial', 10, 'bold'))
         self.transfer_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.orphans_button = tk.Button(row5_frame, text="Orphans...", command=self.on_orphans_click)
+        self.orphans_button.pack(side=tk.LEFT, padx=(0, 5))
+        self.watch_button = tk.Button(row5_frame, text="Watch", command=self.on_watch_click, width=10)
+        self.watch_button.pack(side=tk.LEFT, padx=(0, 5))
+        
+        # Row 6: Job queue
+        jobs_frame = tk.Frame(self.root)
+        jobs_frame.pack(fill=tk.X, **padding)
         
-        # Row 6: Output terminal
+        tk.Label(jobs_frame, text="Jobs:", width=18, anchor='nw').pack(side=tk.LEFT, fill=tk.Y)
+        self.jobs_tree = ttk.Treeview(jobs_frame, columns=('name', 'state', 'progress'), show='headings', height=3)
+        self.jobs_tree.heading('name', text='Job')
+        self.jobs_tree.heading('state', text='State')
+        self.jobs_tree.heading('progress', text='Progress')
+        self.jobs_tree.column('name', width=450)
+        self.jobs_tree.column('state', width=90, stretch=False)
+        self.jobs_tree.column('progress', width=80, stretch=False, anchor='e')
+        self.jobs_tree.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=(0, 5))
+        tk.Button(jobs_frame, text="Cancel", command=self.on_cancel_jobs_click).pack(side=tk.LEFT, anchor='n')
+        
+        # Row 7: Output terminal
         output_frame = tk.Frame(self.root)
         output_frame.pack(fill=tk.BOTH, expand=True, **padding)
         
@@ -138,6 +272,7 @@ class CharacterLivePatch:
             font=('Consolas', 9)
         )
         self.output_text.pack(fill=tk.BOTH, expand=True)
+        self.log_pump.attach(self.output_text)
         
         # Welcome message
         self.log_message("=" * 80)
@@ -164,17 +299,29 @@ class CharacterLivePatch:
         self.sovits_entry.insert(0, path)
         
         # Load MP3 storage path with default
-        default_mp3_path = r'E:\mine\songs-for-mm'
-        path = self.config.get('mp3_storage_path', default_mp3_path)
+        path = self.config.get('mp3_storage_path', self.default_paths['mp3_storage_path'])
         self.mp3_storage_entry.insert(0, path)
+        self.dedup_var.set(self.config.get('transfer_dedup', False))
+        self.staged_var.set(self.config.get('staged_delete', False))
+        self.tags_var.set(self.config.get('match_tags', False))
+        
+        workers = self.config.get('copy_workers', DEFAULT_COPY_WORKERS)
+        self.copy_workers_spinbox.delete(0, tk.END)
+        self.copy_workers_spinbox.insert(0, str(workers))
+        
+        workers = self.config.get('walk_workers', DEFAULT_WORKERS)
+        self.walk_workers_spinbox.delete(0, tk.END)
+        self.walk_workers_spinbox.insert(0, str(workers))
+    
+    def on_tags_toggle(self):
+        """Tags checkbox handler: read MP3/LRC tags from now on and remember the choice"""
+        self.engine.match_tags = self.tags_var.get()
+        self.config['match_tags'] = self.engine.match_tags
+        self.save_config()
     
     def log_message(self, message):
-        """Display message in output area"""
-        self.output_text.config(state='normal')
-        self.output_text.insert(tk.END, message + '\n')
-        self.output_text.see(tk.END)
-        self.output_text.config(state='disabled')
-        self.root.update_idletasks()
+        """Display message in output area (safe to call from worker threads)"""
+        self.log_pump.put(message)
     
     def on_execute_click(self, exact=False):
         """Execute button click handler"""
@@ -195,51 +342,588 @@ class CharacterLivePatch:
         self.config['characterlive_path'] = characterlive_path
         self.config['singsong_path'] = singsong_path
         self.config['sovits_path'] = sovits_path
+        self.config['walk_workers'] = self.get_walk_workers()
+        self.config['staged_delete'] = self.staged_var.get()
         self.save_config()
         
         # Confirm operation
         match_type = "exactly match" if exact else "contain"
         response = messagebox.askyesno(
             "Confirm", 
-            f"Process all files that {match_type} '{song_name}'?\n\nThis action cannot be undone!"
+            f"Process all files that {match_type} '{song_name}'?\n\n{self.delete_confirm_text()}"
         )
         
         if not response:
             self.log_message("Operation cancelled by user")
             return
         
-        # Disable buttons to prevent duplicate clicks
-        self.execute_button.config(state='disabled')
-        self.exact_delete_button.config(state='disabled')
+        workers = self.get_walk_workers()
+        staged = self.staged_var.get()
         
-        # Execute operation in new thread
-        thread = threading.Thread(target=self.process_files, args=(characterlive_path, singsong_path, sovits_path, song_name, exact))
-        thread.daemon = True
-        thread.start()
+        # Queue the operation; it starts once no other job uses the index or writes to the same volumes
+        self.scheduler.submit(
+            f"Delete '{song_name}'",
+            lambda job: self.process_files(characterlive_path, singsong_path, [song_name], exact, workers, sovits_path, staged, job),
+            self.delete_resources([characterlive_path, singsong_path, sovits_path], staged)
+        )
     
-    def on_transfer_click(self):
-        """Handle MP3 transfer button click"""
-        # Get paths
+    def update_match_count(self):
+        """Show how many files the song name in the entry would match, from the name index"""
+        song_name = self.songname_entry.get().strip()
+        paths = (self.characterlive_entry.get().strip(), self.singsong_entry.get().strip(), self.sovits_entry.get().strip())
+        if song_name and self.name_index_check_due(paths):
+            self.name_index_checked = (paths, self.engine.song_index.generation, time.monotonic())
+            if self.engine.name_index_stale(*paths):
+                # Keep showing counts from the old index until the new one is ready
+                self.index_names(*paths)
+        index = self.engine.name_index
+        if not song_name:
+            self.match_count_label.config(text="")
+        elif index is None:
+            self.match_count_label.config(text="Indexing names...", fg='#7f8c8d')
+        else:
+            # Counting stops early for very common names, which then show "N+"
+            contains, contains_all = index.count_within(song_name)
+            exact, exact_all = index.count_within(song_name, exact=True)
+            # Very short names match far more than the song itself
+            wide = (contains > exact or not contains_all) and len(name_key(song_name)) <= SHORT_NAME_LENGTH
+            text = f"{contains}{'' if contains_all else '+'} match(es), {exact}{'' if exact_all else '+'} exact"
+            self.match_count_label.config(text=text, fg='#e74c3c' if wide else '#7f8c8d')
+    
+    def name_index_check_due(self, paths):
+        """Whether to check the name index again: other paths, a changed filename index or an old check"""
+        if self.engine.name_index is None or self.name_index_checked is None:
+            return True
+        checked_paths, generation, checked = self.name_index_checked
+        return (
+            checked_paths != paths or generation != self.engine.song_index.generation
+            or time.monotonic() - checked >= NAME_INDEX_CHECK_INTERVAL
+        )
+    
+    def index_names(self, characterlive_path, singsong_path, sovits_path):
+        """Queue a rebuild of the name index unless one is already pending"""
+        if self.name_index_job is not None and self.name_index_job.state in ('queued', 'running'):
+            return
+        workers = self.get_walk_workers()
+        self.name_index_job = self.scheduler.submit(
+            "Index song names",
+            lambda job: self.collect_names(characterlive_path, singsong_path, sovits_path, workers, job),
+            ['index']
+        )
+        self.root.after(200, self.wait_for_name_index)
+    
+    def wait_for_name_index(self):
+        """Refresh the match count once the name index job has finished"""
+        state = self.name_index_job.state
+        if state in ('queued', 'running'):
+            self.root.after(200, self.wait_for_name_index)
+        elif state == 'done':
+            self.update_match_count()
+    
+    def collect_names(self, characterlive_path, singsong_path, sovits_path, workers=DEFAULT_WORKERS, job=None):
+        """Refresh the filename index and build the name index used for match counts"""
+        for event in self.engine.index_names(characterlive_path, singsong_path, sovits_path, control=job, workers=workers):
+            # Missing roots are already reported by the operations themselves
+            if event['event'] == 'error':
+                self.log_event(event)
+    
+    def get_walk_workers(self):
+        """Get the traversal worker count from the Jobs box"""
+        try:
+            return max(1, int(self.walk_workers_spinbox.get()))
+        except ValueError:
+            return DEFAULT_WORKERS
+    
+    def get_copy_workers(self):
+        """Get the concurrent copy count from the Copy jobs box"""
+        try:
+            return max(1, int(self.copy_workers_spinbox.get()))
+        except ValueError:
+            return DEFAULT_COPY_WORKERS
+    
+    def delete_resources(self, paths, staged):
+        """Resources of a delete job: the index, the volumes it writes to and, when staged, the undo journal"""
+        return ['index'] + (['quarantine'] if staged else []) + volume_resources(paths)
+    
+    def project_volumes(self):
+        """Volume resources of every project and storage path"""
+        return volume_resources([
+            self.characterlive_entry.get().strip(), self.singsong_entry.get().strip(),
+            self.sovits_entry.get().strip(), self.mp3_storage_entry.get().strip(),
+        ])
+    
+    def refresh_jobs(self):
+        """Show the running and queued jobs with their progress, then reschedule"""
+        jobs = self.scheduler.jobs()
+        shown = set(self.jobs_tree.get_children())
+        for position, job in enumerate(jobs):
+            iid = str(job.id)
+            state = job.state
+            progress = ""
+            if state == 'running':
+                if job.cancelled:
+                    state = 'cancelling'
+                progress = "..." if job.fraction is None else f"{job.fraction:.0%}"
+            if iid in shown:
+                self.jobs_tree.item(iid, values=(job.name, state, progress))
+                shown.discard(iid)
+            else:
+                self.jobs_tree.insert('', tk.END, iid=iid, values=(job.name, state, progress))
+            self.jobs_tree.move(iid, '', position)
+        for iid in shown:
+            self.jobs_tree.delete(iid)
+        self.root.after(200, self.refresh_jobs)
+    
+    def on_cancel_jobs_click(self):
+        """Cancel the selected jobs, or every job when none is selected"""
+        jobs = {str(job.id): job for job in self.scheduler.jobs()}
+        selected = [jobs[iid] for iid in self.jobs_tree.selection() if iid in jobs]
+        if not selected:
+            if not jobs or not messagebox.askyesno("Confirm", f"Cancel all {len(jobs)} job(s)?"):
+                return
+            selected = list(jobs.values())
+        for job in selected:
+            self.scheduler.cancel(job)
+        self.log_message(f"Cancelling {len(selected)} job(s)...")
+    
+    def on_close(self):
+        """Window close handler: cancel jobs and wait for them to stop before exiting"""
+        jobs = self.scheduler.jobs()
+        if jobs and not messagebox.askyesno(
+            "Confirm",
+            f"{len(jobs)} job(s) still queued or running.\n\nCancel them and exit? Copies in progress are rolled back."
+        ):
+            return
+        if self.watcher is not None:
+            self.watcher.stop(timeout=0)
+            self.watcher = None
+        self.scheduler.cancel_all()
+        if jobs:
+            self.log_message("Waiting for running jobs to stop...")
+        self.finish_close(time.monotonic() + SHUTDOWN_TIMEOUT)
+    
+    def finish_close(self, deadline):
+        """Destroy the window once no job is running (or the deadline has passed)"""
+        if not self.scheduler.idle() and time.monotonic() < deadline:
+            self.root.after(100, self.finish_close, deadline)
+            return
+        self.engine.quarantine.close()
+        self.log_pump.flush()
+        self.root.destroy()
+    
+    def open_batch_dialog(self):
+        """Open the batch deletion dialog"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Batch delete")
+        dialog.geometry("500x400")
+        dialog.transient(self.root)
+        
+        tk.Label(dialog, text="Song names (one per line, or load a .txt/.csv file):", anchor='w').pack(fill=tk.X, padx=10, pady=(10, 5))
+        names_text = scrolledtext.ScrolledText(dialog, wrap=tk.NONE, height=15, font=('Consolas', 9))
+        names_text.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        button_frame = tk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        def load_file():
+            file_path = filedialog.askopenfilename(
+                parent=dialog,
+                filetypes=[("Song lists", "*.txt *.csv"), ("All files", "*.*")]
+            )
+            if not file_path:
+                return
+            try:
+                names = load_song_names(file_path)
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to load song list: {e}", parent=dialog)
+                return
+            names_text.delete('1.0', tk.END)
+            names_text.insert('1.0', '\n'.join(names))
+        
+        exact_var = tk.BooleanVar(value=True)
+        tk.Button(button_frame, text="Load File", command=load_file).pack(side=tk.LEFT)
+        tk.Checkbutton(button_frame, text="Exact match", variable=exact_var).pack(side=tk.LEFT, padx=(10, 0))
+        
+        def run():
+            song_names = parse_song_names(names_text.get('1.0', tk.END))
+            if self.on_batch_click(song_names, exact_var.get(), dialog):
+                dialog.destroy()
+        
+        def preview():
+            song_names = parse_song_names(names_text.get('1.0', tk.END))
+            if self.on_preview_click(song_names, exact_var.get(), dialog):
+                dialog.destroy()
+        
+        tk.Button(button_frame, text="Delete All", command=run, bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')).pack(side=tk.RIGHT)
+        tk.Button(button_frame, text="Preview", command=preview).pack(side=tk.RIGHT, padx=(0, 5))
+    
+    def on_batch_click(self, song_names, exact, dialog):
+        """Batch delete button click handler, returns True when the job was started"""
+        characterlive_path = self.characterlive_entry.get().strip()
+        singsong_path = self.singsong_entry.get().strip()
+        sovits_path = self.sovits_entry.get().strip()
+        
+        if not song_names:
+            messagebox.showwarning("Warning", "Please enter song names!", parent=dialog)
+            return False
+        
+        if not characterlive_path or not singsong_path or not sovits_path:
+            messagebox.showwarning("Warning", "Please select all project paths!", parent=dialog)
+            return False
+        
+        # Save configuration
+        self.config['characterlive_path'] = characterlive_path
+        self.config['singsong_path'] = singsong_path
+        self.config['sovits_path'] = sovits_path
+        self.config['walk_workers'] = self.get_walk_workers()
+        self.config['staged_delete'] = self.staged_var.get()
+        self.save_config()
+        
+        # Confirm operation
+        match_type = "exactly match" if exact else "contain"
+        response = messagebox.askyesno(
+            "Confirm",
+            f"Process all files that {match_type} any of {len(song_names)} song name(s)?\n\n{self.delete_confirm_text()}",
+            parent=dialog
+        )
+        
+        if not response:
+            self.log_message("Operation cancelled by user")
+            return False
+        
+        workers = self.get_walk_workers()
+        staged = self.staged_var.get()
+        
+        self.scheduler.submit(
+            f"Batch delete ({len(song_names)} song name(s))",
+            lambda job: self.process_files(characterlive_path, singsong_path, song_names, exact, workers, sovits_path, staged, job),
+            self.delete_resources([characterlive_path, singsong_path, sovits_path], staged)
+        )
+        return True
+    
+    def on_preview_click(self, song_names, exact, parent):
+        """Preview button click handler, returns True when the search was started"""
+        characterlive_path = self.characterlive_entry.get().strip()
+        singsong_path = self.singsong_entry.get().strip()
+        sovits_path = self.sovits_entry.get().strip()
+        song_names = [name for name in song_names if name]
+        
+        if not song_names:
+            messagebox.showwarning("Warning", "Please enter song name!", parent=parent)
+            return False
+        
+        if not characterlive_path or not singsong_path or not sovits_path:
+            messagebox.showwarning("Warning", "Please select all project paths!", parent=parent)
+            return False
+        
+        # Save configuration
+        self.config['characterlive_path'] = characterlive_path
+        self.config['singsong_path'] = singsong_path
+        self.config['sovits_path'] = sovits_path
+        self.config['walk_workers'] = self.get_walk_workers()
+        self.save_config()
+        
+        workers = self.get_walk_workers()
+        
+        if len(song_names) == 1:
+            title = f"Preview: '{song_names[0]}'"
+        else:
+            title = f"Preview: {len(song_names)} song name(s)"
+        preview = PreviewWindow(self.root, title, self.on_preview_confirm)
+        
+        # Collect matches without deleting anything; the window picks them up as they arrive
+        preview.control = self.scheduler.submit(
+            title,
+            lambda job: self.collect_preview(preview, characterlive_path, singsong_path, song_names, exact, workers, sovits_path, job),
+            ['index']
+        )
+        return True
+    
+    def collect_preview(self, preview, characterlive_path, singsong_path, song_names, exact, workers, sovits_path=None, job=None):
+        """Run a dry-run search and feed the matches to the preview window"""
+        error = None
+        try:
+            for event in self.engine.delete_songs(characterlive_path, singsong_path, song_names, exact, dry_run=True, sovits_path=sovits_path, control=job, workers=workers):
+                if event['event'] == 'matched':
+                    try:
+                        size = os.path.getsize(event['path'])
+                    except OSError:
+                        size = 0
+                    preview.add(event['root'], event['root_path'], event['path'], event['relative_path'], size)
+                elif event['event'] in ('warning', 'error'):
+                    self.log_event(event)
+        except Cancelled:
+            error = "cancelled"
+            self.log_message("\n[CANCELLED] Preview search cancelled")
+            raise
+        except Exception as e:
+            error = str(e)
+            self.log_message(f"\n[ERROR] Error: {e}")
+        finally:
+            preview.finish(error)
+    
+    def on_preview_confirm(self, matches, window, label="preview selection"):
+        """Delete Selected handler of the preview and orphan windows, returns True when the job was started"""
+        if not matches:
+            messagebox.showwarning("Warning", "No files selected!", parent=window)
+            return False
+        
+        response = messagebox.askyesno(
+            "Confirm",
+            f"Delete the {len(matches)} selected file(s)?\n\n{self.delete_confirm_text()}",
+            parent=window
+        )
+        
+        if not response:
+            self.log_message("Operation cancelled by user")
+            return False
+        
+        staged = self.staged_var.get()
+        selected = [(root_name, root_path, file_path) for root_name, root_path, file_path, relative_path, size in matches]
+        self.scheduler.submit(
+            f"Delete {len(selected)} selected file(s)",
+            lambda job: self.delete_selected_files(selected, label, staged, job),
+            self.delete_resources({root_path for root_name, root_path, file_path in selected}, staged)
+        )
+        return True
+    
+    def delete_selected_files(self, matches, label, staged=False, job=None):
+        """Delete the files confirmed in the preview or orphan window"""
+        try:
+            self.log_message("\n" + "=" * 80)
+            self.log_message(f"Deleting {len(matches)} selected file(s)...")
+            self.log_message("=" * 80)
+            
+            for event in self.engine.delete_files(matches, label, control=job, staged=staged):
+                if event['event'] == 'summary':
+                    self.log_delete_summary(event)
+                else:
+                    self.log_event(event)
+            
+        except Cancelled:
+            self.log_message("\n[CANCELLED] Deletion cancelled; files already processed stay deleted")
+            raise
+        except Exception as e:
+            self.log_message(f"\n[ERROR] Error: {e}")
+            self.log_pump.call(messagebox.showerror, "Error", f"Operation failed: {e}")
+    
+    def delete_confirm_text(self):
+        """Closing line of a delete confirmation, depending on the Staged option"""
+        if self.staged_var.get():
+            return "Files are moved to quarantine and can be restored with Undo..."
+        return "This action cannot be undone!"
+    
+    def open_undo_dialog(self):
+        """Open the dialog listing staged deletes that can be restored"""
+        dialog = tk.Toplevel(self.root)
+        dialog.title("Undo staged delete")
+        dialog.geometry("600x300")
+        dialog.transient(self.root)
+        
+        tk.Label(dialog, text="Quarantined operations (newest first):", anchor='w').pack(fill=tk.X, padx=10, pady=(10, 5))
+        operations_list = tk.Listbox(dialog, font=('Consolas', 9))
+        operations_list.pack(fill=tk.BOTH, expand=True, padx=10)
+        
+        self.engine.load()
+        operations = self.engine.quarantine.list_operations()
+        for op in operations:
+            started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(op['time']))
+            operations_list.insert(tk.END, f"{started}  {op['label']}  ({op['files']} file(s), {format_bytes(op['bytes'])})")
+        if operations:
+            operations_list.selection_set(0)
+        
+        button_frame = tk.Frame(dialog)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        
+        def selected_operation():
+            selection = operations_list.curselection()
+            if not selection:
+                messagebox.showwarning("Warning", "Please select an operation!", parent=dialog)
+                return None
+            return operations[selection[0]]
+        
+        def restore():
+            op = selected_operation()
+            if op is None:
+                return
+            self.scheduler.submit(f"Restore {op['id']}", lambda job: self.restore_operation(op['id']), ['quarantine'] + self.project_volumes())
+            dialog.destroy()
+        
+        def purge():
+            op = selected_operation()
+            if op is None:
+                return
+            if not messagebox.askyesno("Confirm", f"Permanently delete the {op['files']} quarantined file(s)?\n\nThis action cannot be undone!", parent=dialog):
+                return
+            self.scheduler.submit(f"Purge {op['id']}", lambda job: self.purge_quarantine(undo_ids=[op['id']], job=job), ['quarantine'])
+            dialog.destroy()
+        
+        tk.Button(button_frame, text="Restore", command=restore, bg='#2ecc71', fg='white', font=('Arial', 10, 'bold')).pack(side=tk.LEFT)
+        tk.Button(button_frame, text="Purge Now", command=purge).pack(side=tk.LEFT, padx=(5, 0))
+        tk.Button(button_frame, text="Close", command=dialog.destroy).pack(side=tk.RIGHT)
+    
+    def restore_operation(self, undo_id):
+        """Move the files of a staged delete back from quarantine"""
+        try:
+            self.log_message("\n" + "=" * 80)
+            self.log_message(f"Restoring staged delete {undo_id}...")
+            self.log_message("=" * 80)
+            
+            for event in self.engine.restore(undo_id):
+                if event['event'] == 'summary':
+                    self.log_message("\n" + "=" * 80)
+                    self.log_message("Restore completed!")
+                    self.log_message(f"Files restored: {event['restored']}")
+                    if event['failed'] > 0:
+                        self.log_message(f"Failed: {event['failed']}")
+                    self.log_metrics(event['metrics'])
+                    self.log_message("=" * 80)
+                else:
+                    self.log_event(event)
+        except Exception as e:
+            self.log_message(f"\n[ERROR] Error: {e}")
+            self.log_pump.call(messagebox.showerror, "Error", f"Restore failed: {e}")
+    
+    def schedule_quarantine_purge(self):
+        """Queue a purge of expired quarantine and check again later"""
+        max_age_days = self.config.get('quarantine_max_age_days', DEFAULT_MAX_AGE_DAYS)
+        max_bytes = self.config.get('quarantine_max_bytes', DEFAULT_MAX_BYTES)
+        if self.purge_job is None or self.purge_job.state not in ('queued', 'running'):
+            self.purge_job = self.scheduler.submit(
+                "Purge expired quarantine",
+                lambda job: self.purge_quarantine(max_age_days, max_bytes, None, PURGE_PAUSE, job),
+                ['quarantine']
+            )
+        self.root.after(PURGE_INTERVAL * 1000, self.schedule_quarantine_purge)
+    
+    def purge_quarantine(self, max_age_days=None, max_bytes=None, undo_ids=None, pause=0.0, job=None):
+        """Permanently delete quarantined operations (expired ones unless undo_ids is given)"""
+        try:
+            for event in self.engine.purge_quarantine(max_age_days, max_bytes, undo_ids, pause, control=job):
+                if event['event'] == 'summary':
+                    if event['operations']:
+                        self.log_message(f"Quarantine purged: {event['files']} file(s), {format_bytes(event['bytes'])} freed")
+                else:
+                    self.log_event(event)
+        except Cancelled:
+            self.log_message("[CANCELLED] Quarantine purge cancelled")
+            raise
+        except Exception as e:
+            self.log_message(f"[ERROR] Quarantine purge failed: {e}")
+    
+    def on_rebuild_index_click(self):
+        """Rebuild index button click handler"""
+        characterlive_path = self.characterlive_entry.get().strip()
+        singsong_path = self.singsong_entry.get().strip()
+        sovits_path = self.sovits_entry.get().strip()
+        
+        if not characterlive_path or not singsong_path:
+            messagebox.showwarning("Warning", "Please select all project paths!")
+            return
+        
+        workers = self.get_walk_workers()
+        self.scheduler.submit(
+            "Rebuild index",
+            lambda job: self.rebuild_index(characterlive_path, singsong_path, workers, sovits_path, job),
+            ['index']
+        )
+    
+    def rebuild_index(self, characterlive_path, singsong_path, workers=DEFAULT_WORKERS, sovits_path=None, job=None):
+        """Discard the filename index and rebuild it from disk"""
+        try:
+            self.log_message("\n" + "=" * 80)
+            self.log_message("Rebuilding filename index...")
+            self.log_message("=" * 80)
+            
+            for event in self.engine.rebuild_index(characterlive_path, singsong_path, sovits_path, control=job, workers=workers):
+                if event['event'] == 'summary':
+                    for root in event['roots']:
+                        self.log_message(f"📁 Indexed {root['root']}: {root['directories']} director(ies), {root['skipped']} skipped")
+                    self.log_message(f"\nIndex rebuilt: {event['directories']} director(ies)")
+                    self.log_metrics(event['metrics'])
+                    self.log_message("=" * 80)
+                else:
+                    self.log_event(event)
+        except Cancelled:
+            self.log_message("\n[CANCELLED] Index rebuild cancelled")
+            raise
+        except Exception as e:
+            self.log_message(f"\n[ERROR] Error: {e}")
+            self.log_pump.call(messagebox.showerror, "Error", f"Index rebuild failed: {e}")
+    
+    def get_transfer_paths(self):
+        """Validate and save the transfer paths, returning (characterlive_path, mp3_storage_path) or None"""
         characterlive_path = self.characterlive_entry.get().strip()
         mp3_storage_path = self.mp3_storage_entry.get().strip()
         
         if not characterlive_path or not mp3_storage_path:
             messagebox.showwarning("Warning", "Please enter all required paths")
-            return
+            return None
         
         # Validate paths
         if not os.path.exists(characterlive_path):
             messagebox.showerror("Error", f"characterLive path does not exist:\n{characterlive_path}")
-            return
+            return None
         
         if not os.path.exists(mp3_storage_path):
             messagebox.showerror("Error", f"MP3 storage path does not exist:\n{mp3_storage_path}")
-            return
+            return None
         
         # Save configuration
         self.config['characterlive_path'] = characterlive_path
         self.config['mp3_storage_path'] = mp3_storage_path
+        self.config['transfer_dedup'] = self.dedup_var.get()
+        self.config['copy_workers'] = self.get_copy_workers()
         self.save_config()
+        return characterlive_path, mp3_storage_path
+    
+    def on_watch_click(self):
+        """Start or stop watch mode on the MP3 storage folder"""
+        if self.watcher is not None:
+            self.watcher.stop(timeout=0)
+            self.watcher = None
+            self.watch_button.config(text="Watch")
+            self.log_message("Watch mode stopped")
+            return
+        
+        paths = self.get_transfer_paths()
+        if paths is None:
+            return
+        characterlive_path, mp3_storage_path = paths
+        dedup = self.dedup_var.get()
+        copy_workers = self.get_copy_workers()
+        
+        def on_batch(names):
+            self.submit_transfer(f"Auto-transfer {len(names)} new file(s)", characterlive_path, mp3_storage_path, dedup, copy_workers, names)
+        
+        def on_error(e):
+            # Runs on the watcher thread; Tk and self.watcher are only touched from the main loop
+            self.log_pump.call(self.on_watch_error, watcher, e)
+        
+        try:
+            watcher = FolderWatcher(mp3_storage_path, on_batch, on_error=on_error)
+            watcher.start()
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to start watch mode: {e}")
+            return
+        self.watcher = watcher
+        self.watch_button.config(text="Stop Watch")
+        self.log_message(f"Watching {mp3_storage_path} for new MP3/LRC files ({self.watcher.backend})")
+    
+    def on_watch_error(self, watcher, error):
+        """Report a watcher that stopped on an error; runs on the Tk main loop"""
+        self.log_message(f"[ERROR] Watch mode stopped: {error}")
+        # Watch mode may have been stopped or restarted since
+        if self.watcher is watcher:
+            self.watcher = None
+            self.watch_button.config(text="Watch")
+    
+    def on_transfer_click(self):
+        """Handle MP3 transfer button click"""
+        paths = self.get_transfer_paths()
+        if paths is None:
+            return
+        characterlive_path, mp3_storage_path = paths
         
         # Confirm operation
         response = messagebox.askyesno(
@@ -251,229 +935,267 @@ class CharacterLivePatch:
             self.log_message("Transfer cancelled by user")
             return
         
-        # Disable button to prevent duplicate clicks
-        self.transfer_button.config(state='disabled')
+        self.submit_transfer("Transfer MP3/LRC files", characterlive_path, mp3_storage_path, self.dedup_var.get(), self.get_copy_workers())
+    
+    def submit_transfer(self, name, characterlive_path, mp3_storage_path, dedup, copy_workers, only=None):
+        """Queue a transfer; transfers (manual or from watch mode) run one at a time, as they share the transfer journal"""
+        self.scheduler.submit(
+            name,
+            lambda job: self.transfer_mp3_files(characterlive_path, mp3_storage_path, dedup, copy_workers, only, job),
+            ['journal'] + volume_resources([characterlive_path, mp3_storage_path])
+        )
+    
+    def on_orphans_click(self):
+        """Orphans button click handler: analyze all projects and open the report"""
+        characterlive_path = self.characterlive_entry.get().strip()
+        singsong_path = self.singsong_entry.get().strip()
+        mp3_storage_path = self.mp3_storage_entry.get().strip()
+        
+        if not characterlive_path or not singsong_path or not mp3_storage_path:
+            messagebox.showwarning("Warning", "Please select the characterLive, singsong and MP3 storage paths!")
+            return
+        
+        # Save configuration
+        self.config['characterlive_path'] = characterlive_path
+        self.config['singsong_path'] = singsong_path
+        self.config['mp3_storage_path'] = mp3_storage_path
+        self.config['walk_workers'] = self.get_walk_workers()
+        self.save_config()
         
-        # Execute operation in new thread
-        thread = threading.Thread(target=self.transfer_mp3_files, args=(characterlive_path, mp3_storage_path))
-        thread.daemon = True
-        thread.start()
+        workers = self.get_walk_workers()
+        window = OrphanWindow(self.root, "Orphan report", lambda matches, parent: self.on_preview_confirm(matches, parent, "orphans"))
+        window.control = self.scheduler.submit(
+            "Orphan analysis",
+            lambda job: self.collect_orphans(window, characterlive_path, singsong_path, mp3_storage_path, workers, job),
+            ['index']
+        )
     
-    def transfer_mp3_files(self, characterlive_path, mp3_storage_path):
-        """Transfer MP3 and LRC files with extension normalization"""
+    def collect_orphans(self, window, characterlive_path, singsong_path, mp3_storage_path, workers, job=None):
+        """Run the orphan analysis and feed its findings to the report window"""
+        error = None
         try:
-            self.log_message("\n" + "=" * 80)
-            self.log_message(f"Transferring MP3 and LRC files from: {mp3_storage_path}")
-            self.log_message("=" * 80)
-            
-            # Prepare destination directory
-            dest_dir = os.path.join(characterlive_path, "songs", "download")
-            if not os.path.exists(dest_dir):
-                os.makedirs(dest_dir)
-                self.log_message(f"Created destination directory: {dest_dir}")
-            
-            # Get all files from source
-            if not os.path.exists(mp3_storage_path):
-                self.log_message(f"[ERROR] Source path does not exist: {mp3_storage_path}")
-                return
-            
-            source_files = []
-            for file in os.listdir(mp3_storage_path):
-                file_path = os.path.join(mp3_storage_path, file)
-                if os.path.isfile(file_path):
-                    # Only process mp3 and lrc files
-                    ext = os.path.splitext(file)[1].lower()
-                    if ext in ['.mp3', '.lrc']:
-                        source_files.append(file)
-            
-            self.log_message(f"Found {len(source_files)} MP3/LRC file(s) in source directory")
-            
-            # Pre-process: Rename files containing " - " pattern
-            self.log_message("\nChecking for files to rename...")
-            renamed_count = 0
-            for i, file in enumerate(source_files):
-                old_path = os.path.join(mp3_storage_path, file)
-                name, ext = os.path.splitext(file)
-                
-                # Check if filename contains " - " (space-dash-space)
-                if " - " in name:
-                    # Find the last occurrence of " - " and keep only the part after it
-                    last_index = name.rfind(" - ")
-                    new_name = name[last_index + 3:]  # +3 to skip " - "
-                    new_filename = new_name + ext
-                    new_path = os.path.join(mp3_storage_path, new_filename)
-                    
-                    try:
-                        # Rename the file
-                        os.rename(old_path, new_path)
-                        self.log_message(f"[RENAME] {file} -> {new_filename}")
-                        source_files[i] = new_filename  # Update the list with new filename
-                        renamed_count += 1
-                    except Exception as e:
-                        self.log_message(f"[ERROR] Failed to rename {file}: {e}")
-            
-            if renamed_count > 0:
-                self.log_message(f"Renamed {renamed_count} file(s)")
-            else:
-                self.log_message("No files need renaming")
-            self.log_message("")
-            
-            # Get existing files in destination (with normalized extensions)
-            existing_files = {}
-            if os.path.exists(dest_dir):
-                for file in os.listdir(dest_dir):
-                    file_path = os.path.join(dest_dir, file)
-                    if os.path.isfile(file_path):
-                        # Normalize extension to lowercase
-                        name, ext = os.path.splitext(file)
-                        # Store with both name and extension for accurate matching
-                        key = (name.lower(), ext.lower())
-                        existing_files[key] = file
-            
-            self.log_message(f"Found {len(existing_files)} existing file(s) in destination")
-            self.log_message("")
-            
-            # Process each source file
-            total_copied = 0
-            total_skipped = 0
-            total_failed = 0
-            
-            for source_file in source_files:
-                source_path = os.path.join(mp3_storage_path, source_file)
-                
-                # Extract filename without extension and normalize
-                name, ext = os.path.splitext(source_file)
-                normalized_name = name.lower()
-                normalized_ext = ext.lower()
-                
-                # Check if file already exists (case-insensitive name and extension comparison)
-                check_key = (normalized_name, normalized_ext)
-                if check_key in existing_files:
-                    self.log_message(f"[SKIP] {source_file} (already exists as {existing_files[check_key]})")
-                    total_skipped += 1
-                    continue
-                
-                # Prepare destination filename with normalized extension
-                dest_filename = name + normalized_ext
-                dest_path = os.path.join(dest_dir, dest_filename)
-                
-                # Copy file
-                try:
-                    import shutil
-                    shutil.copy2(source_path, dest_path)
-                    self.log_message(f"[OK] Copied: {source_file} -> {dest_filename}")
-                    total_copied += 1
-                except Exception as e:
-                    self.log_message(f"[ERROR] Failed to copy {source_file}: {e}")
-                    total_failed += 1
-            
-            # Summary
-            self.log_message("\n" + "=" * 80)
-            self.log_message("Transfer completed!")
-            self.log_message(f"Files copied: {total_copied}")
-            self.log_message(f"Files skipped (already exist): {total_skipped}")
-            if total_failed > 0:
-                self.log_message(f"Failed: {total_failed}")
-            self.log_message("=" * 80)
-            
+            for event in self.engine.find_orphans(characterlive_path, singsong_path, mp3_storage_path, control=job, workers=workers):
+                if event['event'] == 'orphan':
+                    window.add(event)
+                elif event['event'] == 'summary':
+                    self.log_message("\n" + "=" * 80)
+                    self.log_message(f"Orphan analysis: {event['orphans']} orphan(s), {format_bytes(event['reclaimable'])} reclaimable")
+                    for category, count in event['counts'].items():
+                        self.log_message(f"   {category}: {count} ({format_bytes(event['bytes'][category])})")
+                    self.log_metrics(event['metrics'])
+                    self.log_message("=" * 80)
+                elif event['event'] in ('warning', 'error'):
+                    self.log_event(event)
+        except Cancelled:
+            error = "cancelled"
+            self.log_message("\n[CANCELLED] Orphan analysis cancelled")
+            raise
         except Exception as e:
+            error = str(e)
             self.log_message(f"\n[ERROR] Error: {e}")
-            messagebox.showerror("Error", f"Transfer failed: {e}")
         finally:
-            self.root.after(0, lambda: self.transfer_button.config(state='normal'))
+            window.finish(error)
     
-    def process_files(self, characterlive_path, singsong_path, sovits_path, song_name, exact=False):
-        """Process files matching song name"""
-        try:
-            self.log_message("\n" + "=" * 80)
-            self.log_message(f"Searching for files containing '{song_name}'...")
-            self.log_message("=" * 80)
-            
-            search_dirs = []
-            
-            # characterLive/songs
-            cl_songs = os.path.join(characterlive_path, "songs")
-            if os.path.exists(cl_songs):
-                search_dirs.append(("characterLive/songs", cl_songs))
+    def log_event(self, event, batch=False):
+        """Write an engine event to the output area; batch lists the song names of every match"""
+        kind = event['event']
+        if kind == 'warning':
+            self.log_message(f"⚠ Warning: {event['message']}")
+        elif kind == 'info':
+            self.log_message(event['message'])
+        elif kind == 'root':
+            self.log_message(f"📁 Searching: {event['root']}")
+            self.log_message(f"   Path: {event['path']}")
+        elif kind == 'matched':
+            names = event['song_names']
+            suffix = f"  ({', '.join(names)})" if len(names) > 1 or batch else ""
+            media = format_media(event.get('media', {}))
+            if media:
+                suffix += f"  [{media}]"
+            self.log_message(f"   - [{event['root']}] {event['relative_path']}{suffix}")
+        elif kind == 'deleted':
+            self.log_message(f"     [OK] Processed")
+        elif kind == 'restored':
+            self.log_message(f"[RESTORED] [{event['root']}] {event['path']}")
+        elif kind == 'purged':
+            self.log_message(f"[PURGED] {event['undo_id']}: {event['files']} file(s), {format_bytes(event['bytes'])}")
+        elif kind == 'renamed':
+            self.log_message(f"[RENAME] {event['old_name']} -> {event['new_name']}")
+        elif kind == 'copied':
+            media = format_media(event.get('media', {}))
+            media = f" [{media}]" if media else ""
+            if 'seconds' in event:
+                self.log_message(f"[OK] Copied: {event['file']} -> {event['dest_file']} ({format_bytes(event['bytes'])} in {event['seconds']:.2f}s){media}")
             else:
-                self.log_message(f"⚠ Warning: {cl_songs} does not exist")
-            
-            # singsong/songs
-            ss_songs = os.path.join(singsong_path, "songs")
-            if os.path.exists(ss_songs):
-                search_dirs.append(("singsong/songs", ss_songs))
+                self.log_message(f"[OK] Copied: {event['file']} -> {event['dest_file']}{media}")
+        elif kind == 'progress':
+            self.log_message(
+                f"[PROGRESS] {event['files_done']}/{event['files_total']} file(s), "
+                f"{format_bytes(event['bytes_done'])} / {format_bytes(event['bytes_total'])}, "
+                f"{format_bytes(event['bytes_per_sec'])}/s, ETA {format_duration(event['eta_seconds'])}"
+            )
+        elif kind == 'skipped':
+            if event['reason'] == 'duplicate':
+                self.log_message(f"[DUPLICATE] {event['file']} (same content as {event['existing']})")
+            elif event['reason'] == 'tags':
+                self.log_message(f"[DUPLICATE] {event['file']} (same artist, title and duration as {event['existing']})")
             else:
-                self.log_message(f"⚠ Warning: {ss_songs} does not exist")
-            
-            # singsong/output
-            ss_output = os.path.join(singsong_path, "output")
-            if os.path.exists(ss_output):
-                search_dirs.append(("singsong/output", ss_output))
+                self.log_message(f"[SKIP] {event['file']} (already exists as {event['existing']})")
+        elif kind == 'recovered':
+            self.log_message(f"[RESUME] Interrupted copy of {os.path.basename(event['path'])} cleaned up, copying again")
+        elif kind == 'mismatch':
+            self.log_message(
+                f"⚠ Lyrics run past the end of the song: {event['file']} "
+                f"({format_duration(event['lyrics_seconds'])} lyrics, {format_duration(event['audio_seconds'])} audio)"
+            )
+        elif kind == 'collision':
+            self.log_message(f"[COLLISION] {event['file']} (different content from existing {event['existing']})")
+        elif kind == 'error':
+            if event['action'] == 'delete':
+                self.log_message(f"     [ERROR] Failed: {event['error']}")
+            elif event['action'] in ('copy', 'hash'):
+                self.log_message(f"[ERROR] Failed to copy {event['file']}: {event['error']}")
+            elif event['action'] == 'rename':
+                self.log_message(f"[ERROR] Failed to rename {os.path.basename(event['path'])}: {event['error']}")
+            elif event['action'] == 'save-index':
+                self.log_message(f"Failed to save index: {event['error']}")
+            elif event['action'] == 'save-metadata':
+                self.log_message(f"Failed to save metadata cache: {event['error']}")
+            elif event['action'] == 'save-metrics':
+                self.log_message(f"Failed to save metrics: {event['error']}")
+            elif event['action'] == 'config':
+                self.log_message(f"[ERROR] {event['error']}")
+            elif event['action'] == 'purge':
+                self.log_message(f"[ERROR] Failed to purge {event['undo_id']}: {event['error']}")
             else:
-                self.log_message(f"⚠ Warning: {ss_output} does not exist")
-            
-            total_found = 0
-            total_processed = 0
-            total_failed = 0
+                self.log_message(f"[ERROR] {event.get('path', '')}: {event['error']}")
+    
+    def transfer_mp3_files(self, characterlive_path, mp3_storage_path, dedup=False, copy_workers=DEFAULT_COPY_WORKERS, only=None, job=None):
+        """Transfer MP3 and LRC files with extension normalization (only the named files when only is given)"""
+        try:
+            self.log_message("\n" + "=" * 80)
+            if only is None:
+                self.log_message(f"Transferring MP3 and LRC files from: {mp3_storage_path}")
+            else:
+                self.log_message(f"Auto-transferring {len(only)} new file(s) from: {mp3_storage_path}")
+            self.log_message("=" * 80)
             
-            for dir_name, dir_path in search_dirs:
-                self.log_message(f"\n📁 Searching: {dir_name}")
-                self.log_message(f"   Path: {dir_path}")
-                
-                found_files = []
-                
-                for root, dirs, files in os.walk(dir_path):
-                    for file in files:
-                        # Check match based on exact flag
-                        file_name_without_ext = os.path.splitext(file)[0]
-                        if exact:
-                            # Exact match: filename (without extension) must equal song_name
-                            if file_name_without_ext == song_name:
-                                file_path = os.path.join(root, file)
-                                found_files.append(file_path)
-                        else:
-                            # Partial match: filename must contain song_name
-                            if song_name in file:
-                                file_path = os.path.join(root, file)
-                                found_files.append(file_path)
-                
-                if found_files:
-                    self.log_message(f"   Found {len(found_files)} file(s):")
-                    
-                    for file_path in found_files:
-                        total_found += 1
-                        relative_path = os.path.relpath(file_path, dir_path)
-                        self.log_message(f"   - {relative_path}")
-                        
-                        try:
-                            os.remove(file_path)
-                            total_processed += 1
-                            self.log_message(f"     [OK] Processed")
-                        except Exception as e:
-                            total_failed += 1
-                            self.log_message(f"     [ERROR] Failed: {e}")
+            for event in self.engine.transfer(characterlive_path, mp3_storage_path, dedup=dedup, only=only, control=job, copy_workers=copy_workers):
+                watcher = self.watcher
+                if event['event'] == 'renamed' and watcher is not None:
+                    # The renamed file lands in the watched folder; it must not start another transfer
+                    watcher.ignore(os.path.join(os.path.dirname(event['path']), event['new_name']))
+                if event['event'] == 'summary':
+                    if event['renamed'] == 0:
+                        self.log_message("No files need renaming")
+                    self.log_message("\n" + "=" * 80)
+                    self.log_message("Transfer completed!")
+                    self.log_message(f"Files renamed: {event['renamed']}")
+                    self.log_message(f"Files copied: {event['copied']}")
+                    self.log_message(f"Files skipped (already exist): {event['skipped']}")
+                    self.log_message(f"Files unchanged since last sync: {event['unchanged']}")
+                    if event['recovered'] > 0:
+                        self.log_message(f"Interrupted copies resumed: {event['recovered']}")
+                    if 'duplicates' in event:
+                        self.log_message(f"Duplicates skipped (same content, other name): {event['duplicates']}")
+                        self.log_message(f"Name collisions (different content): {event['collisions']}")
+                    if 'tag_duplicates' in event:
+                        self.log_message(f"Songs skipped (same tags, other name): {event['tag_duplicates']}")
+                        self.log_message(f"Lyrics longer than their song: {event['mismatches']}")
+                    if event['failed'] > 0:
+                        self.log_message(f"Failed: {event['failed']}")
+                    self.log_metrics(event['metrics'])
+                    self.log_message("=" * 80)
                 else:
-                    self.log_message(f"   No files containing '{song_name}' found")
+                    self.log_event(event)
             
+        except Cancelled:
+            self.log_message("\n[CANCELLED] Transfer cancelled; copies in progress were rolled back")
+            raise
+        except Exception as e:
+            self.log_message(f"\n[ERROR] Error: {e}")
+            self.log_pump.call(messagebox.showerror, "Error", f"Transfer failed: {e}")
+    
+    def process_files(self, characterlive_path, singsong_path, song_names, exact=False, workers=DEFAULT_WORKERS, sovits_path=None, staged=False, job=None):
+        """Process files matching any of the song names"""
+        try:
+            batch = len(song_names) > 1
             self.log_message("\n" + "=" * 80)
-            self.log_message("Operation completed!")
-            self.log_message(f"Files found: {total_found}")
-            self.log_message(f"Successfully processed: {total_processed}")
-            if total_failed > 0:
-                self.log_message(f"Failed: {total_failed}")
+            if batch:
+                self.log_message(f"Batch searching for {len(song_names)} song name(s)...")
+            else:
+                self.log_message(f"Searching for files containing '{song_names[0]}'...")
             self.log_message("=" * 80)
             
+            for event in self.engine.delete_songs(characterlive_path, singsong_path, song_names, exact, sovits_path=sovits_path, control=job, workers=workers, staged=staged):
+                if event['event'] == 'summary':
+                    self.log_delete_summary(event, batch)
+                else:
+                    self.log_event(event, batch)
+            
+        except Cancelled:
+            self.log_message("\n[CANCELLED] Deletion cancelled; files already processed stay deleted")
+            raise
         except Exception as e:
             self.log_message(f"\n[ERROR] Error: {e}")
-            messagebox.showerror("Error", f"Operation failed: {e}")
-        finally:
-            self.root.after(0, lambda: self.execute_button.config(state='normal'))
-            self.root.after(0, lambda: self.exact_delete_button.config(state='normal'))
+            self.log_pump.call(messagebox.showerror, "Error", f"Operation failed: {e}")
+    
+    def log_delete_summary(self, event, batch=False):
+        """Write the completion summary of a delete operation, per song name for a batch"""
+        self.log_message("")
+        for root in event['roots']:
+            if root['found']:
+                self.log_message(f"📁 {root['root']}: found {root['found']} file(s)")
+            else:
+                self.log_message(f"📁 {root['root']}: no matching files found")
+            if 'rescanned' in root:
+                self.log_message(f"   Index: {root['rescanned']} rescanned, {root['unchanged']} unchanged, {root['removed']} removed, {root['skipped']} director(ies) skipped")
+        
+        self.log_message("\n" + "=" * 80)
+        self.log_message("Operation completed!")
+        if batch:
+            self.log_message("Per song name (found / processed / failed):")
+            for song in event['songs']:
+                if song['found']:
+                    self.log_message(f"   {song['song_name']}: {song['found']} / {song['processed']} / {song['failed']}")
+                else:
+                    self.log_message(f"   {song['song_name']}: no files found")
+        self.log_message(f"Files found: {event['found']}")
+        self.log_message(f"Successfully processed: {event['processed']}")
+        if event['undo_id']:
+            self.log_message(f"Moved to quarantine, restore with Undo... ({event['undo_id']})")
+        if event['failed'] > 0:
+            self.log_message(f"Failed: {event['failed']}")
+        self.log_metrics(event['metrics'])
+        self.log_message("=" * 80)
+    
+    def log_metrics(self, report):
+        """Write the per-phase timing of an operation"""
+        def describe(values):
+            parts = [f"{values['seconds']:.3f}s"]
+            for name in ('directories', 'skipped', 'files', 'bytes', 'errors'):
+                if values.get(name):
+                    parts.append(format_bytes(values[name]) if name == 'bytes' else f"{values[name]} {name}")
+            return ", ".join(parts)
+        
+        self.log_message(f"Timing (total {report['seconds']:.3f}s):")
+        for phase, values in report['phases'].items():
+            self.log_message(f"   {phase}: {describe(values)}")
+        for root, phases in report['roots'].items():
+            self.log_message(f"   📁 {root}: " + "; ".join(f"{phase} {describe(values)}" for phase, values in phases.items()))
 
 
 def main():
+    parser = argparse.ArgumentParser(prog="characterLive-patch")
+    parser.add_argument('--profile-startup', action='store_true', help="save startup timings to logs/startup_profile.json and exit once ready")
+    # Windowed builds have no console to report usage errors on, so unknown arguments are ignored
+    args, _ = parser.parse_known_args()
+    profile = StartupProfile(STARTED)
+    profile.mark('imports')
     root = tk.Tk()
-    app = CharacterLivePatch(root)
+    profile.mark('tk')
+    app = CharacterLivePatch(root, profile, args.profile_startup)
+    profile.mark('widgets')
     root.mainloop()
 
 
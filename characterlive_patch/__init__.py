@@ -0,0 +1,3 @@
+"""
+characterlive_patch - Core helpers for the characterLive-patch tool
+"""
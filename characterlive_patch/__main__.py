@@ -0,0 +1,207 @@
+"""
+Command-line entry point: python -m characterlive_patch
+
+Runs the same engine as the GUI without a display and prints one JSON
+object per event on stdout.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from .batch import load_song_names
+from .copier import DEFAULT_COPY_WORKERS
+from .config import DEFAULT_PATHS, get_config_path, load_config
+from .engine import PatchEngine
+from .orphans import ORPHAN_CATEGORIES
+from .quarantine import DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_BYTES
+from .roots import DEFAULT_SEARCH_ROOTS
+from .walker import DEFAULT_WORKERS
+from .watcher import DEFAULT_DEBOUNCE, FolderWatcher
+
+
+def build_parser():
+    """Build the argument parser"""
+    # Options shared by every subcommand, so they can follow the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--config', help="config.json to read paths from (default: next to the application)")
+    common.add_argument('--characterlive', help="characterLive project path")
+    common.add_argument('--singsong', help="singsong project path")
+    common.add_argument('--sovits', help="so-vits-svc project path")
+    common.add_argument('--jobs', type=int, help="traversal worker threads (default: walk_workers from config)")
+    common.add_argument('--dry-run', action='store_true', help="report what would change without touching files")
+    common.add_argument('--tags', action='store_true', help="read MP3/LRC tags: match titles, skip songs already transferred under another name, report durations (default: match_tags from config)")
+    common.add_argument('--prometheus', action='store_true', help="also write metrics.prom in the Prometheus text format (default: metrics_prometheus from config)")
+
+    parser = argparse.ArgumentParser(
+        prog="python -m characterlive_patch",
+        description="characterLive-patch command line (JSON-lines output)",
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    delete_parser = subparsers.add_parser('delete', parents=[common], help="delete files matching song names")
+    delete_parser.add_argument('song_names', nargs='*', help="song names to delete")
+    delete_parser.add_argument('--names-file', help="read more song names from a .txt/.csv file")
+    delete_parser.add_argument('--exact', action='store_true', help="file name without extension must equal the song name")
+    delete_parser.add_argument('--staged', action='store_true', help="move files to quarantine so they can be restored (default: staged_delete from config)")
+
+    transfer_options = argparse.ArgumentParser(add_help=False)
+    transfer_options.add_argument('--mp3-storage', help="MP3 storage folder")
+    transfer_options.add_argument('--copy-jobs', type=int, help="concurrent copies (default: copy_workers from config)")
+    transfer_options.add_argument('--dedup', action='store_true', help="also compare file contents to find renamed duplicates and name collisions")
+
+    subparsers.add_parser('transfer', parents=[common, transfer_options], help="transfer MP3/LRC files into characterLive/songs/download")
+
+    watch_parser = subparsers.add_parser('watch', parents=[common, transfer_options], help="transfer new MP3/LRC files as they land (Ctrl+C to stop)")
+    watch_parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE, help="seconds a file must stay unchanged before it is transferred")
+
+    subparsers.add_parser('rebuild-index', parents=[common], help="discard and rebuild the filename index")
+
+    orphans_parser = subparsers.add_parser('orphans', parents=[common], help="find songs left over in one project (largest first)")
+    orphans_parser.add_argument('--mp3-storage', help="MP3 storage folder")
+    orphans_parser.add_argument('--category', action='append', choices=ORPHAN_CATEGORIES, help="only report this category of orphan (repeatable; default: all)")
+    orphans_parser.add_argument('--delete', action='store_true', help="delete the files of every reported orphan")
+    orphans_parser.add_argument('--staged', action='store_true', help="with --delete, move files to quarantine so they can be restored")
+
+    restore_parser = subparsers.add_parser('restore', parents=[common], help="restore a staged delete from quarantine")
+    restore_parser.add_argument('undo_id', nargs='?', help="operation to restore (default: the latest)")
+    restore_parser.add_argument('--list', action='store_true', help="list the operations that can be restored")
+
+    purge_parser = subparsers.add_parser('purge', parents=[common], help="delete quarantined files for good")
+    purge_parser.add_argument('--max-age-days', type=float, help="purge operations older than this (default: quarantine_max_age_days from config)")
+    purge_parser.add_argument('--max-bytes', type=int, help="purge the oldest operations while the quarantine is larger (default: quarantine_max_bytes from config)")
+    purge_parser.add_argument('--all', action='store_true', help="purge every quarantined operation")
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    config_file = args.config or get_config_path()
+    try:
+        config = load_config(config_file)
+    except Exception as e:
+        parser.error(f"failed to load config {config_file}: {e}")
+
+    def setting(value, key):
+        return value or config.get(key, DEFAULT_PATHS.get(key))
+
+    characterlive_path = setting(args.characterlive, 'characterlive_path')
+    singsong_path = setting(args.singsong, 'singsong_path')
+    sovits_path = setting(args.sovits, 'sovits_path')
+    workers = args.jobs or config.get('walk_workers', DEFAULT_WORKERS)
+
+    engine = PatchEngine(os.path.dirname(os.path.abspath(config_file)), workers)
+    engine.prometheus = args.prometheus or config.get('metrics_prometheus', False)
+    engine.search_root_config = config.get('search_roots', DEFAULT_SEARCH_ROOTS)
+    engine.staged_delete = config.get('staged_delete', False)
+    engine.match_tags = args.tags or config.get('match_tags', False)
+
+    if args.command == 'delete':
+        # An empty name would match every file in every root
+        song_names = []
+        for name in args.song_names:
+            name = name.strip()
+            if name and name not in song_names:
+                song_names.append(name)
+        if args.names_file:
+            song_names.extend(name for name in load_song_names(args.names_file) if name not in song_names)
+        if not song_names:
+            parser.error("no song names given")
+        engine.staged_delete = engine.staged_delete or args.staged
+        events = engine.delete_songs(characterlive_path, singsong_path, song_names, args.exact, args.dry_run, sovits_path)
+    elif args.command in ('transfer', 'watch'):
+        mp3_storage_path = setting(args.mp3_storage, 'mp3_storage_path')
+        engine.copy_workers = args.copy_jobs or config.get('copy_workers', DEFAULT_COPY_WORKERS)
+        dedup = args.dedup or config.get('transfer_dedup', False)
+        if args.command == 'watch':
+            return watch(engine, characterlive_path, mp3_storage_path, args.dry_run, dedup, args.debounce)
+        events = engine.transfer(characterlive_path, mp3_storage_path, args.dry_run, dedup)
+    elif args.command == 'orphans':
+        mp3_storage_path = setting(args.mp3_storage, 'mp3_storage_path')
+        engine.staged_delete = engine.staged_delete or args.staged
+        categories = args.category or list(ORPHAN_CATEGORIES)
+        return orphans(engine, characterlive_path, singsong_path, mp3_storage_path, categories, args.delete and not args.dry_run)
+    elif args.command == 'restore':
+        operations = engine.quarantine.list_operations()
+        if args.list:
+            return 1 if write_events({'event': 'quarantined', **op} for op in operations) else 0
+        if args.undo_id is None and not operations:
+            parser.error("nothing to restore")
+        events = engine.restore(args.undo_id or operations[0]['id'])
+    elif args.command == 'purge':
+        if args.all:
+            events = engine.purge_quarantine(undo_ids=[op['id'] for op in engine.quarantine.list_operations()])
+        else:
+            max_age_days = args.max_age_days if args.max_age_days is not None else config.get('quarantine_max_age_days', DEFAULT_MAX_AGE_DAYS)
+            max_bytes = args.max_bytes if args.max_bytes is not None else config.get('quarantine_max_bytes', DEFAULT_MAX_BYTES)
+            events = engine.purge_quarantine(max_age_days, max_bytes)
+    else:
+        events = engine.rebuild_index(characterlive_path, singsong_path, sovits_path)
+
+    return 1 if write_events(events) else 0
+
+
+def write_events(events):
+    """Print events as JSON lines, returning True if any of them was an error"""
+    failed = False
+    for event in events:
+        if event['event'] == 'error':
+            failed = True
+        sys.stdout.write(json.dumps(event, ensure_ascii=False) + '\n')
+        sys.stdout.flush()
+    return failed
+
+
+def orphans(engine, characterlive_path, singsong_path, mp3_storage_path, categories, delete):
+    """Report orphans of the given categories, then delete their files when asked"""
+    # file path -> (root name, root path, file path), so files in several findings are deleted once
+    matches = {}
+
+    def selected(events):
+        for event in events:
+            if event['event'] == 'orphan':
+                if event['category'] not in categories:
+                    continue
+                for file in event['files']:
+                    matches[file['path']] = (file['root'], file['root_path'], file['path'])
+            yield event
+
+    failed = write_events(selected(engine.find_orphans(characterlive_path, singsong_path, mp3_storage_path)))
+    if delete and matches:
+        failed = write_events(engine.delete_files(list(matches.values()), "orphans: " + ", ".join(categories))) or failed
+    return 1 if failed else 0
+
+
+def ignore_renamed(watcher, events):
+    """Pass events through, telling the watcher about files the transfer renamed in its folder"""
+    for event in events:
+        if event['event'] == 'renamed':
+            watcher.ignore(os.path.join(os.path.dirname(event['path']), event['new_name']))
+        yield event
+
+
+def watch(engine, characterlive_path, mp3_storage_path, dry_run, dedup, debounce):
+    """Run watch mode until interrupted"""
+    def on_batch(names):
+        write_events(ignore_renamed(watcher, engine.transfer(characterlive_path, mp3_storage_path, dry_run, dedup, only=names)))
+
+    errors = []
+    watcher = FolderWatcher(mp3_storage_path, on_batch, debounce=debounce, on_error=errors.append)
+    watcher.start()
+    write_events([{'event': 'info', 'message': f"Watching {mp3_storage_path} ({watcher.backend})"}])
+    try:
+        while watcher.thread.is_alive():
+            watcher.thread.join(1.0)
+    except KeyboardInterrupt:
+        watcher.stop()
+    if errors:
+        write_events([{'event': 'error', 'action': 'watch', 'path': mp3_storage_path, 'error': str(errors[0])}])
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
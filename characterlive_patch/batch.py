@@ -0,0 +1,116 @@
+"""
+Matching many song names against file names in a single pass
+"""
+
+import csv
+import io
+import os
+from collections import deque
+
+from .names import name_key, stem_key
+
+
+def parse_song_names(text, csv_format=False):
+    """Parse song names from pasted text or CSV content, keeping order and dropping duplicates"""
+    if csv_format:
+        rows = (row[0] if row else '' for row in csv.reader(io.StringIO(text)))
+    else:
+        rows = text.splitlines()
+
+    names = []
+    seen = set()
+    for row in rows:
+        name = row.strip()
+        if name and name not in seen:
+            seen.add(name)
+            names.append(name)
+    return names
+
+
+def load_song_names(file_path):
+    """Load song names from a .txt (one per line) or .csv (first column) file"""
+    with open(file_path, 'r', encoding='utf-8-sig') as f:
+        text = f.read()
+    csv_format = os.path.splitext(file_path)[1].lower() == '.csv'
+    return parse_song_names(text, csv_format)
+
+
+class AhoCorasick:
+    """Multi-pattern substring matcher"""
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        # Trie stored as parallel lists indexed by state number
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                next_state = self.goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self.goto)
+                    self.goto[state][char] = next_state
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                state = next_state
+            self.output[state].append(index)
+
+        # Breadth-first pass to compute failure links and merge outputs
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0)
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def search(self, text):
+        """Return the set of pattern indices that occur in text"""
+        found = set()
+        goto = self.goto
+        fail = self.fail
+        output = self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+class BatchMatcher:
+    """Resolve which of many song names a file name matches, comparing normalized keys"""
+
+    def __init__(self, song_names, exact=False):
+        self.song_names = list(song_names)
+        self.exact = exact
+        # Song names that fold to the same key are matched together
+        self.names_by_key = {}
+        for name in self.song_names:
+            self.names_by_key.setdefault(name_key(name), []).append(name)
+        self.keys = list(self.names_by_key)
+        self.automaton = None if exact else AhoCorasick(self.keys)
+
+    def match(self, file_name):
+        """Return the song names matched by file_name"""
+        key = name_key(file_name)
+        if self.exact:
+            # Exact match: filename (without extension) must equal a song name
+            return self.names_by_key.get(stem_key(key), [])
+        # Partial match: filename must contain a song name
+        return [name for i in self.automaton.search(key) for name in self.names_by_key[self.keys[i]]]
+
+    def match_title(self, title):
+        """Return the song names matched by a title tag, which has no extension to strip"""
+        key = name_key(title)
+        if self.exact:
+            return self.names_by_key.get(key, [])
+        return [name for i in self.automaton.search(key) for name in self.names_by_key[self.keys[i]]]
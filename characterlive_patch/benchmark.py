@@ -0,0 +1,225 @@
+"""
+Benchmark suite: python -m characterlive_patch.benchmark
+
+Generates synthetic song trees at several scales and times index build,
+the name index and its live match count (per keystroke), exact, substring
+and batch search, delete, the " - " rename pass and transfer (cold and
+unchanged rerun) through the same engine the GUI uses.
+Results are written as JSON and can be compared against a stored baseline
+to flag regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from .engine import PatchEngine
+from .treegen import TreeParams, generate_tree
+
+
+RESULTS_VERSION = 1
+DEFAULT_SCALES = (1000, 10000)
+DEFAULT_THRESHOLD = 0.2
+# Differences below this many seconds are noise, whatever the ratio
+MIN_DELTA_SECONDS = 0.01
+
+
+def run_events(events):
+    """Consume an event stream, returning (seconds, counts per kind, summary event)"""
+    counts = {}
+    summary = None
+    started = time.perf_counter()
+    for event in events:
+        kind = event['event']
+        counts[kind] = counts.get(kind, 0) + 1
+        if kind == 'summary':
+            summary = event
+        elif kind == 'error':
+            raise RuntimeError(f"benchmark operation failed: {event}")
+    return time.perf_counter() - started, counts, summary
+
+
+def run_round(base_dir, params):
+    """Generate one tree and time every operation on it, returning {operation: (seconds, counts)}"""
+    tree = generate_tree(os.path.join(base_dir, "tree"), params)
+    data_dir = os.path.join(base_dir, "data")
+    os.makedirs(data_dir)
+    cl = tree['characterlive_path']
+    ss = tree['singsong_path']
+    songs = tree['songs']
+    # Exact names of 1% of the songs (at least one), spread over the whole tree
+    batch_size = max(1, len(songs) // 100)
+    batch = songs[::len(songs) // batch_size][:batch_size]
+
+    engine = PatchEngine(data_dir)
+    timings = {}
+
+    seconds, counts, _ = run_events(engine.rebuild_index(cl, ss))
+    timings['index_build'] = (seconds, counts)
+
+    seconds, counts, _ = run_events(engine.index_names(cl, ss))
+    timings['name_index'] = (seconds, counts)
+
+    # Type a song name one character at a time, counting matches like the song name entry does
+    typed = songs[len(songs) // 3]
+    started = time.perf_counter()
+    for end in range(1, len(typed) + 1):
+        engine.name_index.count_within(typed[:end])
+        engine.name_index.count_within(typed[:end], exact=True)
+    timings['name_count'] = ((time.perf_counter() - started) / len(typed), {'keystrokes': len(typed)})
+
+    seconds, counts, _ = run_events(engine.delete_songs(cl, ss, [songs[len(songs) // 2]], exact=True, dry_run=True))
+    timings['search_exact'] = (seconds, counts)
+
+    seconds, counts, _ = run_events(engine.delete_songs(cl, ss, ["花"], exact=False, dry_run=True))
+    timings['search_substring'] = (seconds, counts)
+
+    seconds, counts, _ = run_events(engine.delete_songs(cl, ss, batch, exact=True, dry_run=True))
+    timings['search_batch'] = (seconds, counts)
+
+    seconds, counts, _ = run_events(engine.delete_songs(cl, ss, batch, exact=True))
+    timings['delete'] = (seconds, counts)
+
+    seconds, counts, summary = run_events(engine.transfer(cl, tree['mp3_storage_path']))
+    timings['transfer'] = (seconds, counts)
+    rename = summary['metrics']['phases'].get('rename', {'seconds': 0.0})
+    timings['rename'] = (rename['seconds'], {'renamed': rename.get('files', 0)})
+
+    seconds, counts, _ = run_events(engine.transfer(cl, tree['mp3_storage_path']))
+    timings['transfer_unchanged'] = (seconds, counts)
+
+    return tree, timings
+
+
+def run_benchmarks(scales, params, repeat=3, work_dir=None, log=lambda message: None):
+    """Run every operation repeat times at each scale and summarize the timings"""
+    results = {}
+    trees = {}
+    for scale in scales:
+        scale_params = TreeParams(**dict(params.as_dict(), files=scale))
+        runs = {}
+        for round_number in range(repeat):
+            base_dir = tempfile.mkdtemp(prefix=f"clpatch-bench-{scale}-", dir=work_dir)
+            try:
+                tree, timings = run_round(base_dir, scale_params)
+            finally:
+                shutil.rmtree(base_dir, ignore_errors=True)
+            trees[scale] = {'files': tree['files'], 'bytes': tree['bytes']}
+            for operation, (seconds, counts) in timings.items():
+                runs.setdefault(operation, []).append((seconds, counts))
+            log(f"scale {scale}: round {round_number + 1}/{repeat} done")
+        for operation, samples in runs.items():
+            seconds = [sample[0] for sample in samples]
+            results[f"{operation}@{scale}"] = {
+                'operation': operation,
+                'scale': scale,
+                'seconds_min': min(seconds),
+                'seconds_median': statistics.median(seconds),
+                'runs': len(seconds),
+                'counts': samples[-1][1],
+            }
+    return {
+        'version': RESULTS_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': params.as_dict(),
+        'trees': {str(scale): tree for scale, tree in trees.items()},
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Compare best times against a baseline, returning one row per shared benchmark"""
+    rows = []
+    for key, result in results['results'].items():
+        base = baseline.get('results', {}).get(key)
+        if base is None:
+            continue
+        current = result['seconds_min']
+        previous = base['seconds_min']
+        ratio = current / previous if previous > 0 else float('inf')
+        regressed = current > previous * (1 + threshold) and current - previous > MIN_DELTA_SECONDS
+        rows.append({'benchmark': key, 'baseline': previous, 'current': current, 'ratio': ratio, 'regressed': regressed})
+    return rows
+
+
+def format_table(results, comparison=None):
+    """Render results (and an optional comparison) as text lines"""
+    by_key = {row['benchmark']: row for row in comparison or []}
+    lines = [f"{'benchmark':<28} {'min (s)':>10} {'median (s)':>11} {'baseline':>10} {'ratio':>7}"]
+    for key, result in results['results'].items():
+        line = f"{key:<28} {result['seconds_min']:>10.4f} {result['seconds_median']:>11.4f}"
+        row = by_key.get(key)
+        if row is not None:
+            line += f" {row['baseline']:>10.4f} {row['ratio']:>6.2f}x"
+            if row['regressed']:
+                line += "  REGRESSION"
+        lines.append(line)
+    return lines
+
+
+def build_parser():
+    """Build the argument parser"""
+    defaults = TreeParams()
+    parser = argparse.ArgumentParser(
+        prog="python -m characterlive_patch.benchmark",
+        description="Time search, delete, rename and transfer on synthetic song trees",
+    )
+    parser.add_argument('--scales', type=int, nargs='+', default=list(DEFAULT_SCALES), help="total file counts to benchmark")
+    parser.add_argument('--depth', type=int, default=defaults.depth, help="maximum folder depth under the song roots")
+    parser.add_argument('--fanout', type=int, default=defaults.fanout, help="folders per level")
+    parser.add_argument('--cjk-ratio', type=float, default=defaults.cjk_ratio, help="share of CJK song names")
+    parser.add_argument('--artist-ratio', type=float, default=defaults.artist_ratio, help="share of MP3 storage files with an \"Artist - \" prefix")
+    parser.add_argument('--min-size', type=int, default=defaults.min_size, help="smallest file size in bytes")
+    parser.add_argument('--max-size', type=int, default=defaults.max_size, help="largest file size in bytes")
+    parser.add_argument('--seed', type=int, default=defaults.seed, help="random seed for the generated trees")
+    parser.add_argument('--repeat', type=int, default=3, help="rounds per scale; the best and median time are reported")
+    parser.add_argument('--work-dir', help="where to generate trees (default: system temp folder)")
+    parser.add_argument('--output', help="write results JSON here (default: stdout)")
+    parser.add_argument('--baseline', help="baseline results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help="slowdown ratio counted as a regression (0.2 = 20%%)")
+    parser.add_argument('--save-baseline', help="also write the results as a new baseline file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    params = TreeParams(
+        depth=args.depth, fanout=args.fanout, cjk_ratio=args.cjk_ratio, artist_ratio=args.artist_ratio,
+        min_size=args.min_size, max_size=args.max_size, seed=args.seed
+    )
+    log = lambda message: sys.stderr.write(message + '\n')
+    results = run_benchmarks(args.scales, params, max(1, args.repeat), args.work_dir, log)
+
+    comparison = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        comparison = compare(results, baseline, args.threshold)
+        results['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'rows': comparison}
+
+    for line in format_table(results, comparison):
+        log(line)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        sys.stdout.write(text + '\n')
+    if args.save_baseline:
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+
+    return 1 if comparison and any(row['regressed'] for row in comparison) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+"""
+Application directory and config.json handling shared by the GUI and the CLI
+"""
+
+import json
+import os
+import sys
+
+from .roots import DEFAULT_SEARCH_ROOTS, resolve_search_roots
+
+
+# Default path configuration
+DEFAULT_PATHS = {
+    'characterlive_path': r'E:\mine\gitspace\characterLive',
+    'singsong_path': r'C:\MiaoMiao\singsong',
+    'sovits_path': r'C:\MiaoMiao\so-vits-svc',
+    'mp3_storage_path': r'E:\mine\songs-for-mm',
+}
+
+# Settings that must be positive integers
+INTEGER_SETTINGS = ('walk_workers', 'copy_workers')
+
+
+def get_app_dir():
+    """Get application directory (next to the exe when frozen, else the project folder)"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def get_config_path(app_dir=None):
+    """Get configuration file path"""
+    return os.path.join(app_dir or get_app_dir(), "config.json")
+
+
+def load_config(config_file):
+    """Load configuration, returning an empty dict when the file does not exist"""
+    if not os.path.exists(config_file):
+        return {}
+    with open(config_file, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_config(config_file, config):
+    """Save configuration"""
+    with open(config_file, 'w', encoding='utf-8') as f:
+        json.dump(config, f, ensure_ascii=False, indent=4)
+
+
+def check_config(config):
+    """Warnings for settings that are malformed or name folders that do not exist
+
+    Slow on unreachable network drives, so the GUI runs it after its window
+    is shown rather than while starting up.
+    """
+    warnings = []
+    for key in INTEGER_SETTINGS:
+        value = config.get(key)
+        if value is not None and (not isinstance(value, int) or value < 1):
+            warnings.append(f"{key} must be a positive integer, got {value!r}")
+    limits = config.get('job_limits')
+    if limits is not None and (not isinstance(limits, dict) or not all(
+        isinstance(limit, int) and limit >= 1 for limit in limits.values()
+    )):
+        warnings.append(f"job_limits must map resource kinds to positive integers, got {limits!r}")
+    paths = {key: config.get(key, default) for key, default in DEFAULT_PATHS.items()}
+    for key, path in paths.items():
+        if path and not os.path.isdir(path):
+            warnings.append(f"{key} {path} does not exist")
+    try:
+        resolve_search_roots(config.get('search_roots', DEFAULT_SEARCH_ROOTS), paths)
+    except ValueError as e:
+        warnings.append(f"Invalid search_roots: {e}")
+    return warnings
@@ -0,0 +1,199 @@
+"""
+Concurrent copy engine for Transfer
+
+Files are copied on a bounded thread pool. Each copy uses kernel-side
+copying (os.copy_file_range, then os.sendfile) where the platform offers
+it and falls back to a large reusable buffer otherwise. Data is written
+to a temporary file in the destination folder and atomically renamed into
+place, so an interrupted copy never leaves a truncated file under the
+final name.
+"""
+
+import os
+import queue
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .jobs import Cancelled, JobControl
+
+
+DEFAULT_COPY_WORKERS = 4
+BUFFER_SIZE = 8 * 1024 * 1024
+KERNEL_CHUNK_SIZE = 64 * 1024 * 1024
+PROGRESS_INTERVAL = 0.5
+TEMP_SUFFIX = '.clpatch-part'
+
+
+def temp_path_for(dest_path):
+    """Get the temporary file a copy to dest_path is written to"""
+    dest_dir, dest_name = os.path.split(dest_path)
+    return os.path.join(dest_dir, f".{dest_name}{TEMP_SUFFIX}")
+
+
+def copy_kernel(src_fd, dst_fd, size, on_bytes):
+    """Copy with os.copy_file_range or os.sendfile; returns False if neither is usable"""
+    for copy_func in (getattr(os, 'copy_file_range', None), getattr(os, 'sendfile', None)):
+        if copy_func is None:
+            continue
+        offset = 0
+        try:
+            while offset < size:
+                if copy_func is os.sendfile:
+                    sent = os.sendfile(dst_fd, src_fd, offset, min(KERNEL_CHUNK_SIZE, size - offset))
+                else:
+                    sent = copy_func(src_fd, dst_fd, min(KERNEL_CHUNK_SIZE, size - offset), offset, offset)
+                if sent == 0:
+                    break
+                offset += sent
+                on_bytes(sent)
+        except OSError:
+            if offset:
+                raise
+            # Not supported for this pair of files (e.g. cross-device); try the next method
+            continue
+        if offset == size:
+            return True
+        raise OSError(f"short copy: {offset} of {size} bytes")
+    return False
+
+
+def copy_buffered(src_file, dst_file, on_bytes):
+    """Copy through a large reusable buffer"""
+    buffer = bytearray(BUFFER_SIZE)
+    view = memoryview(buffer)
+    while True:
+        read = src_file.readinto(buffer)
+        if not read:
+            break
+        dst_file.write(view[:read])
+        on_bytes(read)
+
+
+def copy_file_atomic(src_path, dest_path, on_bytes=lambda n: None):
+    """Copy a file with its metadata to dest_path via a temp file and atomic rename"""
+    temp_path = temp_path_for(dest_path)
+    try:
+        with open(src_path, 'rb') as src_file, open(temp_path, 'wb') as dst_file:
+            size = os.fstat(src_file.fileno()).st_size
+            if not copy_kernel(src_file.fileno(), dst_file.fileno(), size, on_bytes):
+                copy_buffered(src_file, dst_file, on_bytes)
+        shutil.copystat(src_path, temp_path)
+        os.replace(temp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class CopyEngine:
+    """Run many file copies concurrently and report throughput"""
+
+    def __init__(self, workers=DEFAULT_COPY_WORKERS):
+        self.workers = max(1, int(workers))
+
+    def run(self, jobs, journal=None, control=None):
+        """Copy (source_path, dest_path, payload) jobs, yielding progress and per-file results
+
+        When a journal is given, every copy is recorded with journal.begin()
+        before its first byte is written and journal.end() once its temp
+        file is either renamed into place or removed.
+
+        Yields ('progress', stats) every PROGRESS_INTERVAL seconds, where stats
+        has bytes_done, bytes_total, files_done, files_total, bytes_per_sec and
+        eta_seconds; ('done', job, seconds) for each finished copy and
+        ('failed', job, error) for each failed one.
+
+        control.check() runs between chunks of every copy: once the job is
+        cancelled, copies in flight remove their temp files, the rest are
+        not started, and Cancelled is raised after the pool has drained.
+        Closing the generator early (Ctrl+C, a consumer that stops
+        iterating) stops the copies the same way.
+        """
+        if control is None:
+            control = JobControl()
+        # Cancelled when the generator is left, whether or not the job was
+        stop = JobControl()
+
+        def check():
+            control.check()
+            stop.check()
+
+        jobs = list(jobs)
+        sizes = []
+        for source_path, dest_path, payload in jobs:
+            try:
+                sizes.append(os.path.getsize(source_path))
+            except OSError:
+                sizes.append(0)
+        bytes_total = sum(sizes)
+        results = queue.Queue()
+        lock = threading.Lock()
+        bytes_done = [0]
+
+        def on_bytes(count):
+            with lock:
+                bytes_done[0] += count
+            check()
+
+        def task(job):
+            source_path, dest_path, payload = job
+            started = time.perf_counter()
+            journal_id = None
+            try:
+                check()
+                journal_id = journal.begin(source_path, dest_path, temp_path_for(dest_path)) if journal else None
+                copy_file_atomic(source_path, dest_path, on_bytes)
+                if journal:
+                    journal.end(journal_id)
+            except Exception as e:
+                if journal_id is not None:
+                    journal.end(journal_id)
+                results.put(('cancelled', job, None) if isinstance(e, Cancelled) else ('failed', job, e))
+            else:
+                results.put(('done', job, time.perf_counter() - started))
+
+        started = time.perf_counter()
+        last_progress = started
+        files_done = 0
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='copier') as executor:
+            try:
+                for job in jobs:
+                    executor.submit(task, job)
+                while files_done < len(jobs):
+                    try:
+                        result = results.get(timeout=PROGRESS_INTERVAL)
+                    except queue.Empty:
+                        result = None
+                    if result is not None:
+                        files_done += 1
+                        if result[0] != 'cancelled':
+                            yield result
+                    now = time.perf_counter()
+                    if now - last_progress >= PROGRESS_INTERVAL or files_done == len(jobs):
+                        last_progress = now
+                        yield ('progress', self.progress_stats(bytes_done[0], bytes_total, files_done, len(jobs), now - started))
+            finally:
+                # Queued copies return at once and copies in flight stop at their
+                # next chunk, so leaving the pool does not wait for every copy
+                stop.cancel()
+        control.check()
+
+    @staticmethod
+    def progress_stats(bytes_done, bytes_total, files_done, files_total, elapsed):
+        """Build a throughput snapshot"""
+        bytes_per_sec = bytes_done / elapsed if elapsed > 0 else 0.0
+        remaining = max(0, bytes_total - bytes_done)
+        eta_seconds = remaining / bytes_per_sec if bytes_per_sec > 0 else None
+        return {
+            'bytes_done': bytes_done,
+            'bytes_total': bytes_total,
+            'files_done': files_done,
+            'files_total': files_total,
+            'bytes_per_sec': bytes_per_sec,
+            'eta_seconds': eta_seconds,
+            'elapsed_seconds': elapsed,
+        }
@@ -0,0 +1,920 @@
+"""
+UI-free search, delete, rename and transfer engine
+
+Every operation is a generator of event dicts. Each event has an 'event'
+key naming its kind (warning, root, matched, deleted, renamed, copied,
+skipped, collision, mismatch, progress, recovered, restored, purged,
+orphan, error, info, summary) plus kind specific fields, so the same stream can drive the Tk
+window, the command line or a benchmark.
+
+Long operations take an optional JobControl: they raise Cancelled from
+their walk and copy loops once it is cancelled, and keep its progress
+fraction up to date.
+
+PatchEngine(load=False) leaves the index and caches on disk until load()
+is called, so the GUI can show its window first; every operation calls
+load() before it starts.
+"""
+
+import itertools
+import os
+import threading
+import time
+
+from .batch import BatchMatcher
+from .copier import DEFAULT_COPY_WORKERS, CopyEngine
+from .hashcache import HashCache
+from .manifest import SyncManifest, TransferJournal
+from .mediainfo import MEDIA_EXTENSIONS, MetadataCache, lyrics_overrun, tag_key
+from .index import SongIndex, song_name_matcher
+from .jobs import JobControl
+from .metrics import Metrics, MetricsStore
+from .names import NameIndex, fold_name
+from .orphans import DOWNLOAD, MP3_STORAGE, ORPHAN_CATEGORIES, SINGSONG_OUTPUT, SINGSONG_SONGS, analyze
+from .quarantine import DEFAULT_MAX_AGE_DAYS, DEFAULT_MAX_BYTES, Quarantine
+from .roots import DEFAULT_SEARCH_ROOTS, RootRules, resolve_search_roots
+from .walker import DEFAULT_WORKERS, ParallelWalker
+
+
+TRANSFER_EXTENSIONS = ('.mp3', '.lrc')
+# MP3s with the same artist and title whose durations differ by less than this are the same song
+TAG_DURATION_TOLERANCE = 2.0
+# Match result of MP3/LRC files whose tags are checked once the walk is done
+CHECK_TAGS = object()
+
+
+def make_event(kind, **fields):
+    """Build an event dict"""
+    event = {'event': kind}
+    event.update(fields)
+    return event
+
+
+class PatchEngine:
+    """Headless implementation of the characterLive-patch operations"""
+
+    def __init__(self, data_dir, workers=DEFAULT_WORKERS, copy_workers=DEFAULT_COPY_WORKERS, load=True):
+        # Index and caches are kept in data_dir, next to config.json
+        self.data_dir = data_dir
+        self.song_index = SongIndex(os.path.join(data_dir, "song_index.json"))
+        # Normalized names of the searchable files for live match counts, built by index_names()
+        self.name_index = None
+        self.hash_cache = HashCache(os.path.join(data_dir, "hash_cache.json"))
+        self.metadata = MetadataCache(os.path.join(data_dir, "metadata_cache.json"))
+        self.manifest = SyncManifest(os.path.join(data_dir, "sync_manifest.json"))
+        self.journal = TransferJournal(os.path.join(data_dir, "transfer_journal.jsonl"))
+        self.quarantine = Quarantine(os.path.join(data_dir, "quarantine_journal.jsonl"))
+        # The files above are read by load(), on the first operation at the latest
+        self.load_lock = threading.Lock()
+        self.loaded = False
+        if load:
+            self.load()
+        self.metrics_store = MetricsStore(os.path.join(data_dir, "metrics.json"), os.path.join(data_dir, "metrics.prom"))
+        # Defaults for operations not given their own workers, copy_workers or
+        # staged argument; callers running operations concurrently pass those instead
+        self.workers = workers
+        self.copy_workers = copy_workers
+        # search_roots entries from config.json
+        self.search_root_config = DEFAULT_SEARCH_ROOTS
+        # Move deleted files to quarantine so they can be restored
+        self.staged_delete = False
+        # Also write metrics.prom (Prometheus text format) after every run
+        self.prometheus = False
+        # Read MP3/LRC tags: match song names against titles, skip transfers of
+        # songs the destination already has under another name, report durations
+        self.match_tags = False
+
+    def load(self):
+        """Read the filename index, caches and quarantine journal, once; returns whether this call read them"""
+        with self.load_lock:
+            if self.loaded:
+                return False
+            self.song_index.load()
+            self.hash_cache.load()
+            self.metadata.load()
+            self.manifest.load()
+            self.quarantine.load()
+            self.loaded = True
+            return True
+
+    def search_roots(self, characterlive_path, singsong_path, sovits_path=None):
+        """Yield warnings for missing roots and return the existing ones as (name, path, rules) triples"""
+        project_paths = {
+            'characterlive_path': characterlive_path,
+            'singsong_path': singsong_path,
+            'sovits_path': sovits_path,
+        }
+        try:
+            candidates = resolve_search_roots(self.search_root_config, project_paths)
+        except ValueError as e:
+            yield make_event('error', action='config', error=f"Invalid search_roots: {e}")
+            return []
+        search_dirs = []
+        for dir_name, dir_path, rules in candidates:
+            if os.path.exists(dir_path):
+                search_dirs.append((dir_name, dir_path, rules))
+            else:
+                yield make_event('warning', message=f"{dir_path} does not exist")
+        return search_dirs
+
+    def save_index(self):
+        """Persist the filename index, returning an error message on failure"""
+        try:
+            self.song_index.save()
+        except Exception as e:
+            return str(e)
+        return None
+
+    def save_hash_cache(self):
+        """Persist the content hash cache, returning an error message on failure"""
+        try:
+            self.hash_cache.save()
+        except Exception as e:
+            return str(e)
+        return None
+
+    def save_metadata(self):
+        """Persist the MP3/LRC metadata cache, returning an error message on failure"""
+        try:
+            self.metadata.save()
+        except Exception as e:
+            return str(e)
+        return None
+
+    def finish_metrics(self, metrics):
+        """Store the metrics of a finished run, returning (report, error message or None)"""
+        report = metrics.report()
+        try:
+            self.metrics_store.append(report, self.prometheus)
+        except Exception as e:
+            return report, str(e)
+        return report, None
+
+    def remove_file(self, undo_id, dir_name, dir_path, file_path):
+        """Delete a matched file, or move it to quarantine when undo_id is set"""
+        if undo_id is None:
+            os.remove(file_path)
+        else:
+            self.quarantine.stage(undo_id, dir_name, dir_path, file_path)
+        self.song_index.discard(dir_path, file_path)
+
+    def delete_songs(self, characterlive_path, singsong_path, song_names, exact=False, dry_run=False, sovits_path=None, control=None, workers=None, staged=None):
+        """Find and delete files matching any of the song names in one pass over all roots
+
+        With staged (default: staged_delete) set, files are moved to
+        quarantine instead and the summary carries the undo_id that
+        restore() takes. With match_tags set, MP3/LRC files whose title tag
+        (or "artist - title") matches are found too, and 'matched' events
+        carry their metadata. workers defaults to the engine's.
+        """
+        self.load()
+        if workers is None:
+            workers = self.workers
+        if staged is None:
+            staged = self.staged_delete
+        undo_id = None
+        try:
+            search_dirs = yield from self.search_roots(characterlive_path, singsong_path, sovits_path)
+            root_names = {dir_path: dir_name for dir_name, dir_path, rules in search_dirs}
+            root_rules = {dir_path: rules for dir_name, dir_path, rules in search_dirs}
+            for dir_name, dir_path, rules in search_dirs:
+                yield make_event('root', root=dir_name, path=dir_path)
+            metrics = Metrics('delete-dry-run' if dry_run else 'delete')
+            metrics.label_roots(root_names)
+
+            if len(song_names) == 1:
+                single_match = song_name_matcher(song_names[0], exact)
+                match = lambda file: song_names if single_match(file) else None
+            else:
+                match = BatchMatcher(song_names, exact).match
+            tag_files = []
+            if self.match_tags:
+                name_match = match
+
+                def match(file):
+                    return name_match(file) or (CHECK_TAGS if os.path.splitext(file)[1].lower() in MEDIA_EXTENSIONS else None)
+
+            found = {name: 0 for name in song_names}
+            processed = {name: 0 for name in song_names}
+            failed = {name: 0 for name in song_names}
+            found_per_root = {dir_name: 0 for dir_name in root_names.values()}
+            total_found = 0
+            total_processed = 0
+            total_failed = 0
+            staged = staged and not dry_run
+            remove_phase = 'quarantine' if staged else 'remove'
+
+            # All roots are walked concurrently and matches are handled as they stream in
+            walker = ParallelWalker(workers)
+            name_matches = self.song_index.iter_matches(list(root_names), match, walker, metrics, root_rules, control)
+            tag_matches = self.match_tag_files(tag_files, song_names, exact, metrics, control, workers)
+            for dir_path, file_path, names in itertools.chain(name_matches, tag_matches):
+                if names is CHECK_TAGS:
+                    tag_files.append((dir_path, file_path))
+                    continue
+                dir_name = root_names[dir_path]
+                total_found += 1
+                found_per_root[dir_name] += 1
+                for name in names:
+                    found[name] += 1
+                event = make_event(
+                    'matched', root=dir_name, root_path=dir_path, path=file_path,
+                    relative_path=os.path.relpath(file_path, dir_path), song_names=list(names)
+                )
+                if self.match_tags and os.path.splitext(file_path)[1].lower() in MEDIA_EXTENSIONS:
+                    try:
+                        event['media'] = self.metadata.get(file_path)
+                    except (OSError, ValueError):
+                        pass
+                yield event
+                if dry_run:
+                    continue
+
+                if staged and undo_id is None:
+                    undo_id = self.quarantine.begin(', '.join(song_names))
+                started = time.perf_counter()
+                try:
+                    self.remove_file(undo_id, dir_name, dir_path, file_path)
+                    metrics.add(remove_phase, time.perf_counter() - started, dir_path, files=1)
+                    total_processed += 1
+                    for name in names:
+                        processed[name] += 1
+                    yield make_event('deleted', root=dir_name, path=file_path)
+                except Exception as e:
+                    metrics.add(remove_phase, time.perf_counter() - started, dir_path, errors=1)
+                    total_failed += 1
+                    for name in names:
+                        failed[name] += 1
+                    yield make_event('error', action='delete', root=dir_name, path=file_path, error=str(e))
+
+            roots = []
+            for dir_path, dir_name in root_names.items():
+                rescanned, unchanged, removed, skipped = self.song_index.last_stats[dir_path]
+                roots.append({
+                    'root': dir_name, 'path': dir_path, 'found': found_per_root[dir_name],
+                    'rescanned': rescanned, 'unchanged': unchanged, 'removed': removed, 'skipped': skipped,
+                })
+            songs = [
+                {'song_name': name, 'found': found[name], 'processed': processed[name], 'failed': failed[name]}
+                for name in song_names
+            ]
+            report, metrics_error = self.finish_metrics(metrics)
+            yield make_event(
+                'summary', operation='delete', dry_run=dry_run, found=total_found,
+                processed=total_processed, failed=total_failed, roots=roots, songs=songs,
+                undo_id=undo_id, metrics=report
+            )
+            if metrics_error:
+                yield make_event('error', action='save-metrics', error=metrics_error)
+        finally:
+            if undo_id is not None:
+                self.quarantine.end(undo_id)
+            index_error = self.save_index()
+            metadata_error = self.save_metadata() if self.match_tags else None
+        if index_error:
+            yield make_event('error', action='save-index', error=index_error)
+        if metadata_error:
+            yield make_event('error', action='save-metadata', error=metadata_error)
+
+    def match_tag_files(self, files, song_names, exact, metrics, control=None, workers=DEFAULT_WORKERS):
+        """Yield (root path, file path, song names) for the files whose tags match a song name
+
+        files holds (root path, file path) pairs of MP3/LRC files whose name
+        did not match; it is filled during the walk and read once the walk
+        is over, when their metadata is extracted in parallel.
+        """
+        if not files:
+            return
+        matcher = BatchMatcher(song_names, exact)
+        with metrics.phase('tags', files=len(files)):
+            media = self.metadata.get_many([(file_path, None, None) for root_path, file_path in files], workers, control)
+        for root_path, file_path in files:
+            metadata = media.get(file_path)
+            if not metadata or not metadata.get('title'):
+                continue
+            names = matcher.match_title(metadata['title'])
+            if not names and metadata.get('artist'):
+                names = matcher.match_title(f"{metadata['artist']} - {metadata['title']}")
+            if names:
+                yield root_path, file_path, names
+
+    def delete_files(self, matches, label='', control=None, staged=None):
+        """Delete an explicit set of matched files, e.g. the ones confirmed in a preview
+
+        matches is a list of (root name, root path, file path) tuples as
+        reported by the 'matched' events of a dry run. With staged (default:
+        staged_delete) set they are moved to quarantine as one undo
+        operation named label.
+        """
+        self.load()
+        if control is None:
+            control = JobControl()
+        if staged is None:
+            staged = self.staged_delete
+        undo_id = None
+        try:
+            metrics = Metrics('delete')
+            remove_phase = 'quarantine' if staged else 'remove'
+            if staged and matches:
+                undo_id = self.quarantine.begin(label)
+            found_per_root = {}
+            total_processed = 0
+            total_failed = 0
+            for done, (dir_name, dir_path, file_path) in enumerate(matches):
+                control.check()
+                control.progress(done, len(matches))
+                found_per_root[dir_name] = found_per_root.get(dir_name, 0) + 1
+                started = time.perf_counter()
+                try:
+                    self.remove_file(undo_id, dir_name, dir_path, file_path)
+                    metrics.add(remove_phase, time.perf_counter() - started, dir_name, files=1)
+                    total_processed += 1
+                    yield make_event('deleted', root=dir_name, path=file_path)
+                except Exception as e:
+                    metrics.add(remove_phase, time.perf_counter() - started, dir_name, errors=1)
+                    total_failed += 1
+                    yield make_event('error', action='delete', root=dir_name, path=file_path, error=str(e))
+            roots = [{'root': dir_name, 'found': found} for dir_name, found in found_per_root.items()]
+            report, metrics_error = self.finish_metrics(metrics)
+            yield make_event(
+                'summary', operation='delete', dry_run=False, found=len(matches),
+                processed=total_processed, failed=total_failed, roots=roots, songs=[],
+                undo_id=undo_id, metrics=report
+            )
+            if metrics_error:
+                yield make_event('error', action='save-metrics', error=metrics_error)
+        finally:
+            if undo_id is not None:
+                self.quarantine.end(undo_id)
+            index_error = self.save_index()
+        if index_error:
+            yield make_event('error', action='save-index', error=index_error)
+
+    def restore(self, undo_id):
+        """Move every file of a staged delete back from quarantine"""
+        self.load()
+        metrics = Metrics('restore')
+        restored = 0
+        failed = 0
+        with metrics.phase('restore'):
+            results = list(self.quarantine.restore(undo_id))
+        for record, error in results:
+            if error is None:
+                restored += 1
+                metrics.add('restore', root=record['root'], files=1, bytes=record['size'])
+                yield make_event('restored', root=record['root'], path=record['original'])
+            else:
+                failed += 1
+                metrics.add('restore', root=record['root'], errors=1)
+                yield make_event('error', action='restore', root=record['root'], path=record['original'], error=error)
+        report, metrics_error = self.finish_metrics(metrics)
+        yield make_event('summary', operation='restore', undo_id=undo_id, restored=restored, failed=failed, metrics=report)
+        if metrics_error:
+            yield make_event('error', action='save-metrics', error=metrics_error)
+
+    def purge_quarantine(self, max_age_days=DEFAULT_MAX_AGE_DAYS, max_bytes=DEFAULT_MAX_BYTES, undo_ids=None, pause=0.0, control=None):
+        """Delete quarantined operations for good
+
+        Purges undo_ids when given, otherwise every operation that is older
+        than max_age_days or needed to bring the quarantine under max_bytes.
+        """
+        self.load()
+        if control is None:
+            control = JobControl()
+        if undo_ids is None:
+            undo_ids = self.quarantine.expired(max_age_days, max_bytes)
+        total_files = 0
+        total_bytes = 0
+        for done, undo_id in enumerate(undo_ids):
+            control.check()
+            control.progress(done, len(undo_ids))
+            try:
+                files, size = self.quarantine.purge(undo_id, pause)
+            except OSError as e:
+                yield make_event('error', action='purge', undo_id=undo_id, error=str(e))
+                continue
+            total_files += files
+            total_bytes += size
+            yield make_event('purged', undo_id=undo_id, files=files, bytes=size)
+        yield make_event('summary', operation='purge', operations=len(undo_ids), files=total_files, bytes=total_bytes)
+
+    def rebuild_index(self, characterlive_path, singsong_path, sovits_path=None, control=None, workers=None):
+        """Discard the filename index and rebuild it from disk"""
+        self.load()
+        try:
+            search_dirs = yield from self.search_roots(characterlive_path, singsong_path, sovits_path)
+            metrics = Metrics('rebuild-index')
+            metrics.label_roots({dir_path: dir_name for dir_name, dir_path, rules in search_dirs})
+            self.song_index.clear()
+            root_rules = {dir_path: rules for dir_name, dir_path, rules in search_dirs}
+            for _ in self.song_index.scan(list(root_rules), ParallelWalker(workers or self.workers), metrics, root_rules, control):
+                pass
+            roots = []
+            for dir_name, dir_path, rules in search_dirs:
+                rescanned, unchanged, removed, skipped = self.song_index.last_stats[dir_path]
+                roots.append({'root': dir_name, 'path': dir_path, 'directories': rescanned, 'skipped': skipped})
+            report, metrics_error = self.finish_metrics(metrics)
+            yield make_event(
+                'summary', operation='rebuild-index', directories=sum(r['directories'] for r in roots),
+                roots=roots, metrics=report
+            )
+            if metrics_error:
+                yield make_event('error', action='save-metrics', error=metrics_error)
+        finally:
+            index_error = self.save_index()
+        if index_error:
+            yield make_event('error', action='save-index', error=index_error)
+
+    def index_names(self, characterlive_path, singsong_path, sovits_path=None, control=None, workers=None):
+        """Refresh the filename index and build name_index over every file a delete would search"""
+        self.load()
+        try:
+            search_dirs = yield from self.search_roots(characterlive_path, singsong_path, sovits_path)
+            metrics = Metrics('index-names')
+            metrics.label_roots({dir_path: dir_name for dir_name, dir_path, rules in search_dirs})
+            root_rules = {dir_path: rules for dir_name, dir_path, rules in search_dirs}
+            # Keys folded for names that are gone would otherwise pile up for the life of the process
+            fold_name.cache_clear()
+            name_index = NameIndex()
+            for root_path, dir_path, files in self.song_index.scan(list(root_rules), ParallelWalker(workers or self.workers), metrics, root_rules, control):
+                with metrics.phase('index-names', root_path, files=len(files)):
+                    for file in files:
+                        name_index.add(root_path, dir_path, file)
+            name_index.source = (tuple(root_rules), self.song_index.generation)
+            self.name_index = name_index
+            report, metrics_error = self.finish_metrics(metrics)
+            yield make_event('summary', operation='index-names', files=len(name_index), metrics=report)
+            if metrics_error:
+                yield make_event('error', action='save-metrics', error=metrics_error)
+        finally:
+            index_error = self.save_index()
+        if index_error:
+            yield make_event('error', action='save-index', error=index_error)
+
+    def name_index_stale(self, characterlive_path, singsong_path, sovits_path=None):
+        """Whether name_index is missing, or was built for other roots or from an older filename index"""
+        if self.name_index is None:
+            return True
+        project_paths = {
+            'characterlive_path': characterlive_path,
+            'singsong_path': singsong_path,
+            'sovits_path': sovits_path,
+        }
+        try:
+            candidates = resolve_search_roots(self.search_root_config, project_paths)
+        except ValueError:
+            return True
+        roots = tuple(dir_path for dir_name, dir_path, rules in candidates if os.path.exists(dir_path))
+        return self.name_index.source != (roots, self.song_index.generation)
+
+    def find_orphans(self, characterlive_path, singsong_path, mp3_storage_path, control=None, workers=None):
+        """Report songs left over in one project, walking each location once
+
+        Yields an 'orphan' event per finding, largest reclaimable size
+        first, with the files (and their sizes) that deleting it would free.
+        """
+        self.load()
+        try:
+            # download and MP3 storage are flat folders, like transfer treats them
+            locations = [
+                (DOWNLOAD, os.path.join(characterlive_path, "songs", "download"), RootRules(max_depth=0)),
+                (SINGSONG_SONGS, os.path.join(singsong_path, "songs"), None),
+                (SINGSONG_OUTPUT, os.path.join(singsong_path, "output"), None),
+                (MP3_STORAGE, mp3_storage_path, RootRules(max_depth=0)),
+            ]
+            root_names = {}
+            root_rules = {}
+            for location, dir_path, rules in locations:
+                if not os.path.exists(dir_path):
+                    yield make_event('warning', message=f"{dir_path} does not exist")
+                    continue
+                yield make_event('root', root=location, path=dir_path)
+                root_names[dir_path] = location
+                if rules is not None:
+                    root_rules[dir_path] = rules
+            metrics = Metrics('orphans')
+            metrics.label_roots(root_names)
+
+            listings = {location: [] for location in root_names.values()}
+            for root_path, dir_path, files in self.song_index.scan(list(root_names), ParallelWalker(workers or self.workers), metrics, root_rules, control):
+                listings[root_names[root_path]].extend((root_path, os.path.join(dir_path, file)) for file in files)
+            with metrics.phase('analyze'):
+                findings = analyze(listings)
+
+            # Only files that are reported get a stat call
+            orphans = []
+            with metrics.phase('stat'):
+                for finding in findings:
+                    files = []
+                    for location, dir_path, file_path in finding['files']:
+                        try:
+                            size = os.path.getsize(file_path)
+                        except OSError:
+                            continue
+                        files.append({
+                            'root': location, 'root_path': dir_path, 'path': file_path,
+                            'relative_path': os.path.relpath(file_path, dir_path), 'size': size,
+                        })
+                    if files:
+                        orphans.append(dict(finding, files=files, bytes=sum(file['size'] for file in files)))
+            orphans.sort(key=lambda orphan: orphan['bytes'], reverse=True)
+
+            counts = {category: 0 for category in ORPHAN_CATEGORIES}
+            category_bytes = {category: 0 for category in ORPHAN_CATEGORIES}
+            reclaimable = {}
+            for orphan in orphans:
+                counts[orphan['category']] += 1
+                category_bytes[orphan['category']] += orphan['bytes']
+                for file in orphan['files']:
+                    reclaimable[file['path']] = file['size']
+                yield make_event('orphan', **orphan)
+
+            roots = []
+            for dir_path, location in root_names.items():
+                rescanned, unchanged, removed, skipped = self.song_index.last_stats[dir_path]
+                roots.append({
+                    'root': location, 'path': dir_path, 'files': len(listings[location]),
+                    'rescanned': rescanned, 'unchanged': unchanged, 'removed': removed, 'skipped': skipped,
+                })
+            report, metrics_error = self.finish_metrics(metrics)
+            yield make_event(
+                'summary', operation='orphans', orphans=len(orphans), counts=counts, bytes=category_bytes,
+                reclaimable=sum(reclaimable.values()), roots=roots, metrics=report
+            )
+            if metrics_error:
+                yield make_event('error', action='save-metrics', error=metrics_error)
+        finally:
+            index_error = self.save_index()
+        if index_error:
+            yield make_event('error', action='save-index', error=index_error)
+
+    def transfer(self, characterlive_path, mp3_storage_path, dry_run=False, dedup=False, only=None, control=None, workers=None, copy_workers=None):
+        """Transfer MP3 and LRC files with extension normalization
+
+        With dedup, files are also compared by content: a source file whose
+        content already exists in the destination under another name is
+        reported as a duplicate, and one whose name exists with different
+        content is reported as a collision. Neither is copied.
+
+        Source files that did not change since the last sync are not
+        re-evaluated, and partial files left by an interrupted transfer are
+        cleaned up first so they get copied again.
+
+        only restricts the transfer to the given source file names (as they
+        were before the " - " rename), e.g. the new files seen by watch mode.
+
+        With match_tags, an MP3 whose artist and title tags match a
+        destination MP3 of about the same duration is skipped, lyrics that
+        run past the end of their MP3 are reported as 'mismatch' events and
+        'copied' events carry the file's metadata.
+        """
+        self.load()
+        errors = []
+        try:
+            yield from self.transfer_files(
+                characterlive_path, mp3_storage_path, dry_run, dedup, only, control or JobControl(),
+                workers or self.workers, copy_workers or self.copy_workers
+            )
+        finally:
+            if dedup:
+                errors.append(('save-hash-cache', self.save_hash_cache()))
+            if self.match_tags:
+                errors.append(('save-metadata', self.save_metadata()))
+            if not dry_run:
+                try:
+                    self.manifest.save()
+                except Exception as e:
+                    errors.append(('save-manifest', str(e)))
+        for action, error in errors:
+            if error:
+                yield make_event('error', action=action, error=error)
+
+    def recover_interrupted_copies(self):
+        """Remove partial files of copies that were in flight when a previous transfer stopped"""
+        for record in self.journal.pending():
+            removed = []
+            if os.path.exists(record['temp']):
+                os.remove(record['temp'])
+                removed.append(record['temp'])
+            yield make_event('recovered', path=record['source'], dest=record['dest'], removed=removed)
+
+    def transfer_files(self, characterlive_path, mp3_storage_path, dry_run, dedup, only, control, workers, copy_workers):
+        """Event stream behind transfer()"""
+        metrics = Metrics('transfer-dry-run' if dry_run else 'transfer')
+        # Prepare destination directory
+        dest_dir = os.path.join(characterlive_path, "songs", "download")
+        if not os.path.exists(dest_dir) and not dry_run:
+            os.makedirs(dest_dir)
+            yield make_event('info', message=f"Created destination directory: {dest_dir}")
+
+        # Get all files from source
+        if not os.path.exists(mp3_storage_path):
+            yield make_event('error', action='list', path=mp3_storage_path, error="Source path does not exist")
+            return
+
+        recovered_count = 0
+        if not dry_run:
+            with metrics.phase('recover'):
+                recovered = list(self.recover_interrupted_copies())
+            for event in recovered:
+                recovered_count += 1
+                yield event
+
+        # name -> (size, mtime_ns), taken from the same scandir pass that lists the folder
+        source_stats = {}
+        source_files = []
+        only = set(only) if only is not None else None
+        started = time.perf_counter()
+        with os.scandir(mp3_storage_path) as it:
+            for entry in it:
+                if only is not None and entry.name not in only:
+                    continue
+                # Only process mp3 and lrc files
+                ext = os.path.splitext(entry.name)[1].lower()
+                if ext in TRANSFER_EXTENSIONS and entry.is_file():
+                    stat_result = entry.stat()
+                    source_stats[entry.name] = (stat_result.st_size, stat_result.st_mtime_ns)
+                    source_files.append(entry.name)
+        metrics.add('list_source', time.perf_counter() - started, files=len(source_files))
+
+        yield make_event('info', message=f"Found {len(source_files)} MP3/LRC file(s) in source directory")
+
+        # Pre-process: Rename files containing " - " pattern.
+        # source_paths maps each (possibly renamed) name to where its content is on disk.
+        source_paths = {file: os.path.join(mp3_storage_path, file) for file in source_files}
+        renamed_count = 0
+        for i, file in enumerate(source_files):
+            new_filename = normalized_song_filename(file)
+            if new_filename == file:
+                continue
+            old_path = os.path.join(mp3_storage_path, file)
+            new_path = os.path.join(mp3_storage_path, new_filename)
+            started = time.perf_counter()
+            try:
+                if not dry_run:
+                    os.rename(old_path, new_path)
+                metrics.add('rename', time.perf_counter() - started, files=1)
+                yield make_event('renamed', path=old_path, old_name=file, new_name=new_filename)
+                source_files[i] = new_filename  # Update the list with new filename
+                source_paths[new_filename] = old_path if dry_run else new_path
+                source_stats[new_filename] = source_stats[file]  # rename keeps size and mtime
+                renamed_count += 1
+            except Exception as e:
+                metrics.add('rename', time.perf_counter() - started, errors=1)
+                yield make_event('error', action='rename', path=old_path, error=str(e))
+
+        # Get existing files in destination (with normalized extensions).
+        # The listing is reused from the manifest while the folder mtime is unchanged.
+        started = time.perf_counter()
+        sync = self.manifest.sync(mp3_storage_path, dest_dir)
+        dest_files = []
+        if os.path.exists(dest_dir):
+            dest_mtime = os.stat(dest_dir).st_mtime_ns
+            if sync['dest_mtime'] == dest_mtime:
+                dest_files = sync['dest_files']
+            else:
+                with os.scandir(dest_dir) as it:
+                    dest_files = [entry.name for entry in it if entry.is_file()]
+                if not dry_run:
+                    self.manifest.record_dest_listing(sync, dest_mtime, dest_files)
+
+        existing_files = {}
+        # (extension, size) -> [(file name, path holding its content)], only needed for dedup
+        content_candidates = {}
+        for file in dest_files:
+            # Store with both name and extension for accurate matching
+            name, ext = os.path.splitext(file)
+            existing_files[(name.lower(), ext.lower())] = file
+            if dedup:
+                file_path = os.path.join(dest_dir, file)
+                try:
+                    size = os.path.getsize(file_path)
+                except OSError:
+                    continue
+                content_candidates.setdefault((ext.lower(), size), []).append((file, file_path))
+        metrics.add('list_destination', time.perf_counter() - started, files=len(dest_files))
+
+        yield make_event('info', message=f"Found {len(existing_files)} existing file(s) in destination")
+
+        # Tags and durations of both sides, parsed in parallel and cached by size and mtime
+        source_media = {}
+        dest_media = {}
+        # (artist key, title key) -> [(destination file name, duration)]
+        tag_candidates = {}
+        if self.match_tags:
+            with metrics.phase('metadata', files=len(source_files) + len(dest_files)):
+                source_media = self.metadata.get_many(
+                    [(source_paths[file],) + source_stats[file] for file in source_files], workers, control
+                )
+                dest_media = self.metadata.get_many([
+                    (os.path.join(dest_dir, file), None, None) for file in dest_files
+                    if os.path.splitext(file)[1].lower() == '.mp3'
+                ], workers, control)
+            for file in dest_files:
+                key = tag_key(dest_media.get(os.path.join(dest_dir, file)))
+                if key is not None:
+                    tag_candidates.setdefault(key, []).append((file, dest_media[os.path.join(dest_dir, file)].get('duration')))
+
+        # Process each source file
+        copy_jobs = []
+        total_copied = 0
+        total_skipped = 0
+        total_unchanged = 0
+        total_duplicates = 0
+        total_collisions = 0
+        total_tag_duplicates = 0
+        total_mismatches = 0
+        total_failed = 0
+        # Results that prove the destination holds this content; without dedup a name match is enough
+        settled_results = ('copied', 'identical', 'duplicate') if dedup else ('copied', 'identical', 'duplicate', 'exists')
+
+        def record(source_file, dest_name, result):
+            if not dry_run:
+                size, mtime = source_stats[source_file]
+                self.manifest.record(sync, source_file, size, mtime, dest_name, result)
+
+        evaluate_started = time.perf_counter()
+        hashed_before = self.hash_cache.hashed_bytes
+        for source_file in source_files:
+            control.check()
+            source_path = source_paths[source_file]
+            name, ext = os.path.splitext(source_file)
+            size, mtime = source_stats[source_file]
+
+            # Unchanged since the last sync and its destination file is still there
+            previous = sync['files'].get(source_file)
+            dest_name = self.manifest.unchanged(sync, source_file, size, mtime)
+            if dest_name is not None and previous[3] in settled_results:
+                dest_name_key = tuple(part.lower() for part in os.path.splitext(dest_name))
+                if dest_name_key in existing_files:
+                    total_unchanged += 1
+                    continue
+
+            # Check if file already exists (case-insensitive name and extension comparison)
+            check_key = (name.lower(), ext.lower())
+            if check_key in existing_files:
+                existing = existing_files[check_key]
+                if dedup:
+                    try:
+                        with metrics.phase('hash'):
+                            same = self.hash_cache.same_content(source_path, os.path.join(dest_dir, existing))
+                    except OSError as e:
+                        yield make_event('error', action='hash', path=source_path, file=source_file, error=str(e))
+                        total_failed += 1
+                        continue
+                    if not same:
+                        yield make_event('collision', path=source_path, file=source_file, existing=existing)
+                        record(source_file, existing, 'collision')
+                        total_collisions += 1
+                        continue
+                yield make_event('skipped', path=source_path, file=source_file, existing=existing, reason='exists')
+                record(source_file, existing, 'identical' if dedup else 'exists')
+                total_skipped += 1
+                continue
+
+            if dedup:
+                try:
+                    with metrics.phase('hash'):
+                        duplicate_of = self.find_duplicate(source_path, ext.lower(), content_candidates)
+                except OSError as e:
+                    yield make_event('error', action='hash', path=source_path, file=source_file, error=str(e))
+                    total_failed += 1
+                    continue
+                if duplicate_of is not None:
+                    yield make_event('skipped', path=source_path, file=source_file, existing=duplicate_of, reason='duplicate')
+                    record(source_file, duplicate_of, 'duplicate')
+                    total_duplicates += 1
+                    continue
+
+            # The same song under another name, e.g. "Title (Live).mp3" next to "Title.mp3"
+            media = source_media.get(source_path)
+            key = tag_key(media) if ext.lower() == '.mp3' else None
+            if key is not None:
+                same_song = next((
+                    file for file, duration in tag_candidates.get(key, ())
+                    if duration is not None and media.get('duration') is not None
+                    and abs(duration - media['duration']) <= TAG_DURATION_TOLERANCE
+                ), None)
+                if same_song is not None:
+                    yield make_event('skipped', path=source_path, file=source_file, existing=same_song, reason='tags')
+                    record(source_file, same_song, 'tags')
+                    total_tag_duplicates += 1
+                    continue
+
+            # Prepare destination filename with normalized extension
+            dest_filename = name + ext.lower()
+            dest_path = os.path.join(dest_dir, dest_filename)
+
+            copy_jobs.append((source_path, dest_path, (source_file, dest_filename)))
+
+            # Later source files with the same name, content or tags are caught too
+            existing_files[check_key] = dest_filename
+            if dedup:
+                content_candidates.setdefault((ext.lower(), size), []).append((dest_filename, source_path))
+            if key is not None:
+                tag_candidates.setdefault(key, []).append((dest_filename, media.get('duration')))
+
+        metrics.add('evaluate', time.perf_counter() - evaluate_started, files=len(source_files), errors=total_failed)
+        if dedup:
+            metrics.add('hash', bytes=self.hash_cache.hashed_bytes - hashed_before)
+        if total_unchanged:
+            yield make_event('info', message=f"{total_unchanged} file(s) unchanged since the last sync")
+
+        if self.match_tags:
+            # Lyrics being copied must fit the MP3 of the same name, from the source or already transferred
+            source_mp3s = {
+                os.path.splitext(file)[0].lower(): source_paths[file]
+                for file in source_files if os.path.splitext(file)[1].lower() == '.mp3'
+            }
+            for source_path, dest_path, (source_file, dest_filename) in copy_jobs:
+                name, ext = os.path.splitext(dest_filename)
+                if ext != '.lrc':
+                    continue
+                audio = source_media.get(source_mp3s.get(name.lower()))
+                if audio is None and (name.lower(), '.mp3') in existing_files:
+                    audio = dest_media.get(os.path.join(dest_dir, existing_files[(name.lower(), '.mp3')]))
+                overrun = lyrics_overrun(source_media.get(source_path), audio)
+                if overrun is not None:
+                    yield make_event(
+                        'mismatch', path=source_path, file=source_file, lyrics_seconds=source_media[source_path]['duration'],
+                        audio_seconds=audio['duration'], overrun_seconds=overrun
+                    )
+                    total_mismatches += 1
+
+        # Copy everything selected above on the copy pool
+        if dry_run:
+            for source_path, dest_path, (source_file, dest_filename) in copy_jobs:
+                event = make_event('copied', path=source_path, dest=dest_path, file=source_file, dest_file=dest_filename)
+                if source_media.get(source_path):
+                    event['media'] = source_media[source_path]
+                yield event
+                total_copied += 1
+        else:
+            self.journal.open()
+            completed = False
+            copy_started = time.perf_counter()
+            copied_bytes = 0
+            copy_errors = 0
+            try:
+                for result in CopyEngine(copy_workers).run(copy_jobs, self.journal, control):
+                    if result[0] == 'progress':
+                        control.progress(result[1]['bytes_done'], result[1]['bytes_total'])
+                        yield make_event('progress', **result[1])
+                        continue
+                    source_path, dest_path, (source_file, dest_filename) = result[1]
+                    if result[0] == 'done':
+                        copied_size = os.path.getsize(dest_path)
+                        copied_bytes += copied_size
+                        event = make_event(
+                            'copied', path=source_path, dest=dest_path, file=source_file, dest_file=dest_filename,
+                            bytes=copied_size, seconds=result[2]
+                        )
+                        if source_media.get(source_path):
+                            event['media'] = source_media[source_path]
+                        yield event
+                        record(source_file, dest_filename, 'copied')
+                        total_copied += 1
+                    else:
+                        yield make_event('error', action='copy', path=source_path, file=source_file, error=str(result[2]))
+                        copy_errors += 1
+                        total_failed += 1
+                completed = True
+            finally:
+                self.journal.close(completed)
+                metrics.add(
+                    'copy', time.perf_counter() - copy_started,
+                    files=total_copied, bytes=copied_bytes, errors=copy_errors
+                )
+            if only is None:
+                self.manifest.prune(sync, source_files)
+
+        summary = make_event(
+            'summary', operation='transfer', dry_run=dry_run, renamed=renamed_count,
+            copied=total_copied, skipped=total_skipped, unchanged=total_unchanged,
+            recovered=recovered_count, failed=total_failed
+        )
+        if dedup:
+            summary.update(duplicates=total_duplicates, collisions=total_collisions, hashed_bytes=self.hash_cache.hashed_bytes - hashed_before)
+        if self.match_tags:
+            summary.update(tag_duplicates=total_tag_duplicates, mismatches=total_mismatches)
+        summary['metrics'], metrics_error = self.finish_metrics(metrics)
+        yield summary
+        if metrics_error:
+            yield make_event('error', action='save-metrics', error=metrics_error)
+
+    def find_duplicate(self, source_path, ext, content_candidates):
+        """Return the destination file name holding the same content as source_path, if any"""
+        stat_result = os.stat(source_path)
+        for file, path in content_candidates.get((ext, stat_result.st_size), []):
+            if self.hash_cache.same_content(source_path, path, stat_result):
+                return file
+        return None
+
+
+def normalized_song_filename(file):
+    """Keep only the part after the last " - " (artist prefix separator) of a file name"""
+    name, ext = os.path.splitext(file)
+    if " - " not in name:
+        return file
+    last_index = name.rfind(" - ")
+    return name[last_index + 3:] + ext  # +3 to skip " - "
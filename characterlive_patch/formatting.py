@@ -0,0 +1,32 @@
+"""
+Human readable sizes and durations for log output
+"""
+
+
+def format_bytes(count):
+    """Format a byte count such as 1536 as '1.5 KB'"""
+    size = float(count)
+    for unit in ('B', 'KB', 'MB', 'GB', 'TB'):
+        if abs(size) < 1024 or unit == 'TB':
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_duration(seconds):
+    """Format seconds as H:MM:SS, or '?' when unknown"""
+    if seconds is None:
+        return "?"
+    seconds = int(round(seconds))
+    hours, rest = divmod(seconds, 3600)
+    minutes, seconds = divmod(rest, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+def format_media(metadata):
+    """Format MP3/LRC metadata as e.g. '0:03:45, 320 kbps', or '' when nothing is known"""
+    parts = []
+    if metadata.get('duration') is not None:
+        parts.append(format_duration(metadata['duration']))
+    if metadata.get('bitrate'):
+        parts.append(f"{metadata['bitrate']} kbps" + (" VBR" if metadata.get('vbr') else ""))
+    return ', '.join(parts)
@@ -0,0 +1,127 @@
+"""
+Content hashing with a persistent cache for duplicate detection
+
+Files are compared in increasing order of cost: size, then a hash of the
+first and last HEAD_TAIL_BYTES, then a full hash only when both earlier
+checks agree. Hashes are cached keyed on path, size and mtime, so files
+that have not changed are never read again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+
+
+CACHE_VERSION = 1
+HEAD_TAIL_BYTES = 64 * 1024
+READ_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_head_tail(path, size):
+    """Hash the size plus the first and last HEAD_TAIL_BYTES of a file"""
+    digest = hashlib.blake2b(str(size).encode('ascii'), digest_size=16)
+    with open(path, 'rb') as f:
+        digest.update(f.read(HEAD_TAIL_BYTES))
+        if size > HEAD_TAIL_BYTES:
+            f.seek(max(HEAD_TAIL_BYTES, size - HEAD_TAIL_BYTES))
+            digest.update(f.read(HEAD_TAIL_BYTES))
+    return digest.hexdigest()
+
+
+def hash_full(path):
+    """Hash the whole content of a file"""
+    digest = hashlib.blake2b(digest_size=32)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class HashCache:
+    """Persistent cache of head/tail and full content hashes"""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        # path -> [size, mtime_ns, head_hash or None, full_hash or None]
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.hashed_bytes = 0
+
+    def load(self):
+        """Load the cache file, starting empty if it is missing or unreadable"""
+        with self.lock:
+            self.entries = {}
+            self.dirty = False
+            if not os.path.exists(self.cache_file):
+                return False
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return False
+            if data.get('version') != CACHE_VERSION:
+                return False
+            self.entries = data.get('entries', {})
+            return True
+
+    def save(self):
+        """Write the cache file if anything changed, dropping files that no longer exist"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.entries = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+            data = {'version': CACHE_VERSION, 'entries': self.entries}
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.cache_file)
+            self.dirty = False
+
+    def entry(self, path, stat_result):
+        """Get the cache entry for a file, resetting it when size or mtime changed"""
+        key = os.path.abspath(path)
+        with self.lock:
+            cached = self.entries.get(key)
+            if cached is None or cached[0] != stat_result.st_size or cached[1] != stat_result.st_mtime_ns:
+                cached = [stat_result.st_size, stat_result.st_mtime_ns, None, None]
+                self.entries[key] = cached
+                self.dirty = True
+            return cached
+
+    def head_hash(self, path, stat_result=None):
+        """Get the head/tail hash of a file"""
+        stat_result = stat_result or os.stat(path)
+        cached = self.entry(path, stat_result)
+        if cached[2] is None:
+            cached[2] = hash_head_tail(path, stat_result.st_size)
+            self.hashed_bytes += min(stat_result.st_size, 2 * HEAD_TAIL_BYTES)
+            self.dirty = True
+        return cached[2]
+
+    def full_hash(self, path, stat_result=None):
+        """Get the full content hash of a file"""
+        stat_result = stat_result or os.stat(path)
+        cached = self.entry(path, stat_result)
+        if cached[3] is None:
+            cached[3] = hash_full(path)
+            self.hashed_bytes += stat_result.st_size
+            self.dirty = True
+        return cached[3]
+
+    def same_content(self, path_a, path_b, stat_a=None, stat_b=None):
+        """Compare two files by size, then head/tail hash, then full hash"""
+        stat_a = stat_a or os.stat(path_a)
+        stat_b = stat_b or os.stat(path_b)
+        if stat_a.st_size != stat_b.st_size:
+            return False
+        if self.head_hash(path_a, stat_a) != self.head_hash(path_b, stat_b):
+            return False
+        # Files that fit entirely in the head/tail window are already fully compared
+        if stat_a.st_size <= 2 * HEAD_TAIL_BYTES:
+            return True
+        return self.full_hash(path_a, stat_a) == self.full_hash(path_b, stat_b)
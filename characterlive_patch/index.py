@@ -0,0 +1,239 @@
+"""
+Persistent filename index for the song search roots
+
+Each indexed directory records its mtime together with the names of the
+files and subdirectories it contains. Adding, removing or renaming an entry
+changes the mtime of the directory holding it, so a refresh only has to
+stat every directory and re-list the ones whose mtime moved.
+"""
+
+import json
+import os
+import threading
+import time
+
+from .jobs import JobControl
+from .metrics import Metrics
+from .names import name_key, stem_key
+from .quarantine import QUARANTINE_DIR
+from .walker import ParallelWalker, list_dir
+
+
+INDEX_VERSION = 1
+
+
+def song_name_matcher(song_name, exact=False):
+    """Build a predicate telling whether a file name matches the song name
+
+    Names are compared by their normalized keys, so width, case and
+    Unicode normalization form do not matter.
+    """
+    song_key = name_key(song_name)
+    if exact:
+        def match(file):
+            # Exact match: filename (without extension) must equal song_name.
+            # The prefix test skips splitext for almost every non-matching file.
+            key = name_key(file)
+            return key.startswith(song_key) and stem_key(key) == song_key
+    else:
+        def match(file):
+            # Partial match: filename must contain song_name
+            return song_key in name_key(file)
+    return match
+
+
+class SongIndex:
+    """On-disk index of file names under the search roots"""
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        # root path -> {relative dir: [mtime_ns, files, subdirs]}
+        self.roots = {}
+        self.lock = threading.RLock()
+        self.dirty = False
+        self.last_stats = {}
+        # Bumped on every change, so views built from the index know when they are stale
+        self.generation = 0
+
+    @staticmethod
+    def normalize_root(root_path):
+        """Normalize a root path so it can be used as a dictionary key"""
+        return os.path.normcase(os.path.abspath(root_path))
+
+    def load(self):
+        """Load the index file, starting empty if it is missing or unreadable"""
+        with self.lock:
+            self.roots = {}
+            self.dirty = False
+            self.generation += 1
+            if not os.path.exists(self.index_file):
+                return False
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return False
+            if data.get('version') != INDEX_VERSION:
+                return False
+            self.roots = data.get('roots', {})
+            return True
+
+    def save(self):
+        """Write the index file if anything changed"""
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {'version': INDEX_VERSION, 'roots': self.roots}
+            tmp_file = self.index_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.index_file)
+            self.dirty = False
+
+    def clear(self):
+        """Forget every indexed root so the next refresh rescans everything"""
+        with self.lock:
+            self.roots = {}
+            self.dirty = True
+            self.generation += 1
+            if os.path.exists(self.index_file):
+                os.remove(self.index_file)
+
+    def scan(self, root_paths, walker=None, metrics=None, rules=None, control=None):
+        """Bring the index for several roots up to date while streaming its contents
+
+        Roots are refreshed concurrently with the walker. Every directory is
+        yielded as (root_path, dir_path, files) once its entry is known to
+        be current. When the stream is exhausted the new entries replace the
+        old ones and per-root (rescanned, unchanged, removed, skipped) counts
+        are stored in last_stats.
+
+        rules maps root paths to RootRules. Subdirectories they exclude are
+        never listed (counted as skipped) and excluded files are not yielded;
+        the index itself keeps the unfiltered listings, so changing the
+        rules does not invalidate it.
+
+        When metrics is given, time spent waiting for the walk is recorded
+        as the 'walk' phase and the listing work done on the walker threads
+        as the per-root 'list' phase.
+
+        control.check() is called for every directory, so a cancelled job
+        stops the walk (leaving the index as it was), and the progress is
+        estimated from the directory count of the previous scan.
+        """
+        if walker is None:
+            walker = ParallelWalker()
+        if metrics is None:
+            metrics = Metrics('scan')
+        if control is None:
+            control = JobControl()
+        keys = {root_path: self.normalize_root(root_path) for root_path in root_paths}
+        with self.lock:
+            old_roots = {root_path: self.roots.get(key, {}) for root_path, key in keys.items()}
+        new_roots = {root_path: {} for root_path in root_paths}
+        stats = {root_path: [0, 0, 0, 0] for root_path in root_paths}
+        rules = rules or {}
+        known_dirs = sum(len(dirs) for dirs in old_roots.values())
+        done_dirs = 0
+
+        def lister(root_path, rel_dir):
+            started = time.perf_counter()
+            dir_path = root_path if rel_dir == '.' else os.path.join(root_path, rel_dir)
+            mtime = os.stat(dir_path).st_mtime_ns
+            cached = old_roots[root_path].get(rel_dir)
+            if cached is not None and cached[0] == mtime:
+                files, subdirs, rescanned = cached[1], cached[2], False
+            else:
+                files, subdirs, mtime = list_dir(dir_path)
+                rescanned = True
+            if QUARANTINE_DIR in subdirs:
+                # Staged deletes live here, at the top of a root or deeper when the
+                # quarantine root lies inside a search root; never search results
+                subdirs = [subdir for subdir in subdirs if subdir != QUARANTINE_DIR]
+            all_files, all_subdirs, skipped = files, subdirs, 0
+            if root_path in rules:
+                # Prune here so excluded directories are never handed to the walker
+                files, subdirs, skipped = rules[root_path].apply(rel_dir, files, subdirs)
+            metrics.add('list', time.perf_counter() - started, root_path, directories=1, files=len(files), skipped=skipped)
+            return files, subdirs, mtime, rescanned, all_files, all_subdirs, skipped
+
+        listings = walker.walk(list(root_paths), lister)
+        while True:
+            control.check()
+            with metrics.phase('walk'):
+                item = next(listings, None)
+            if item is None:
+                break
+            root_path, rel_dir, (files, subdirs, mtime, rescanned, all_files, all_subdirs, skipped) = item
+            new_roots[root_path][rel_dir] = [mtime, all_files, all_subdirs]
+            stats[root_path][0 if rescanned else 1] += 1
+            stats[root_path][3] += skipped
+            done_dirs += 1
+            control.progress(done_dirs, known_dirs)
+            dir_path = root_path if rel_dir == '.' else os.path.join(root_path, rel_dir)
+            yield root_path, dir_path, files
+
+        with self.lock:
+            for root_path, key in keys.items():
+                removed = len(set(old_roots[root_path]) - set(new_roots[root_path]))
+                stats[root_path][2] = removed
+                if stats[root_path][0] or removed or key not in self.roots:
+                    self.dirty = True
+                    self.generation += 1
+                self.roots[key] = new_roots[root_path]
+                self.last_stats[root_path] = tuple(stats[root_path])
+
+    def refresh(self, root_path, walker=None, metrics=None, rules=None):
+        """Bring the index for a root up to date, returning (rescanned, unchanged, removed, skipped)"""
+        for _ in self.scan([root_path], walker, metrics, {root_path: rules} if rules else None):
+            pass
+        return self.last_stats[root_path]
+
+    def iter_files(self, root_path):
+        """Yield (directory path, file name) for every indexed file under a root"""
+        key = self.normalize_root(root_path)
+        # Copied under the lock and yielded outside it, so a slow consumer never blocks a refresh
+        with self.lock:
+            listing = [(rel_dir, list(files)) for rel_dir, (mtime, files, subdirs) in self.roots.get(key, {}).items()]
+        for rel_dir, files in listing:
+            dir_path = root_path if rel_dir == '.' else os.path.join(root_path, rel_dir)
+            for file in files:
+                yield dir_path, file
+
+    def find(self, root_path, song_name, exact=False):
+        """Yield paths of indexed files matching the song name"""
+        match = song_name_matcher(song_name, exact)
+        for dir_path, file in self.iter_files(root_path):
+            if match(file):
+                yield os.path.join(dir_path, file)
+
+    def iter_matches(self, root_paths, match, walker=None, metrics=None, rules=None, control=None):
+        """Refresh the roots and stream (root_path, file_path, result) for every file where match(file) is truthy"""
+        if metrics is None:
+            metrics = Metrics('match')
+        for root_path, dir_path, files in self.scan(root_paths, walker, metrics, rules, control):
+            # Evaluate the whole directory first so callers may delete while iterating
+            started = time.perf_counter()
+            matched = [(file, result) for file, result in ((file, match(file)) for file in files) if result]
+            metrics.add('match', time.perf_counter() - started, root_path, files=len(files))
+            for file, result in matched:
+                yield root_path, os.path.join(dir_path, file), result
+
+    def discard(self, root_path, file_path):
+        """Drop a deleted file from the index
+
+        The cached mtime of its directory is left as is, so the directory is
+        re-listed on the next refresh and picks up any other change made
+        in the meantime.
+        """
+        key = self.normalize_root(root_path)
+        rel_dir = os.path.relpath(os.path.dirname(file_path), root_path)
+        with self.lock:
+            cached = self.roots.get(key, {}).get(rel_dir)
+            if cached is None:
+                return
+            name = os.path.basename(file_path)
+            if name in cached[1]:
+                cached[1].remove(name)
+                self.dirty = True
+                self.generation += 1
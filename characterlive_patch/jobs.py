@@ -0,0 +1,215 @@
+"""
+Job scheduler for long-running operations
+
+Delete, transfer, analysis and maintenance operations are submitted as
+jobs. Each job names the resources it needs ('index' for the filename
+index, 'volume:<id>' for every volume it writes to, 'quarantine' for the
+undo journal, 'journal' for the transfer journal); a job starts
+once every resource it needs has a free slot, so a transfer queues behind
+a delete writing to the same volume while one on another volume runs
+alongside it. Jobs start in submission order, except that a job may pass
+a blocked one when they share no resource.
+
+Cancellation is cooperative: the engine calls control.check() in its walk
+and copy loops, which raises Cancelled once the job was cancelled. Copies
+in flight remove their temporary file, so a cancelled job leaves no
+partial files behind.
+"""
+
+import os
+import threading
+import time
+
+
+DEFAULT_LIMIT = 1
+# How long closing the window waits for cancelled jobs to stop
+SHUTDOWN_TIMEOUT = 30.0
+
+
+class Cancelled(Exception):
+    """Raised inside an operation whose job has been cancelled"""
+
+
+class JobControl:
+    """What a running operation sees of its job: a cancel flag and a progress fraction"""
+
+    def __init__(self):
+        self.cancel_event = threading.Event()
+        # Fraction done between 0 and 1, or None while it cannot be estimated
+        self.fraction = None
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def check(self):
+        """Raise Cancelled if the job has been cancelled"""
+        if self.cancel_event.is_set():
+            raise Cancelled()
+
+    def progress(self, done, total):
+        """Report how much of the work is done"""
+        self.fraction = min(1.0, done / total) if total else None
+
+
+class Job(JobControl):
+    """A queued or running operation; state is queued, running, done, failed or cancelled"""
+
+    def __init__(self, job_id, name, func, resources):
+        super().__init__()
+        self.id = job_id
+        self.name = name
+        self.func = func
+        self.resources = tuple(resources)
+        self.state = 'queued'
+        self.error = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+
+
+def volume_resource(path):
+    """Resource name of the volume holding path (or its nearest existing parent)"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path):
+        parent = os.path.dirname(path)
+        if parent == path:
+            break
+        path = parent
+    drive = os.path.splitdrive(path)[0]
+    if drive:
+        return 'volume:' + drive.lower()
+    try:
+        return f'volume:{os.stat(path).st_dev}'
+    except OSError:
+        return 'volume:' + path
+
+
+def volume_resources(paths):
+    """Distinct volume resources of several paths, ignoring empty ones"""
+    return sorted({volume_resource(path) for path in paths if path})
+
+
+class JobScheduler:
+    """Run jobs on their own threads within per-resource concurrency limits"""
+
+    def __init__(self, limits=None, on_change=None):
+        # resource kind ('index', 'volume', ...) -> jobs that may hold one such resource at a time
+        self.limits = dict(limits or {})
+        self.on_change = on_change
+        self.queue = []
+        self.running = []
+        self.next_id = 1
+        self.condition = threading.Condition()
+
+    def limit(self, resource):
+        return self.limits.get(resource.split(':', 1)[0], DEFAULT_LIMIT)
+
+    def submit(self, name, func, resources=()):
+        """Queue func(job) to run once its resources are free, returning the Job"""
+        with self.condition:
+            job = Job(self.next_id, name, func, resources)
+            self.next_id += 1
+            self.queue.append(job)
+            self.dispatch()
+        self.changed()
+        return job
+
+    def dispatch(self):
+        """Start every queued job whose resources have room; call with the condition held"""
+        in_use = {}
+        for job in self.running:
+            for resource in job.resources:
+                in_use[resource] = in_use.get(resource, 0) + 1
+        # Resources wanted by an earlier queued job; later jobs must not overtake it on them
+        blocked = set()
+        for job in list(self.queue):
+            if any(resource in blocked for resource in job.resources) or any(
+                in_use.get(resource, 0) >= self.limit(resource) for resource in job.resources
+            ):
+                blocked.update(job.resources)
+                continue
+            self.queue.remove(job)
+            self.running.append(job)
+            for resource in job.resources:
+                in_use[resource] = in_use.get(resource, 0) + 1
+            job.state = 'running'
+            job.started = time.time()
+            thread = threading.Thread(target=self.run, args=(job,), name=f'job-{job.id}')
+            thread.daemon = True
+            thread.start()
+
+    def run(self, job):
+        try:
+            job.check()
+            job.func(job)
+            state = 'done'
+        except Cancelled:
+            state = 'cancelled'
+        except Exception as e:
+            job.error = str(e)
+            state = 'failed'
+        with self.condition:
+            job.state = state
+            job.finished = time.time()
+            self.running.remove(job)
+            self.dispatch()
+            self.condition.notify_all()
+        self.changed()
+
+    def cancel(self, job):
+        """Drop a queued job, or ask a running one to stop at its next check"""
+        with self.condition:
+            job.cancel()
+            if job in self.queue:
+                self.queue.remove(job)
+                job.state = 'cancelled'
+                job.finished = time.time()
+                self.dispatch()
+                self.condition.notify_all()
+        self.changed()
+
+    def cancel_all(self):
+        """Drop every queued job and ask the running ones to stop"""
+        with self.condition:
+            for job in self.running:
+                job.cancel()
+            for job in self.queue:
+                job.cancel()
+                job.state = 'cancelled'
+                job.finished = time.time()
+            self.queue = []
+            self.condition.notify_all()
+        self.changed()
+
+    def jobs(self):
+        """Running jobs followed by queued ones"""
+        with self.condition:
+            return list(self.running) + list(self.queue)
+
+    def idle(self):
+        with self.condition:
+            return not self.running and not self.queue
+
+    def wait(self, timeout=None):
+        """Wait until no job is queued or running, returning False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.running or self.queue:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def shutdown(self, timeout=None):
+        """Cancel every job and wait for the running ones to stop"""
+        self.cancel_all()
+        return self.wait(timeout)
+
+    def changed(self):
+        if self.on_change is not None:
+            self.on_change()
@@ -0,0 +1,115 @@
+"""
+Queue-based log pump for the output terminal
+
+Worker threads only append to a thread-safe queue. The Tk main loop drains
+the queue at a fixed frame rate and inserts each batch with a single
+widget update, keeping at most max_lines lines on screen. The complete log
+is streamed to a rotating file. Other UI work from worker threads, such
+as error dialogs, goes through the same queue with call().
+"""
+
+import logging
+import logging.handlers
+import os
+import queue
+import tkinter as tk
+
+
+DEFAULT_MAX_LINES = 5000
+DEFAULT_INTERVAL_MS = 50
+LOG_FILE_MAX_BYTES = 5 * 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+
+class LogPump:
+    """Move log records from any thread into a Tk text widget in batches"""
+
+    def __init__(self, root, log_file=None, max_lines=DEFAULT_MAX_LINES, interval_ms=DEFAULT_INTERVAL_MS):
+        self.root = root
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self.queue = queue.SimpleQueue()
+        self.text_widget = None
+        self.line_count = 0
+        self.file_logger = None
+        if log_file:
+            self.file_logger = self.open_log_file(log_file)
+
+    @staticmethod
+    def open_log_file(log_file):
+        """Create a logger writing to a rotating log file"""
+        os.makedirs(os.path.dirname(log_file), exist_ok=True)
+        logger = logging.getLogger(f"characterLive-patch.{log_file}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            handler = logging.handlers.RotatingFileHandler(
+                log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8'
+            )
+            handler.setFormatter(logging.Formatter('%(message)s'))
+            logger.addHandler(handler)
+        return logger
+
+    def put(self, message):
+        """Queue a message; safe to call from any thread"""
+        self.queue.put(message)
+
+    def call(self, func, *args):
+        """Queue func(*args) to run on the Tk main loop after the messages queued before it; safe to call from any thread"""
+        self.queue.put((func, args))
+
+    def attach(self, text_widget):
+        """Start draining into a text widget on the Tk main loop"""
+        self.text_widget = text_widget
+        self.root.after(self.interval_ms, self.drain)
+
+    def drain(self):
+        """Insert everything queued since the last frame, then reschedule"""
+        try:
+            self.flush()
+        finally:
+            self.root.after(self.interval_ms, self.drain)
+
+    def flush(self):
+        """Insert everything queued so far as a single batch, then run the queued calls"""
+        messages = []
+        calls = []
+        try:
+            while True:
+                item = self.queue.get_nowait()
+                if isinstance(item, tuple):
+                    calls.append(item)
+                else:
+                    messages.append(item)
+        except queue.Empty:
+            pass
+        if messages:
+            self.insert(messages)
+        for func, args in calls:
+            func(*args)
+
+    def insert(self, messages):
+        """Append messages to the log file and the text widget"""
+        batch = '\n'.join(messages) + '\n'
+        if self.file_logger is not None:
+            try:
+                self.file_logger.info(batch.rstrip('\n'))
+            except Exception:
+                pass
+
+        # Lines that would scroll out of the ring buffer straight away are never inserted
+        lines = batch.count('\n')
+        if lines > self.max_lines:
+            batch = '\n'.join(batch.split('\n')[-self.max_lines - 1:])
+            lines = self.max_lines
+
+        widget = self.text_widget
+        widget.config(state='normal')
+        widget.insert(tk.END, batch)
+        self.line_count += lines
+        if self.line_count > self.max_lines:
+            excess = self.line_count - self.max_lines
+            widget.delete('1.0', f'{excess + 1}.0')
+            self.line_count = self.max_lines
+        widget.see(tk.END)
+        widget.config(state='disabled')
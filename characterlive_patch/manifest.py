@@ -0,0 +1,160 @@
+"""
+Incremental sync manifest and resumable transfer journal
+
+The manifest remembers, per (source folder, destination folder) pair, the
+size and mtime of every source file together with the destination file
+it resolved to, plus the last destination listing and its mtime. Reruns
+only re-evaluate source files that changed since the last sync and only
+re-list the destination when its mtime moved.
+
+The journal is an append-only JSON-lines file recording every copy that
+has started and every copy that has finished. Copies that started but
+never finished belong to an interrupted transfer; their partial files are
+removed before the next transfer so they are copied again.
+"""
+
+import json
+import os
+import threading
+
+
+MANIFEST_VERSION = 1
+
+
+class SyncManifest:
+    """Per folder pair record of the last sync"""
+
+    def __init__(self, manifest_file):
+        self.manifest_file = manifest_file
+        # "source|dest" -> {'files': {name: [size, mtime_ns, dest_name, result]},
+        #                   'dest_mtime': mtime_ns, 'dest_files': [names]}
+        self.syncs = {}
+        self.dirty = False
+
+    @staticmethod
+    def sync_key(source_dir, dest_dir):
+        """Key identifying a source/destination folder pair"""
+        normalize = lambda path: os.path.normcase(os.path.abspath(path))
+        return f"{normalize(source_dir)}|{normalize(dest_dir)}"
+
+    def load(self):
+        """Load the manifest file, starting empty if it is missing or unreadable"""
+        self.syncs = {}
+        self.dirty = False
+        if not os.path.exists(self.manifest_file):
+            return False
+        try:
+            with open(self.manifest_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if data.get('version') != MANIFEST_VERSION:
+            return False
+        self.syncs = data.get('syncs', {})
+        return True
+
+    def save(self):
+        """Write the manifest file if anything changed"""
+        if not self.dirty:
+            return
+        data = {'version': MANIFEST_VERSION, 'syncs': self.syncs}
+        tmp_file = self.manifest_file + '.tmp'
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp_file, self.manifest_file)
+        self.dirty = False
+
+    def sync(self, source_dir, dest_dir):
+        """Get the (mutable) record for a folder pair"""
+        key = self.sync_key(source_dir, dest_dir)
+        if key not in self.syncs:
+            self.syncs[key] = {'files': {}, 'dest_mtime': None, 'dest_files': []}
+        return self.syncs[key]
+
+    def unchanged(self, sync, name, size, mtime_ns):
+        """Return the recorded destination name if the source file is unchanged since the last sync"""
+        record = sync['files'].get(name)
+        if record is None or record[0] != size or record[1] != mtime_ns:
+            return None
+        return record[2]
+
+    def record(self, sync, name, size, mtime_ns, dest_name, result):
+        """Remember how a source file was resolved"""
+        sync['files'][name] = [size, mtime_ns, dest_name, result]
+        self.dirty = True
+
+    def record_dest_listing(self, sync, dest_mtime, dest_files):
+        """Remember the destination listing and the mtime it was taken at"""
+        sync['dest_mtime'] = dest_mtime
+        sync['dest_files'] = list(dest_files)
+        self.dirty = True
+
+    def prune(self, sync, names):
+        """Forget source files that no longer exist"""
+        stale = set(sync['files']) - set(names)
+        for name in stale:
+            del sync['files'][name]
+        if stale:
+            self.dirty = True
+
+
+class TransferJournal:
+    """Append-only log of in-flight copies"""
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.file = None
+
+    def pending(self):
+        """Return the begin records of copies that never finished"""
+        if not os.path.exists(self.journal_file):
+            return []
+        begun = {}
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn last line from a crash
+                    continue
+                if record.get('op') == 'begin':
+                    begun[record['id']] = record
+                elif record.get('op') == 'end':
+                    begun.pop(record['id'], None)
+        return list(begun.values())
+
+    def open(self):
+        """Start a fresh journal for a new transfer"""
+        self.file = open(self.journal_file, 'w', encoding='utf-8')
+        self.next_id = 0
+
+    def write(self, record):
+        """Append a record and flush it to disk"""
+        with self.lock:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.file.flush()
+            if record['op'] == 'begin':
+                # The begin record must be on disk before any byte of the copy
+                os.fsync(self.file.fileno())
+
+    def begin(self, source_path, dest_path, temp_path):
+        """Record that a copy is starting, returning its id"""
+        with self.lock:
+            journal_id = self.next_id
+            self.next_id += 1
+        self.write({'op': 'begin', 'id': journal_id, 'source': source_path, 'dest': dest_path, 'temp': temp_path})
+        return journal_id
+
+    def end(self, journal_id):
+        """Record that a copy finished (successfully or with its temp file cleaned up)"""
+        self.write({'op': 'end', 'id': journal_id})
+
+    def close(self, completed=True):
+        """Close the journal, removing it when the transfer ran to completion"""
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+        if completed and os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
@@ -0,0 +1,461 @@
+"""
+MP3/LRC metadata read from memory-mapped headers
+
+Only the bytes describing a file are touched: the text frames of the
+ID3v2 tag at the start (pictures and other large frames are skipped
+over), the first MPEG audio frame with its Xing/Info or VBRI header, and
+the 128-byte ID3v1 tag at the end. Files are memory-mapped, so the pages
+holding those bytes are the only ones read from disk. LRC lyrics are
+small and decoded whole; their duration is the last time stamp.
+
+Results are cached keyed on path, size and mtime in metadata_cache.json,
+and files missing from the cache are parsed on a thread pool.
+"""
+
+import json
+import mmap
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .names import name_key
+
+
+CACHE_VERSION = 1
+DEFAULT_METADATA_WORKERS = 8
+MEDIA_EXTENSIONS = ('.mp3', '.lrc')
+# How far past the ID3v2 tag the first MPEG frame is looked for
+FRAME_SEARCH_BYTES = 64 * 1024
+MAX_LRC_BYTES = 1024 * 1024
+# Lyrics may run this many seconds past the end of the audio before they are reported
+LYRICS_TOLERANCE = 2.0
+
+# Legacy tags (ID3v1, ID3v2 "Latin-1" frames) from Chinese and Japanese
+# taggers are usually GBK or Shift-JIS; Latin-1 is the last resort
+LEGACY_ENCODINGS = ('gbk', 'shift_jis')
+# Lead bytes of the common characters of each encoding: GB2312 level 1
+# hanzi and JIS level 1 kanji. Either encoding decodes most text of the
+# other without an error, but into rare characters.
+COMMON_LEAD_BYTES = {'gbk': range(0xB0, 0xD8), 'shift_jis': range(0x88, 0xA0)}
+# How much of a text decode_legacy looks at to pick the encoding
+SCORE_CHARS = 4096
+
+ID3V2_TEXT_FRAMES = {
+    'TIT2': 'title', 'TPE1': 'artist', 'TALB': 'album', 'TLEN': 'length',
+    # ID3v2.2 names
+    'TT2': 'title', 'TP1': 'artist', 'TAL': 'album', 'TLE': 'length',
+}
+
+# Bitrates in kbps by (MPEG-1 or MPEG-2/2.5, layer) and the header's bitrate index
+BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 2.5: (11025, 12000, 8000)}
+MPEG_VERSIONS = {0: 2.5, 2: 2, 3: 1}
+
+LRC_TIME = re.compile(r'\[(\d+):(\d+(?:[.:]\d+)?)\]')
+LRC_TAG = re.compile(r'^\s*\[(ti|ar|al|offset):([^\]]*)\]', re.IGNORECASE | re.MULTILINE)
+LRC_TAG_NAMES = {'ti': 'title', 'ar': 'artist', 'al': 'album'}
+
+
+def legacy_score(text, encoding):
+    """Count the characters of a decoded text that are common in its encoding"""
+    score = 0
+    for char in text[:SCORE_CHARS]:
+        if char < '\x80':
+            continue
+        if encoding == 'shift_jis' and '\u3040' <= char <= '\u30ff':
+            # Hiragana and katakana; half-width katakana do not count
+            score += 1
+            continue
+        encoded = char.encode(encoding)
+        if len(encoded) == 2 and encoded[0] in COMMON_LEAD_BYTES[encoding]:
+            score += 1
+    return score
+
+
+def decode_legacy(raw):
+    """Decode text of unknown encoding
+
+    UTF-8 is taken when it decodes. Otherwise the legacy encoding whose
+    decoding holds the most common characters wins, GBK on a tie.
+    """
+    try:
+        return raw.decode('utf-8')
+    except UnicodeDecodeError:
+        pass
+    best = None
+    for encoding in LEGACY_ENCODINGS:
+        try:
+            text = raw.decode(encoding)
+        except UnicodeDecodeError:
+            continue
+        score = legacy_score(text, encoding)
+        if best is None or score > best[0]:
+            best = (score, text)
+    return best[1] if best is not None else raw.decode('latin-1')
+
+
+def synchsafe(raw):
+    """Decode an ID3v2 synchsafe integer (7 bits per byte)"""
+    value = 0
+    for byte in raw:
+        value = (value << 7) | (byte & 0x7F)
+    return value
+
+
+def decode_text_frame(data):
+    """Decode the first value of an ID3v2 text frame"""
+    if not data:
+        return ''
+    encoding, raw = data[0], data[1:]
+    if encoding == 1:
+        text = raw.decode('utf-16', 'replace')
+    elif encoding == 2:
+        text = raw.decode('utf-16-be', 'replace')
+    elif encoding == 3:
+        text = raw.decode('utf-8', 'replace')
+    else:
+        text = decode_legacy(raw.split(b'\0', 1)[0])
+    return text.split('\0', 1)[0].strip()
+
+
+def parse_id3v2_frames(buf, pos, end, major, unsynchronised):
+    """Read the text frames of an ID3v2 tag between pos and end of buf"""
+    id_length, header_length = (3, 6) if major == 2 else (4, 10)
+    tags = {}
+    while pos + header_length <= end:
+        frame_id = bytes(buf[pos:pos + id_length])
+        if frame_id[0] == 0:
+            # Padding
+            break
+        if major == 2:
+            size = int.from_bytes(buf[pos + 3:pos + 6], 'big')
+            flags = 0
+        elif major == 3:
+            size = int.from_bytes(buf[pos + 4:pos + 8], 'big')
+            flags = int.from_bytes(buf[pos + 8:pos + 10], 'big')
+        else:
+            size = synchsafe(buf[pos + 4:pos + 8])
+            flags = int.from_bytes(buf[pos + 8:pos + 10], 'big')
+        body = pos + header_length
+        pos = body + size
+        if size <= 0 or pos > end:
+            break
+        name = ID3V2_TEXT_FRAMES.get(frame_id.decode('latin-1'))
+        if name is None or name in tags:
+            continue
+        # Compressed or encrypted frames (v2.3: 0x80/0x40, v2.4: 0x08/0x04) are not worth decoding
+        if flags & (0x00C0 if major == 3 else 0x000C):
+            continue
+        data = bytes(buf[body:pos])
+        if major == 4:
+            if flags & 0x0001:
+                # Data length indicator
+                data = data[4:]
+            if flags & 0x0002:
+                data = data.replace(b'\xff\x00', b'\xff')
+        elif unsynchronised:
+            data = data.replace(b'\xff\x00', b'\xff')
+        text = decode_text_frame(data)
+        if text:
+            tags[name] = text
+    return tags
+
+
+def parse_id3v2(buf, size):
+    """Read the ID3v2 tag at the start of a file, returning (tags, offset just past the tag)"""
+    if size < 10 or buf[:3] != b'ID3':
+        return {}, 0
+    major = buf[3]
+    flags = buf[5]
+    tag_size = synchsafe(buf[6:10])
+    end = min(10 + tag_size, size)
+    tag_end = end + (10 if major == 4 and flags & 0x10 else 0)
+    if major not in (2, 3, 4):
+        return {}, tag_end
+    pos = 10
+    if major == 3 and flags & 0x80:
+        # v2.3 unsynchronisation covers frame headers too, so resync the whole tag first
+        buf = bytes(buf[10:end]).replace(b'\xff\x00', b'\xff')
+        pos, end = 0, len(buf)
+    if flags & 0x40 and major >= 3:
+        if major == 3:
+            pos += 4 + int.from_bytes(buf[pos:pos + 4], 'big')
+        else:
+            pos += synchsafe(buf[pos:pos + 4])
+    return parse_id3v2_frames(buf, pos, end, major, False), tag_end
+
+
+def parse_id3v1(buf, size):
+    """Read the ID3v1 tag in the last 128 bytes of a file"""
+    if size < 128 or buf[size - 128:size - 125] != b'TAG':
+        return {}
+    raw = bytes(buf[size - 128:size])
+    tags = {}
+    for name, start in (('title', 3), ('artist', 33), ('album', 63)):
+        text = decode_legacy(raw[start:start + 30].split(b'\0', 1)[0]).strip()
+        if text:
+            tags[name] = text
+    return tags
+
+
+def parse_frame_header(header):
+    """Decode a 32-bit MPEG audio frame header, returning None if it is not a valid one"""
+    if header >> 21 != 0x7FF:
+        return None
+    version_bits = (header >> 19) & 3
+    layer_bits = (header >> 17) & 3
+    bitrate_index = (header >> 12) & 0xF
+    rate_index = (header >> 10) & 3
+    if version_bits == 1 or layer_bits == 0 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    version = MPEG_VERSIONS[version_bits]
+    layer = 4 - layer_bits
+    bitrate = BITRATES[(1 if version == 1 else 2, layer)][bitrate_index]
+    sample_rate = SAMPLE_RATES[version][rate_index]
+    padding = (header >> 9) & 1
+    if layer == 1:
+        samples = 384
+        length = (12000 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 1152 if layer == 2 or version == 1 else 576
+        length = samples // 8 * 1000 * bitrate // sample_rate + padding
+    return {
+        'version': version, 'layer': layer, 'bitrate': bitrate, 'sample_rate': sample_rate,
+        'samples': samples, 'length': length, 'mono': (header >> 6) & 3 == 3,
+    }
+
+
+def find_first_frame(buf, start, size):
+    """Find the first MPEG frame at or after start, returning (offset, header fields) or None"""
+    end = min(size, start + FRAME_SEARCH_BYTES)
+    pos = start
+    while pos + 4 <= end:
+        pos = buf.find(b'\xff', pos, end)
+        if pos < 0 or pos + 4 > size:
+            return None
+        frame = parse_frame_header(int.from_bytes(buf[pos:pos + 4], 'big'))
+        if frame is not None:
+            # A stray 0xFF in the data is not followed by a second matching frame
+            following = pos + frame['length']
+            if following + 4 > size:
+                return pos, frame
+            other = parse_frame_header(int.from_bytes(buf[following:following + 4], 'big'))
+            if other is not None and (other['version'], other['layer'], other['sample_rate']) == (frame['version'], frame['layer'], frame['sample_rate']):
+                return pos, frame
+        pos += 1
+    return None
+
+
+def parse_mpeg(buf, start, size, audio_end):
+    """Duration and bitrate from the first frame, using its Xing/Info or VBRI header when present"""
+    found = find_first_frame(buf, start, size)
+    if found is None:
+        return {}
+    offset, frame = found
+    info = {'sample_rate': frame['sample_rate'], 'vbr': False}
+    frames = None
+    stream_bytes = None
+    if frame['version'] == 1:
+        side_info = 17 if frame['mono'] else 32
+    else:
+        side_info = 9 if frame['mono'] else 17
+    xing = offset + 4 + side_info
+    vbri = offset + 4 + 32
+    if buf[xing:xing + 4] in (b'Xing', b'Info'):
+        info['vbr'] = buf[xing:xing + 4] == b'Xing'
+        flags = int.from_bytes(buf[xing + 4:xing + 8], 'big')
+        field = xing + 8
+        if flags & 1:
+            frames = int.from_bytes(buf[field:field + 4], 'big')
+            field += 4
+        if flags & 2:
+            stream_bytes = int.from_bytes(buf[field:field + 4], 'big')
+    elif buf[vbri:vbri + 4] == b'VBRI':
+        info['vbr'] = True
+        stream_bytes = int.from_bytes(buf[vbri + 10:vbri + 14], 'big')
+        frames = int.from_bytes(buf[vbri + 14:vbri + 18], 'big')
+
+    audio_bytes = max(0, audio_end - offset)
+    if frames:
+        duration = frames * frame['samples'] / frame['sample_rate']
+        info['duration'] = duration
+        info['bitrate'] = round((stream_bytes or audio_bytes) * 8 / duration / 1000) if duration else frame['bitrate']
+    else:
+        # Constant bitrate: every frame has the first frame's bitrate
+        info['bitrate'] = frame['bitrate']
+        info['duration'] = audio_bytes * 8 / (frame['bitrate'] * 1000)
+    return info
+
+
+def read_mp3(buf, size):
+    """Tags, duration and bitrate of an MP3"""
+    tags, audio_start = parse_id3v2(buf, size)
+    id3v1 = parse_id3v1(buf, size)
+    for name, text in id3v1.items():
+        tags.setdefault(name, text)
+    metadata = {name: tags[name] for name in ('title', 'artist', 'album') if name in tags}
+    audio_end = size - 128 if size >= 128 and buf[size - 128:size - 125] == b'TAG' else size
+    metadata.update(parse_mpeg(buf, audio_start, size, audio_end))
+    if 'duration' not in metadata and tags.get('length', '').isdigit():
+        metadata['duration'] = int(tags['length']) / 1000
+    return metadata
+
+
+def read_lrc(buf, size):
+    """Tags and duration (last time stamp) of LRC lyrics"""
+    raw = bytes(buf[:min(size, MAX_LRC_BYTES)])
+    if raw.startswith(b'\xef\xbb\xbf'):
+        text = raw[3:].decode('utf-8', 'replace')
+    elif raw.startswith((b'\xff\xfe', b'\xfe\xff')):
+        text = raw.decode('utf-16', 'replace')
+    else:
+        text = decode_legacy(raw)
+    metadata = {}
+    offset = 0.0
+    for name, value in LRC_TAG.findall(text):
+        name = name.lower()
+        value = value.strip()
+        if name == 'offset':
+            try:
+                # A positive offset shows the lyrics earlier
+                offset = int(value) / 1000
+            except ValueError:
+                pass
+        elif value:
+            metadata.setdefault(LRC_TAG_NAMES[name], value)
+    times = [int(minutes) * 60 + float(seconds.replace(':', '.')) for minutes, seconds in LRC_TIME.findall(text)]
+    if times:
+        metadata['duration'] = max(0.0, max(times) - offset)
+    return metadata
+
+
+def read_metadata(path, size=None):
+    """Parse the metadata of an MP3 or LRC file, mapping only the pages that are needed"""
+    if size is None:
+        size = os.path.getsize(path)
+    reader = read_lrc if os.path.splitext(path)[1].lower() == '.lrc' else read_mp3
+    if size == 0:
+        # Empty files cannot be mapped
+        return {}
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            return reader(buf, size)
+
+
+def tag_key(metadata):
+    """Normalized (artist, title) of an MP3, or None without a title tag"""
+    if not metadata or not metadata.get('title'):
+        return None
+    return name_key(metadata.get('artist', '')), name_key(metadata['title'])
+
+
+def lyrics_overrun(lyrics, audio):
+    """Seconds the lyrics run past the end of the audio beyond LYRICS_TOLERANCE, or None when they fit"""
+    if not lyrics or not audio or 'duration' not in lyrics or 'duration' not in audio:
+        return None
+    overrun = lyrics['duration'] - audio['duration']
+    return overrun if overrun > LYRICS_TOLERANCE else None
+
+
+class MetadataCache:
+    """Persistent cache of MP3/LRC metadata"""
+
+    def __init__(self, cache_file):
+        self.cache_file = cache_file
+        # path -> [size, mtime_ns, metadata]
+        self.entries = {}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.parsed_files = 0
+
+    def load(self):
+        """Load the cache file, starting empty if it is missing or unreadable"""
+        with self.lock:
+            self.entries = {}
+            self.dirty = False
+            if not os.path.exists(self.cache_file):
+                return False
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return False
+            if data.get('version') != CACHE_VERSION:
+                return False
+            self.entries = data.get('entries', {})
+            return True
+
+    def save(self):
+        """Write the cache file if anything changed, dropping files that no longer exist"""
+        with self.lock:
+            if not self.dirty:
+                return
+            self.entries = {path: entry for path, entry in self.entries.items() if os.path.exists(path)}
+            data = {'version': CACHE_VERSION, 'entries': self.entries}
+            tmp_file = self.cache_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.cache_file)
+            self.dirty = False
+
+    def cached(self, path, size, mtime_ns):
+        """Cached metadata of a file, or None when it changed or was never parsed"""
+        with self.lock:
+            entry = self.entries.get(os.path.abspath(path))
+        if entry is not None and entry[0] == size and entry[1] == mtime_ns:
+            return entry[2]
+        return None
+
+    def get(self, path, size=None, mtime_ns=None):
+        """Metadata of a file, parsed unless the cache holds it for the same size and mtime"""
+        if size is None or mtime_ns is None:
+            stat_result = os.stat(path)
+            size, mtime_ns = stat_result.st_size, stat_result.st_mtime_ns
+        metadata = self.cached(path, size, mtime_ns)
+        if metadata is not None:
+            return metadata
+        metadata = read_metadata(path, size)
+        with self.lock:
+            self.entries[os.path.abspath(path)] = [size, mtime_ns, metadata]
+            self.dirty = True
+            self.parsed_files += 1
+        return metadata
+
+    def get_many(self, files, workers=DEFAULT_METADATA_WORKERS, control=None):
+        """Metadata of many (path, size, mtime_ns) files, parsing the uncached ones in parallel
+
+        Size and mtime may be None, in which case the file is stat'ed on
+        the pool. Returns {path: metadata}; files that cannot be read map
+        to None. control.check() is called as results come in.
+        """
+        results = {}
+        missing = []
+        for path, size, mtime_ns in files:
+            metadata = None if size is None else self.cached(path, size, mtime_ns)
+            if metadata is None:
+                missing.append((path, size, mtime_ns))
+            else:
+                results[path] = metadata
+        if not missing:
+            return results
+
+        def parse(file):
+            try:
+                return self.get(*file)
+            except (OSError, ValueError):
+                return None
+
+        with ThreadPoolExecutor(max_workers=max(1, min(workers, len(missing))), thread_name_prefix='metadata') as executor:
+            for (path, size, mtime_ns), metadata in zip(missing, executor.map(parse, missing)):
+                if control is not None:
+                    control.check()
+                results[path] = metadata
+        return results
@@ -0,0 +1,161 @@
+"""
+Per-phase timing and counters for engine operations
+
+Each operation records the wall time spent in its phases (walk, match,
+remove, rename, list-destination, copy, ...) together with file,
+directory, byte and error counters, overall and per search root. Reports
+are attached to the operation's summary event and appended to
+metrics.json next to config.json; optionally the latest run of every
+operation is also written in the Prometheus text format to metrics.prom.
+
+Per-root times add up work done on the walker threads, so for roots
+walked concurrently they can be larger than the wall time of the phase.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+
+METRICS_VERSION = 1
+MAX_RUNS = 500
+COUNTERS = ('files', 'directories', 'skipped', 'bytes', 'errors')
+
+
+class Metrics:
+    """Wall time and counters per phase, optionally broken down per search root"""
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.started = time.time()
+        self.started_counter = time.perf_counter()
+        # phase -> {'seconds': float, counter: int}
+        self.phases = {}
+        # root -> phase -> {'seconds': float, counter: int}
+        self.roots = {}
+        self.root_labels = {}
+        self.lock = threading.Lock()
+
+    def add(self, phase, seconds=0.0, root=None, **counters):
+        """Add time and counters to a phase, and to its per-root breakdown when root is given"""
+        with self.lock:
+            targets = [self.phases.setdefault(phase, {'seconds': 0.0})]
+            if root is not None:
+                targets.append(self.roots.setdefault(root, {}).setdefault(phase, {'seconds': 0.0}))
+            for target in targets:
+                target['seconds'] += seconds
+                for name, amount in counters.items():
+                    target[name] = target.get(name, 0) + amount
+
+    @contextmanager
+    def phase(self, phase, root=None, **counters):
+        """Time a block as part of a phase"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(phase, time.perf_counter() - started, root, **counters)
+
+    def label_roots(self, labels):
+        """Report roots under display names ({root key: label}) instead of their keys"""
+        self.root_labels.update(labels)
+
+    def report(self):
+        """Snapshot of the metrics as a JSON-serializable dict"""
+        with self.lock:
+            return {
+                'operation': self.operation,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'timestamp': self.started,
+                'seconds': time.perf_counter() - self.started_counter,
+                'phases': {phase: dict(values) for phase, values in self.phases.items()},
+                'roots': {
+                    self.root_labels.get(root, root): {phase: dict(values) for phase, values in phases.items()}
+                    for root, phases in self.roots.items()
+                },
+            }
+
+
+def prometheus_label(value):
+    """Escape a Prometheus label value"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(reports):
+    """Render the latest report of every operation in the Prometheus text exposition format"""
+    lines = [
+        "# HELP clpatch_run_seconds Wall time of the last run of an operation",
+        "# TYPE clpatch_run_seconds gauge",
+    ]
+    for report in reports:
+        lines.append(f'clpatch_run_seconds{{operation="{prometheus_label(report["operation"])}"}} {report["seconds"]:.6f}')
+    lines += [
+        "# HELP clpatch_run_timestamp_seconds Start time of the last run of an operation",
+        "# TYPE clpatch_run_timestamp_seconds gauge",
+    ]
+    for report in reports:
+        lines.append(f'clpatch_run_timestamp_seconds{{operation="{prometheus_label(report["operation"])}"}} {report["timestamp"]:.3f}')
+
+    lines += [
+        "# HELP clpatch_phase_seconds Wall time of a phase in the last run of an operation",
+        "# TYPE clpatch_phase_seconds gauge",
+    ]
+    counter_lines = [
+        "# HELP clpatch_phase_total Files, directories, skipped directories, bytes or errors handled by a phase in the last run",
+        "# TYPE clpatch_phase_total gauge",
+    ]
+    for report in reports:
+        operation = prometheus_label(report['operation'])
+        scopes = [('', report['phases'])]
+        scopes += [(f',root="{prometheus_label(root)}"', phases) for root, phases in report['roots'].items()]
+        for root_label, phases in scopes:
+            for phase, values in phases.items():
+                labels = f'operation="{operation}",phase="{prometheus_label(phase)}"{root_label}'
+                lines.append(f'clpatch_phase_seconds{{{labels}}} {values["seconds"]:.6f}')
+                for name in COUNTERS:
+                    if name in values:
+                        counter_lines.append(f'clpatch_phase_total{{{labels},counter="{name}"}} {values[name]}')
+    return '\n'.join(lines + counter_lines) + '\n'
+
+
+class MetricsStore:
+    """History of run reports in metrics.json, plus an optional metrics.prom"""
+
+    def __init__(self, metrics_file, prometheus_file=None):
+        self.metrics_file = metrics_file
+        self.prometheus_file = prometheus_file
+        self.lock = threading.Lock()
+
+    def load(self):
+        """Read the stored runs, oldest first"""
+        if not os.path.exists(self.metrics_file):
+            return []
+        try:
+            with open(self.metrics_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        if data.get('version') != METRICS_VERSION:
+            return []
+        return data.get('runs', [])
+
+    def append(self, report, prometheus=False):
+        """Add a run report, keeping the newest MAX_RUNS"""
+        with self.lock:
+            runs = (self.load() + [report])[-MAX_RUNS:]
+            data = {'version': METRICS_VERSION, 'runs': runs}
+            tmp_file = self.metrics_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            os.replace(tmp_file, self.metrics_file)
+
+            if prometheus and self.prometheus_file:
+                latest = {}
+                for run in runs:
+                    latest[run['operation']] = run
+                tmp_file = self.prometheus_file + '.tmp'
+                with open(tmp_file, 'w', encoding='utf-8') as f:
+                    f.write(prometheus_text(list(latest.values())))
+                os.replace(tmp_file, self.prometheus_file)
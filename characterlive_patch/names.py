@@ -0,0 +1,134 @@
+"""
+Normalized song name keys and an n-gram index over file names
+
+The same title can be spelled several ways: full-width or half-width
+Latin letters, digits and katakana, composed or decomposed kana, upper or
+lower case. name_key() folds all of them into one form (NFKC, case-folded)
+and song names are always compared with file names through their keys.
+
+NameIndex keeps the key of every searchable file together with posting
+lists of the files containing each character and each character pair.
+A one or two character query is answered by its posting list alone;
+longer queries intersect the posting lists of their character pairs,
+shortest first, and only check the few files left. Counting matches while
+the user types does not intersect at all: it checks the files of the
+shortest posting list and stops at COUNT_LIMIT matches or after
+COUNT_BUDGET seconds, so a common name never holds up a keystroke.
+"""
+
+import os
+import time
+import unicodedata
+from array import array
+from functools import lru_cache
+
+
+# Posting lists are intersected until at most this many candidates are left
+VERIFY_LIMIT = 256
+# Folded non-ASCII names kept for reuse; the cache is emptied whenever the name index is rebuilt
+FOLD_CACHE_SIZE = 1 << 16
+# count_within() stops at this many matches or after this many seconds
+COUNT_LIMIT = 1000
+COUNT_BUDGET = 0.02
+# Matches checked between two looks at the clock
+COUNT_CLOCK_STRIDE = 1024
+
+
+@lru_cache(maxsize=FOLD_CACHE_SIZE)
+def fold_name(text):
+    """NFKC-normalize and case-fold a non-ASCII name"""
+    return unicodedata.normalize('NFKC', unicodedata.normalize('NFKC', text).casefold())
+
+
+def name_key(text):
+    """Fold a song or file name into its comparison key"""
+    if text.isascii():
+        return text.lower()
+    return fold_name(text)
+
+
+def stem_key(key):
+    """Key of the name without its extension"""
+    return os.path.splitext(key)[0]
+
+
+class NameIndex:
+    """Normalized keys of the searchable files with character and pair posting lists"""
+
+    def __init__(self):
+        # file id -> (root path, file path)
+        self.files = []
+        self.keys = []
+        # stem key -> file ids, for exact queries
+        self.stems = {}
+        # character or character pair -> array of file ids in ascending order
+        self.postings = {}
+        # What the index was built from: (root paths, SongIndex generation)
+        self.source = None
+
+    def __len__(self):
+        return len(self.files)
+
+    def add(self, root_path, dir_path, file):
+        """Index one file"""
+        file_id = len(self.files)
+        key = name_key(file)
+        self.files.append((root_path, os.path.join(dir_path, file)))
+        self.keys.append(key)
+        self.stems.setdefault(stem_key(key), []).append(file_id)
+        postings = self.postings
+        # Ids only grow, so a file already in a posting list is its last entry
+        for gram in [key[i:i + 2] for i in range(len(key) - 1)] + list(key):
+            posting = postings.get(gram)
+            if posting is None:
+                posting = postings[gram] = array('i')
+            if not posting or posting[-1] != file_id:
+                posting.append(file_id)
+
+    def matches(self, song_name, exact=False, intersect=True):
+        """Iterate over the ids of the files matching a song name, as song_name_matcher would decide
+
+        Without intersect, the files of the shortest posting list are checked
+        one by one, which starts yielding at once.
+        """
+        query = name_key(song_name)
+        if exact:
+            return iter(self.stems.get(query, ()))
+        if not query:
+            return iter(range(len(self.files)))
+        if len(query) <= 2:
+            return iter(self.postings.get(query, ()))
+        lists = sorted((self.postings.get(query[i:i + 2], ()) for i in range(len(query) - 1)), key=len)
+        candidates = lists[0]
+        for posting in lists[1:] if intersect else ():
+            # An intersection costs a pass over the longer list, about as much
+            # as checking that many candidates, so stop once it cannot pay off
+            if len(candidates) <= VERIFY_LIMIT or len(posting) > 2 * len(candidates):
+                break
+            candidates = set(candidates).intersection(posting)
+        keys = self.keys
+        return (file_id for file_id in candidates if query in keys[file_id])
+
+    def search(self, song_name, exact=False):
+        """Ids of the files matching a song name, in index order"""
+        return sorted(self.matches(song_name, exact))
+
+    def count(self, song_name, exact=False):
+        """Number of files matching a song name"""
+        return sum(1 for _ in self.matches(song_name, exact))
+
+    def count_within(self, song_name, exact=False, limit=COUNT_LIMIT, budget=COUNT_BUDGET):
+        """(number of matching files, whether that is all of them), stopping at limit matches or after budget seconds"""
+        deadline = time.perf_counter() + budget
+        count = 0
+        for _ in self.matches(song_name, exact, intersect=False):
+            if count == limit:
+                return count, False
+            count += 1
+            if count % COUNT_CLOCK_STRIDE == 0 and time.perf_counter() > deadline:
+                return count, False
+        return count, True
+
+    def paths(self, file_ids):
+        """(root path, file path) of each file id"""
+        return [self.files[file_id] for file_id in file_ids]
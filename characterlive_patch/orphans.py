@@ -0,0 +1,125 @@
+"""
+Cross-project orphan analysis
+
+Songs pass through several folders: MP3/LRC pairs land in the MP3 storage
+folder and are transferred to characterLive/songs/download, singsong keeps
+its inputs in singsong/songs and renders into singsong/output. Each
+location is reduced to a set of song keys (file name without extension
+and "Artist - " prefix, folded by name_key) and set differences between
+the locations show what is left over:
+
+    output-without-source  singsong output whose song is nowhere else
+    unused-download        downloads singsong never used
+    mp3-without-lrc        MP3s without lyrics next to them
+    lrc-without-mp3        lyrics whose MP3 is gone
+
+singsong names its files after the song plus a suffix ("<song>_vocals.wav")
+and may keep them in a folder per song, so a file there belongs to the
+longest known song key that its name or one of its folders starts with.
+"""
+
+import os
+
+from .names import name_key
+
+
+DOWNLOAD = 'characterLive/songs/download'
+SINGSONG_SONGS = 'singsong/songs'
+SINGSONG_OUTPUT = 'singsong/output'
+MP3_STORAGE = 'MP3 storage'
+
+ORPHAN_CATEGORIES = ('output-without-source', 'unused-download', 'mp3-without-lrc', 'lrc-without-mp3')
+PAIRED_EXTENSIONS = ('.mp3', '.lrc')
+
+
+def song_name(name):
+    """Strip the "Artist - " prefix (everything up to the last " - ") from a name"""
+    if " - " in name:
+        name = name[name.rfind(" - ") + 3:]
+    return name.strip()
+
+
+def boundary_prefixes(key):
+    """The key and its prefixes that end before a non-alphanumeric character, longest first"""
+    yield key
+    for i in range(len(key) - 1, 0, -1):
+        if not key[i].isalnum():
+            yield key[:i].rstrip()
+
+
+def group_paired(entries, names):
+    """Group the MP3/LRC files of a flat folder by song key"""
+    groups = {}
+    for root_path, file_path in entries:
+        stem, ext = os.path.splitext(os.path.basename(file_path))
+        if ext.lower() not in PAIRED_EXTENSIONS:
+            continue
+        name = song_name(stem)
+        key = name_key(name)
+        names.setdefault(key, name)
+        groups.setdefault(key, []).append((root_path, file_path))
+    return groups
+
+
+def group_derived(entries, keys, names):
+    """Group singsong files by the known song key they belong to
+
+    Files that belong to no known song are grouped by their top folder
+    below the root, or by their own name when they sit in the root.
+    """
+    groups = {}
+    for root_path, file_path in entries:
+        stem = song_name(os.path.splitext(os.path.basename(file_path))[0])
+        rel_dir = os.path.relpath(os.path.dirname(file_path), root_path)
+        folders = [] if rel_dir == '.' else [song_name(part) for part in rel_dir.split(os.sep)]
+        owner = None
+        for candidate in [stem] + folders:
+            for prefix in boundary_prefixes(name_key(candidate)):
+                if prefix in keys:
+                    if owner is None or len(prefix) > len(owner):
+                        owner = prefix
+                    break
+        if owner is None:
+            name = folders[0] if folders else stem
+            owner = name_key(name)
+            names.setdefault(owner, name)
+        groups.setdefault(owner, []).append((root_path, file_path))
+    return groups
+
+
+def analyze(listings):
+    """Find orphans in {location: [(root path, file path)]}
+
+    Returns a list of findings, dicts with category, song, location and files,
+    a list of (location, root path, file path) triples.
+    """
+    names = {}
+    download = group_paired(listings.get(DOWNLOAD, []), names)
+    storage = group_paired(listings.get(MP3_STORAGE, []), names)
+    source_keys = set(download) | set(storage)
+    songs = group_derived(listings.get(SINGSONG_SONGS, []), source_keys, names)
+    output = group_derived(listings.get(SINGSONG_OUTPUT, []), source_keys | set(songs), names)
+
+    findings = []
+
+    def add(category, location, key, entries):
+        findings.append({
+            'category': category, 'song': names[key], 'location': location,
+            'files': [(location, root_path, file_path) for root_path, file_path in entries],
+        })
+
+    for key, entries in output.items():
+        if key not in source_keys and key not in songs:
+            add('output-without-source', SINGSONG_OUTPUT, key, entries)
+    used = set(songs) | set(output)
+    for key, entries in download.items():
+        if key not in used:
+            add('unused-download', DOWNLOAD, key, entries)
+    for location, groups in ((DOWNLOAD, download), (MP3_STORAGE, storage)):
+        for key, entries in groups.items():
+            extensions = {os.path.splitext(file_path)[1].lower() for root_path, file_path in entries}
+            if '.lrc' not in extensions:
+                add('mp3-without-lrc', location, key, entries)
+            elif '.mp3' not in extensions:
+                add('lrc-without-mp3', location, key, entries)
+    return findings
@@ -0,0 +1,181 @@
+"""
+Orphan report window
+
+Lists the findings of an orphan analysis, largest reclaimable size first.
+Clicking a column heading sorts by it, the category checkboxes filter the
+list, and the selected rows are handed to deletion in one go.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from .formatting import format_bytes
+from .orphans import ORPHAN_CATEGORIES
+
+
+REFRESH_MS = 100
+COLUMNS = ('category', 'song', 'location', 'files', 'size')
+
+
+class OrphanWindow:
+    """Sortable, filterable list of orphan findings"""
+
+    def __init__(self, parent, title, on_confirm):
+        # Orphan events; the analysis thread appends to it while the window reads it
+        self.orphans = []
+        self.finished = False
+        # Why the analysis stopped early ("cancelled" or the error), None once it completed
+        self.error = None
+        self.on_confirm = on_confirm
+        # JobControl of the analysis feeding the window, cancelled when the window closes early
+        self.control = None
+        self.sort_column = 'size'
+        self.sort_reverse = True
+        self.shown_count = -1
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("900x500")
+        self.window.transient(parent)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.summary_label = tk.Label(self.window, text="Analyzing...", anchor='w', justify=tk.LEFT)
+        self.summary_label.pack(fill=tk.X, padx=10, pady=(10, 5))
+
+        filter_frame = tk.Frame(self.window)
+        filter_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
+        self.category_vars = {}
+        for category in ORPHAN_CATEGORIES:
+            var = tk.BooleanVar(value=True)
+            tk.Checkbutton(filter_frame, text=category, variable=var, command=self.render).pack(side=tk.LEFT, padx=(0, 5))
+            self.category_vars[category] = var
+
+        list_frame = tk.Frame(self.window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+        self.tree = ttk.Treeview(list_frame, columns=COLUMNS, show='headings', selectmode='extended')
+        for column, text, width, stretch, anchor in (
+            ('category', 'Category', 160, False, 'w'),
+            ('song', 'Song', 360, True, 'w'),
+            ('location', 'Location', 200, False, 'w'),
+            ('files', 'Files', 50, False, 'e'),
+            ('size', 'Size', 90, False, 'e'),
+        ):
+            self.tree.heading(column, text=text, command=lambda column=column: self.sort_by(column))
+            self.tree.column(column, width=width, stretch=stretch, anchor=anchor)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+        self.tree.config(yscrollcommand=scrollbar.set)
+        self.tree.bind('<<TreeviewSelect>>', lambda e: self.update_summary())
+
+        button_frame = tk.Frame(self.window)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        tk.Button(button_frame, text="Select All", command=lambda: self.tree.selection_set(self.tree.get_children())).pack(side=tk.LEFT)
+        tk.Button(button_frame, text="Select None", command=lambda: self.tree.selection_set(())).pack(side=tk.LEFT, padx=(5, 0))
+        tk.Button(button_frame, text="Close", command=self.close).pack(side=tk.RIGHT)
+        self.delete_button = tk.Button(
+            button_frame, text="Delete Selected", command=self.confirm, state='disabled',
+            bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')
+        )
+        self.delete_button.pack(side=tk.RIGHT, padx=(0, 5))
+        self.window.after(REFRESH_MS, self.poll)
+
+    def add(self, orphan):
+        """Add an orphan event; safe to call from the analysis thread"""
+        self.orphans.append(orphan)
+
+    def finish(self, error=None):
+        """Mark the analysis as over, incomplete when error is set; safe to call from the analysis thread"""
+        self.error = error
+        self.finished = True
+
+    def close(self):
+        """Close the window, stopping the analysis if it is still running"""
+        if not self.finished and self.control is not None:
+            self.control.cancel()
+        self.window.destroy()
+
+    def poll(self):
+        """Show findings reported since the last refresh"""
+        if not self.window.winfo_exists():
+            return
+        if len(self.orphans) != self.shown_count:
+            self.render()
+        if self.finished:
+            self.render()
+            if self.error is None:
+                self.delete_button.config(state='normal')
+        else:
+            self.window.after(REFRESH_MS, self.poll)
+
+    def sort_by(self, column):
+        """Sort by a column; clicking the same heading again reverses the order"""
+        if column == self.sort_column:
+            self.sort_reverse = not self.sort_reverse
+        else:
+            self.sort_column = column
+            self.sort_reverse = column in ('files', 'size')
+        self.render()
+
+    def sort_key(self, index):
+        orphan = self.orphans[index]
+        if self.sort_column == 'size':
+            return orphan['bytes']
+        if self.sort_column == 'files':
+            return len(orphan['files'])
+        return orphan[self.sort_column].casefold()
+
+    def render(self):
+        """Rebuild the rows from the findings, keeping the selection"""
+        self.shown_count = len(self.orphans)
+        selected = set(self.tree.selection())
+        shown = [
+            index for index in range(self.shown_count)
+            if self.category_vars[self.orphans[index]['category']].get()
+        ]
+        shown.sort(key=self.sort_key, reverse=self.sort_reverse)
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        for index in shown:
+            orphan = self.orphans[index]
+            self.tree.insert('', tk.END, iid=str(index), values=(
+                orphan['category'], orphan['song'], orphan['location'], len(orphan['files']), format_bytes(orphan['bytes'])
+            ))
+        self.tree.selection_set([iid for iid in selected if self.tree.exists(iid)])
+        self.update_summary()
+
+    def selected_files(self):
+        """Files of the selected findings as preview matches, each file once"""
+        files = {}
+        for iid in self.tree.selection():
+            for file in self.orphans[int(iid)]['files']:
+                files[file['path']] = (file['root'], file['root_path'], file['path'], file['relative_path'], file['size'])
+        return list(files.values())
+
+    def update_summary(self):
+        reclaimable = {}
+        counts = {}
+        for orphan in self.orphans[:self.shown_count]:
+            counts[orphan['category']] = counts.get(orphan['category'], 0) + 1
+            for file in orphan['files']:
+                reclaimable[file['path']] = file['size']
+        selected = self.selected_files()
+        if not self.finished:
+            state = "Analyzing... found"
+        elif self.error is not None:
+            state = f"Analysis stopped ({self.error}), report incomplete: found"
+        else:
+            state = "Found"
+        lines = [
+            f"{state} {self.shown_count} orphan(s), {format_bytes(sum(reclaimable.values()))} reclaimable; "
+            f"selected {len(selected)} file(s), {format_bytes(sum(match[4] for match in selected))}",
+            "   " + ", ".join(f"{category}: {counts.get(category, 0)}" for category in ORPHAN_CATEGORIES),
+        ]
+        self.summary_label.config(text='\n'.join(lines))
+        self.delete_button.config(text=f"Delete Selected ({len(selected)})")
+
+    def confirm(self):
+        """Hand the files of the selected findings to on_confirm and close"""
+        if self.on_confirm(self.selected_files(), self.window):
+            self.window.destroy()
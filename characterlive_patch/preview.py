@@ -0,0 +1,228 @@
+"""
+Preview window listing matches before they are deleted
+
+Matches are collected on a background thread into a plain list. The list
+is shown in a ttk.Treeview that only ever holds the rows that fit on
+screen; scrolling changes which slice of the list those rows display, so
+the window stays responsive with hundreds of thousands of matches.
+"""
+
+import tkinter as tk
+from tkinter import ttk
+
+from .formatting import format_bytes
+
+
+ROW_HEIGHT = 20
+REFRESH_MS = 100
+CHECKED = '☑'
+UNCHECKED = '☐'
+
+
+class PreviewWindow:
+    """Virtualized, checkable list of matched files"""
+
+    def __init__(self, parent, title, on_confirm):
+        # Each match is (root name, root path, file path, relative path, size);
+        # the collector thread appends to it while the window reads it
+        self.matches = []
+        self.excluded = set()
+        self.finished = False
+        # Why the search stopped early ("cancelled" or the error), None once it completed
+        self.error = None
+        self.on_confirm = on_confirm
+        # JobControl of the search feeding the window, cancelled when the window closes early
+        self.control = None
+        self.offset = 0
+        self.visible_rows = 20
+
+        self.window = tk.Toplevel(parent)
+        self.window.title(title)
+        self.window.geometry("900x500")
+        self.window.transient(parent)
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.summary_label = tk.Label(self.window, text="Searching...", anchor='w', justify=tk.LEFT)
+        self.summary_label.pack(fill=tk.X, padx=10, pady=(10, 5))
+
+        list_frame = tk.Frame(self.window)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10)
+
+        style = ttk.Style(self.window)
+        style.configure('Preview.Treeview', rowheight=ROW_HEIGHT)
+        self.tree = ttk.Treeview(
+            list_frame, columns=('include', 'root', 'path', 'size'), show='headings',
+            selectmode='none', style='Preview.Treeview', height=self.visible_rows
+        )
+        self.tree.heading('include', text='')
+        self.tree.heading('root', text='Root')
+        self.tree.heading('path', text='File')
+        self.tree.heading('size', text='Size')
+        self.tree.column('include', width=30, stretch=False, anchor='center')
+        self.tree.column('root', width=150, stretch=False)
+        self.tree.column('path', width=560)
+        self.tree.column('size', width=90, stretch=False, anchor='e')
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.scrollbar = ttk.Scrollbar(list_frame, orient=tk.VERTICAL, command=self.on_scrollbar)
+        self.scrollbar.pack(side=tk.LEFT, fill=tk.Y)
+
+        self.tree.bind('<Configure>', self.on_resize)
+        self.tree.bind('<Button-1>', self.on_click)
+        self.tree.bind('<MouseWheel>', lambda e: self.scroll_to(self.offset - (e.delta // 120) * 3))
+        self.tree.bind('<Button-4>', lambda e: self.scroll_to(self.offset - 3))
+        self.tree.bind('<Button-5>', lambda e: self.scroll_to(self.offset + 3))
+        self.window.bind('<Prior>', lambda e: self.scroll_to(self.offset - self.visible_rows))
+        self.window.bind('<Next>', lambda e: self.scroll_to(self.offset + self.visible_rows))
+
+        button_frame = tk.Frame(self.window)
+        button_frame.pack(fill=tk.X, padx=10, pady=10)
+        tk.Button(button_frame, text="Select All", command=self.select_all).pack(side=tk.LEFT)
+        tk.Button(button_frame, text="Select None", command=self.select_none).pack(side=tk.LEFT, padx=(5, 0))
+        tk.Button(button_frame, text="Cancel", command=self.close).pack(side=tk.RIGHT)
+        self.delete_button = tk.Button(
+            button_frame, text="Delete Selected", command=self.confirm, state='disabled',
+            bg='#e74c3c', fg='white', font=('Arial', 10, 'bold')
+        )
+        self.delete_button.pack(side=tk.RIGHT, padx=(0, 5))
+
+        self.item_ids = []
+        self.shown_count = -1
+        # Running totals, updated incrementally so a render never walks the whole list
+        self.counted = 0
+        self.per_root = {}
+        self.total_size = 0
+        self.excluded_size = 0
+        self.window.after(REFRESH_MS, self.poll)
+
+    def add(self, root_name, root_path, file_path, relative_path, size):
+        """Add a match; safe to call from the collector thread"""
+        self.matches.append((root_name, root_path, file_path, relative_path, size))
+
+    def finish(self, error=None):
+        """Mark collection as over, incomplete when error is set; safe to call from the collector thread"""
+        self.error = error
+        self.finished = True
+
+    def close(self):
+        """Close the window, stopping the search if it is still running"""
+        if not self.finished and self.control is not None:
+            self.control.cancel()
+        self.window.destroy()
+
+    def poll(self):
+        """Pick up matches collected since the last refresh"""
+        if not self.window.winfo_exists():
+            return
+        if len(self.matches) != self.shown_count:
+            self.render()
+        if self.finished:
+            self.render()
+            # Deleting from an incomplete list would look like deleting every match
+            if self.error is None:
+                self.delete_button.config(state='normal')
+        else:
+            self.window.after(REFRESH_MS, self.poll)
+
+    def on_resize(self, event):
+        rows = max(1, (event.height - ROW_HEIGHT - 4) // ROW_HEIGHT)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.render()
+
+    def on_scrollbar(self, action, value, unit=None):
+        total = len(self.matches)
+        if action == 'moveto':
+            self.scroll_to(int(float(value) * total))
+        elif action == 'scroll':
+            step = self.visible_rows if unit == 'pages' else 1
+            self.scroll_to(self.offset + int(value) * step)
+
+    def scroll_to(self, offset):
+        self.offset = max(0, min(offset, len(self.matches) - self.visible_rows))
+        self.render()
+
+    def on_click(self, event):
+        """Toggle whether the clicked row will be deleted"""
+        item = self.tree.identify_row(event.y)
+        if not item:
+            return
+        index = self.offset + self.item_ids.index(item)
+        if index >= len(self.matches):
+            return
+        size = self.matches[index][4]
+        if index in self.excluded:
+            self.excluded.discard(index)
+            self.excluded_size -= size
+        else:
+            self.excluded.add(index)
+            self.excluded_size += size
+        self.render()
+
+    def select_all(self):
+        self.excluded.clear()
+        self.excluded_size = 0
+        self.render()
+
+    def select_none(self):
+        self.excluded = set(range(self.counted))
+        self.excluded_size = self.total_size
+        self.render()
+
+    def render(self):
+        """Show the visible slice of the match list and refresh the summary"""
+        total = len(self.matches)
+        self.shown_count = total
+        self.offset = max(0, min(self.offset, total - self.visible_rows))
+
+        # Keep exactly visible_rows items in the tree and only rewrite their values
+        while len(self.item_ids) < self.visible_rows:
+            self.item_ids.append(self.tree.insert('', tk.END, values=('', '', '', '')))
+        while len(self.item_ids) > self.visible_rows:
+            self.tree.delete(self.item_ids.pop())
+        for row, item in enumerate(self.item_ids):
+            index = self.offset + row
+            if index < total:
+                root_name, root_path, file_path, relative_path, size = self.matches[index]
+                mark = UNCHECKED if index in self.excluded else CHECKED
+                self.tree.item(item, values=(mark, root_name, relative_path, format_bytes(size)))
+            else:
+                self.tree.item(item, values=('', '', '', ''))
+
+        if total:
+            first = self.offset / total
+            last = min(1.0, (self.offset + self.visible_rows) / total)
+            self.scrollbar.set(first, last)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.update_summary()
+
+    def update_summary(self):
+        # Fold in matches collected since the last summary
+        total = len(self.matches)
+        for root_name, root_path, file_path, relative_path, size in self.matches[self.counted:total]:
+            count, root_size = self.per_root.get(root_name, (0, 0))
+            self.per_root[root_name] = (count + 1, root_size + size)
+            self.total_size += size
+        self.counted = total
+
+        selected = total - len(self.excluded)
+        selected_size = self.total_size - self.excluded_size
+        if not self.finished:
+            state = "Searching... found"
+        elif self.error is not None:
+            state = f"Search stopped ({self.error}), list incomplete: found"
+        else:
+            state = "Found"
+        lines = [f"{state} {total} file(s), {format_bytes(self.total_size)}; "
+                 f"selected {selected} file(s), {format_bytes(selected_size)}"]
+        for root_name, (count, root_size) in self.per_root.items():
+            lines.append(f"   {root_name}: {count} file(s), {format_bytes(root_size)}")
+        self.summary_label.config(text='\n'.join(lines))
+        self.delete_button.config(text=f"Delete Selected ({selected})")
+
+    def confirm(self):
+        """Hand the selected matches to on_confirm and close"""
+        selected = [match for index, match in enumerate(self.matches) if index not in self.excluded]
+        if self.on_confirm(selected, self.window):
+            self.window.destroy()
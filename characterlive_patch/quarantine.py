@@ -0,0 +1,259 @@
+"""
+Staged delete: quarantine folders with an undo journal
+
+Instead of being removed, matched files are renamed into a quarantine
+folder at the top of their own search root (QUARANTINE_DIR/<undo id>/
+<path relative to the root>). The rename stays on the same volume, so it
+is atomic and costs no data copy, and restoring an operation is the same
+bulk rename in reverse. Quarantine folders are pruned from every walk,
+at any depth, since a quarantine root may lie inside a search root.
+
+The undo journal is an append-only JSON-lines file. A 'stage' record is
+written and fsynced before each rename, so a crash never leaves a quarantined file
+that the journal does not know about. Quarantined operations are purged
+(really deleted) once they are older than a maximum age or when the
+quarantine grows past a maximum size, oldest first. The size limit never
+takes the newest operation or one younger than SIZE_GRACE_SECONDS, so a
+large delete stays restorable even when it alone exceeds the limit.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+
+
+QUARANTINE_DIR = '.clpatch-quarantine'
+DEFAULT_MAX_AGE_DAYS = 7
+DEFAULT_MAX_BYTES = 5 * 1024 ** 3
+# Operations the size limit leaves alone for at least this long
+SIZE_GRACE_SECONDS = 86400
+# Background purges run this often and sleep this long between files
+PURGE_INTERVAL = 3600
+PURGE_PAUSE = 0.01
+
+
+def new_undo_id():
+    """Make a sortable, unique id for a staged operation"""
+    return time.strftime('%Y%m%d-%H%M%S') + '-' + os.urandom(2).hex()
+
+
+def remove_empty_dirs(top):
+    """Remove top and any folders below it that are empty"""
+    for dir_path, subdirs, files in os.walk(top, topdown=False):
+        try:
+            os.rmdir(dir_path)
+        except OSError:
+            pass
+
+
+class Quarantine:
+    """Undo journal and quarantine folders of staged deletes"""
+
+    def __init__(self, journal_file):
+        self.journal_file = journal_file
+        self.lock = threading.RLock()
+        # undo id -> {'id', 'time', 'label', 'files': {quarantine path: stage record}}
+        self.operations = {}
+        # Operations still being staged; compact() and purges leave them alone
+        self.active = set()
+        self.file = None
+
+    def load(self):
+        """Replay the journal into the list of restorable operations"""
+        with self.lock:
+            self.operations = {}
+            if not os.path.exists(self.journal_file):
+                return False
+            with open(self.journal_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A torn last line from a crash
+                        continue
+                    self.apply(record)
+            # Operations whose files were all restored or purged are gone
+            for undo_id in [undo_id for undo_id, op in self.operations.items() if not op['files']]:
+                del self.operations[undo_id]
+            return True
+
+    def apply(self, record):
+        """Update the in-memory state with one journal record"""
+        undo_id = record.get('id')
+        kind = record.get('op')
+        if kind == 'begin':
+            self.operations[undo_id] = {'id': undo_id, 'time': record['time'], 'label': record.get('label', ''), 'files': {}}
+        elif undo_id not in self.operations:
+            return
+        elif kind == 'stage':
+            self.operations[undo_id]['files'][record['quarantine']] = record
+        elif kind == 'unstage':
+            self.operations[undo_id]['files'].pop(record['quarantine'], None)
+        elif kind == 'purge':
+            del self.operations[undo_id]
+
+    def write(self, record):
+        """Append a record to the journal and apply it"""
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.journal_file, 'a', encoding='utf-8')
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.file.flush()
+            if record['op'] == 'stage':
+                # The stage record must be on disk before the file is moved
+                os.fsync(self.file.fileno())
+            self.apply(record)
+
+    def close(self):
+        """Close the journal file"""
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+    def compact(self):
+        """Rewrite the journal with only the operations that can still be restored"""
+        with self.lock:
+            self.close()
+            live = [op for op in self.operations.values() if op['files'] or op['id'] in self.active]
+            self.operations = {op['id']: op for op in live}
+            if not live:
+                if os.path.exists(self.journal_file):
+                    os.remove(self.journal_file)
+                return
+            tmp_file = self.journal_file + '.tmp'
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                for op in live:
+                    f.write(json.dumps({'op': 'begin', 'id': op['id'], 'time': op['time'], 'label': op['label']}, ensure_ascii=False) + '\n')
+                    for record in op['files'].values():
+                        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            os.replace(tmp_file, self.journal_file)
+
+    def begin(self, label):
+        """Start a staged operation, returning its undo id"""
+        undo_id = new_undo_id()
+        with self.lock:
+            self.active.add(undo_id)
+            self.write({'op': 'begin', 'id': undo_id, 'time': time.time(), 'label': label})
+        return undo_id
+
+    def stage(self, undo_id, root_name, root_path, file_path):
+        """Move a file into its root's quarantine, returning its size"""
+        rel_path = os.path.relpath(file_path, root_path)
+        quarantine_path = os.path.join(root_path, QUARANTINE_DIR, undo_id, rel_path)
+        size = os.path.getsize(file_path)
+        os.makedirs(os.path.dirname(quarantine_path), exist_ok=True)
+        self.write({
+            'op': 'stage', 'id': undo_id, 'root': root_name, 'root_path': root_path,
+            'original': file_path, 'quarantine': quarantine_path, 'size': size,
+        })
+        try:
+            os.rename(file_path, quarantine_path)
+        except OSError:
+            self.write({'op': 'unstage', 'id': undo_id, 'quarantine': quarantine_path})
+            raise
+        return size
+
+    def end(self, undo_id):
+        """Make every record of a staged operation durable and close it"""
+        with self.lock:
+            self.active.discard(undo_id)
+            if self.file is not None:
+                os.fsync(self.file.fileno())
+
+    def list_operations(self):
+        """Restorable operations, newest first, as dicts with id, time, label, files and bytes"""
+        with self.lock:
+            return [
+                {
+                    'id': op['id'], 'time': op['time'], 'label': op['label'],
+                    'files': len(op['files']), 'bytes': sum(record['size'] for record in op['files'].values()),
+                }
+                for op in sorted(self.operations.values(), key=lambda op: op['time'], reverse=True)
+                if op['files'] and op['id'] not in self.active
+            ]
+
+    def restore(self, undo_id):
+        """Rename every file of an operation back, yielding (stage record, error message or None)"""
+        with self.lock:
+            op = self.operations.get(undo_id)
+            records = list(op['files'].values()) if op else []
+        for record in records:
+            original = record['original']
+            quarantine_path = record['quarantine']
+            error = None
+            if not os.path.exists(quarantine_path):
+                # Staged just before a crash and never moved, or removed by hand
+                self.write({'op': 'unstage', 'id': undo_id, 'quarantine': quarantine_path})
+                continue
+            if os.path.exists(original):
+                error = "a file with the original name exists again"
+            else:
+                try:
+                    os.makedirs(os.path.dirname(original), exist_ok=True)
+                    os.rename(quarantine_path, original)
+                    self.write({'op': 'unstage', 'id': undo_id, 'quarantine': quarantine_path})
+                except OSError as e:
+                    error = str(e)
+            yield record, error
+        self.remove_operation_dirs(records, undo_id)
+        self.compact()
+
+    def remove_operation_dirs(self, records, undo_id):
+        """Remove the now empty quarantine folders an operation used"""
+        for root_path in {record['root_path'] for record in records}:
+            remove_empty_dirs(os.path.join(root_path, QUARANTINE_DIR, undo_id))
+            try:
+                os.rmdir(os.path.join(root_path, QUARANTINE_DIR))
+            except OSError:
+                pass
+
+    def expired(self, max_age_days=DEFAULT_MAX_AGE_DAYS, max_bytes=DEFAULT_MAX_BYTES, now=None):
+        """Undo ids to purge: older than max_age_days, then oldest first while over max_bytes
+
+        The size limit skips the newest operation and any operation younger
+        than SIZE_GRACE_SECONDS.
+        """
+        now = time.time() if now is None else now
+        operations = sorted(self.list_operations(), key=lambda op: op['time'])
+        expired = []
+        total = sum(op['bytes'] for op in operations)
+        for op in operations:
+            too_old = max_age_days is not None and now - op['time'] > max_age_days * 86400
+            too_big = (
+                max_bytes is not None and total > max_bytes
+                and op is not operations[-1] and now - op['time'] >= SIZE_GRACE_SECONDS
+            )
+            if too_old or too_big:
+                expired.append(op['id'])
+                total -= op['bytes']
+        return expired
+
+    def purge(self, undo_id, pause=0.0):
+        """Delete the quarantined files of an operation for good, returning (files, bytes)
+
+        pause seconds are slept between files so a background purge
+        leaves disk bandwidth to foreground work.
+        """
+        with self.lock:
+            op = self.operations.get(undo_id)
+            records = list(op['files'].values()) if op else []
+        files = 0
+        size = 0
+        for record in records:
+            try:
+                os.remove(record['quarantine'])
+                files += 1
+                size += record['size']
+            except FileNotFoundError:
+                pass
+            if pause:
+                time.sleep(pause)
+        for root_path in {record['root_path'] for record in records}:
+            shutil.rmtree(os.path.join(root_path, QUARANTINE_DIR, undo_id), ignore_errors=True)
+        self.remove_operation_dirs(records, undo_id)
+        self.write({'op': 'purge', 'id': undo_id})
+        self.compact()
+        return files, size
@@ -0,0 +1,102 @@
+"""
+Configurable search roots and their directory pruning rules
+
+Search roots come from the search_roots list in config.json. Each entry
+names a folder inside one of the projects (or an absolute folder) plus
+optional rules:
+
+    include    file name globs; only matching files are considered
+    exclude    directory or file globs; matching directories are never
+               listed, matching files are ignored
+    max_depth  how many directory levels below the root are walked
+
+Globs without a '/' match the entry name, globs with a '/' match the
+path relative to the root (always written with '/').
+"""
+
+import fnmatch
+import os
+
+
+PROJECTS = {
+    'characterlive': 'characterlive_path',
+    'singsong': 'singsong_path',
+    'sovits': 'sovits_path',
+}
+
+# so-vits-svc keeps training output next to its inference folders
+SOVITS_EXCLUDE = ['logs', 'checkpoints', 'pretrain', 'dataset*', 'filelists', '.git', '__pycache__']
+
+DEFAULT_SEARCH_ROOTS = [
+    {'name': 'characterLive/songs', 'project': 'characterlive', 'path': 'songs'},
+    {'name': 'singsong/songs', 'project': 'singsong', 'path': 'songs'},
+    {'name': 'singsong/output', 'project': 'singsong', 'path': 'output'},
+    {'name': 'so-vits-svc/raw', 'project': 'sovits', 'path': 'raw', 'exclude': SOVITS_EXCLUDE},
+    {'name': 'so-vits-svc/results', 'project': 'sovits', 'path': 'results', 'exclude': SOVITS_EXCLUDE},
+]
+
+
+class RootRules:
+    """Include/exclude globs and a depth limit for one search root"""
+
+    def __init__(self, include=(), exclude=(), max_depth=None):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.max_depth = max_depth
+
+    @staticmethod
+    def matches(patterns, name, rel_path):
+        """Whether a name or root-relative path matches any of the globs"""
+        for pattern in patterns:
+            if fnmatch.fnmatch(rel_path if '/' in pattern else name, pattern):
+                return True
+        return False
+
+    def apply(self, rel_dir, files, subdirs):
+        """Filter one directory listing, returning (files, subdirs, skipped directory count)"""
+        depth = 0 if rel_dir == '.' else rel_dir.count(os.sep) + 1
+        prefix = '' if rel_dir == '.' else rel_dir.replace(os.sep, '/') + '/'
+
+        if self.max_depth is not None and depth >= self.max_depth:
+            kept_dirs = []
+        elif self.exclude:
+            kept_dirs = [name for name in subdirs if not self.matches(self.exclude, name, prefix + name)]
+        else:
+            kept_dirs = subdirs
+
+        if self.include or self.exclude:
+            files = [
+                name for name in files
+                if (not self.include or self.matches(self.include, name, prefix + name))
+                and not self.matches(self.exclude, name, prefix + name)
+            ]
+        return files, kept_dirs, len(subdirs) - len(kept_dirs)
+
+
+def resolve_search_roots(root_configs, project_paths):
+    """Turn search_roots config entries into (name, path, rules) triples
+
+    project_paths maps characterlive_path/singsong_path/sovits_path to the
+    project folders; roots of projects without a path are left out.
+    Raises ValueError for malformed entries.
+    """
+    roots = []
+    for entry in root_configs:
+        if not isinstance(entry, dict) or 'path' not in entry:
+            raise ValueError(f"search root needs a 'path': {entry!r}")
+        project = entry.get('project')
+        if project is None:
+            path = entry['path']
+        elif project in PROJECTS:
+            project_path = project_paths.get(PROJECTS[project])
+            if not project_path:
+                continue
+            path = os.path.join(project_path, entry['path'])
+        else:
+            raise ValueError(f"unknown project {project!r} in search root {entry.get('name', entry['path'])!r}")
+        max_depth = entry.get('max_depth')
+        if max_depth is not None and (not isinstance(max_depth, int) or max_depth < 0):
+            raise ValueError(f"max_depth must be a non-negative integer in search root {entry.get('name', path)!r}")
+        rules = RootRules(entry.get('include', ()), entry.get('exclude', ()), max_depth)
+        roots.append((entry.get('name', path), path, rules))
+    return roots
@@ -0,0 +1,47 @@
+"""
+Startup timing for the GUI
+
+The window records when each startup step finished, in seconds since the
+main script started: the imports, the Tk root, the widgets, the first
+window on screen (the root window's first <Map> event) and the deferred
+loading of the index, caches and path checks. With --profile-startup the marks are written to
+logs/startup_profile.json and the application exits once it is ready, so
+build.ps1 can compare the startup of its build profiles.
+
+A onefile build unpacks itself before Python starts; that time only shows
+up when the launcher compares its own clock with 'started'.
+"""
+
+import json
+import os
+import time
+
+
+STARTUP_MARKS = ('imports', 'tk', 'widgets', 'first-window', 'loaded', 'ready')
+
+
+class StartupProfile:
+    """Named startup marks in seconds since the process started running Python"""
+
+    def __init__(self, started=None):
+        self.started = time.time() if started is None else started
+        self.marks = {}
+
+    def mark(self, name):
+        """Record that a startup step finished now"""
+        self.marks.setdefault(name, time.time() - self.started)
+
+    def report(self):
+        """One line per recorded mark"""
+        return [f"{name:<14}{self.marks[name] * 1000:8.0f} ms" for name in STARTUP_MARKS if name in self.marks]
+
+    def save(self, path):
+        """Write the marks as JSON, with 'started' as a Unix timestamp"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = {
+            'started': self.started,
+            'pid': os.getpid(),
+            'marks': {name: round(seconds, 4) for name, seconds in self.marks.items()},
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
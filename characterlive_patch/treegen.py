@@ -0,0 +1,123 @@
+"""
+Synthetic song trees for benchmarking
+
+Builds characterLive/songs, singsong/songs, singsong/output and an MP3
+storage folder that look like the real projects: songs nested a few
+folders deep, a mix of CJK and Latin names, MP3 storage files with
+"Artist - " prefixes and LRC lyrics next to MP3s. Generation is seeded,
+so the same parameters always produce the same tree.
+"""
+
+import os
+import random
+
+
+CJK_CHARS = "春夏秋冬花月風雪夜星空海雨光影心夢歌恋君僕桜青紅白黒千年愛声永遠明日道"
+LATIN_WORDS = ("love", "night", "star", "dream", "summer", "rain", "light", "heart", "blue", "road", "sky", "memory")
+ARTISTS = ("YOASOBI", "米津玄師", "Aimer", "ヨルシカ", "LiSA", "周杰伦", "Ado", "King Gnu")
+
+
+class TreeParams:
+    """Shape of a generated tree"""
+
+    def __init__(self, files=1000, depth=2, fanout=8, cjk_ratio=0.5, artist_ratio=0.3,
+                 min_size=4 * 1024, max_size=64 * 1024, seed=0):
+        self.files = files
+        self.depth = depth
+        self.fanout = fanout
+        self.cjk_ratio = cjk_ratio
+        self.artist_ratio = artist_ratio
+        self.min_size = min_size
+        self.max_size = max_size
+        self.seed = seed
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def song_name(rng, cjk_ratio, number):
+    """Make a unique song name; the number keeps names distinct"""
+    if rng.random() < cjk_ratio:
+        stem = ''.join(rng.choice(CJK_CHARS) for _ in range(rng.randint(2, 6)))
+    else:
+        stem = ' '.join(rng.choice(LATIN_WORDS) for _ in range(rng.randint(1, 3)))
+    return f"{stem}{number:05d}"
+
+
+def nested_dir(rng, depth, fanout):
+    """Pick a relative folder up to depth levels deep"""
+    parts = [f"d{rng.randrange(fanout)}" for _ in range(rng.randint(0, depth))]
+    return os.path.join(*parts) if parts else ''
+
+
+class TreeWriter:
+    """Writes files whose content comes from one shared random block"""
+
+    def __init__(self, rng, params):
+        self.rng = rng
+        self.params = params
+        self.block = rng.randbytes(params.max_size) if hasattr(rng, 'randbytes') else os.urandom(params.max_size)
+        self.file_count = 0
+        self.byte_count = 0
+
+    def write(self, path, tag):
+        size = self.rng.randint(self.params.min_size, self.params.max_size)
+        # Start each file with its own tag so files of the same size differ in content
+        header = tag.encode('utf-8')[:size]
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(self.block[:size - len(header)])
+        self.file_count += 1
+        self.byte_count += size
+
+
+def generate_tree(base_dir, params):
+    """Generate a synthetic tree under base_dir and describe it
+
+    Returns a dict with characterlive_path, singsong_path, mp3_storage_path,
+    the generated song names, file and byte counts.
+    """
+    rng = random.Random(params.seed)
+    writer = TreeWriter(rng, params)
+    characterlive_path = os.path.join(base_dir, "characterLive")
+    singsong_path = os.path.join(base_dir, "singsong")
+    mp3_storage_path = os.path.join(base_dir, "mp3-storage")
+    os.makedirs(os.path.join(characterlive_path, "songs", "download"), exist_ok=True)
+    os.makedirs(os.path.join(singsong_path, "songs"), exist_ok=True)
+    os.makedirs(os.path.join(singsong_path, "output"), exist_ok=True)
+    os.makedirs(mp3_storage_path, exist_ok=True)
+
+    # About 80% of the files belong to songs, four each: two under
+    # characterLive/songs, one under singsong/songs and one under singsong/output
+    song_count = max(1, params.files * 4 // 5 // 4)
+    songs = []
+    for number in range(song_count):
+        name = song_name(rng, params.cjk_ratio, number)
+        songs.append(name)
+        song_dir = os.path.join(characterlive_path, "songs", nested_dir(rng, params.depth, params.fanout), name)
+        writer.write(os.path.join(song_dir, f"{name}.mp3"), name)
+        writer.write(os.path.join(song_dir, f"{name}.lrc"), name + '.lrc')
+        writer.write(os.path.join(singsong_path, "songs", nested_dir(rng, params.depth, params.fanout), f"{name}_vocals.wav"), name + '_vocals')
+        writer.write(os.path.join(singsong_path, "output", f"{name}_output.wav"), name + '_output')
+
+    # The rest is MP3 storage: a flat folder of downloads, some with an "Artist - "
+    # prefix or an uppercase extension, about half of the MP3s with an LRC
+    storage_count = max(1, params.files // 5 * 2 // 3)
+    for number in range(storage_count):
+        name = song_name(rng, params.cjk_ratio, song_count + number)
+        if rng.random() < params.artist_ratio:
+            name = f"{rng.choice(ARTISTS)} - {name}"
+        ext = rng.choice(('.mp3', '.mp3', '.MP3'))
+        writer.write(os.path.join(mp3_storage_path, name + ext), name)
+        if rng.random() < 0.5:
+            writer.write(os.path.join(mp3_storage_path, name + '.lrc'), name + '.lrc')
+
+    return {
+        'characterlive_path': characterlive_path,
+        'singsong_path': singsong_path,
+        'mp3_storage_path': mp3_storage_path,
+        'songs': songs,
+        'files': writer.file_count,
+        'bytes': writer.byte_count,
+    }
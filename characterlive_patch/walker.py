@@ -0,0 +1,112 @@
+"""
+Parallel os.scandir based directory traversal
+
+Directories are listed on a bounded thread pool, so the latency of slow
+(e.g. network mounted) file systems overlaps across subdirectories and
+across search roots. Results are streamed back as soon as each directory
+has been listed. Quarantine folders of staged deletes are never entered.
+"""
+
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .quarantine import QUARANTINE_DIR
+
+
+DEFAULT_WORKERS = 8
+
+
+def list_dir(dir_path):
+    """List a directory into (files, subdirs, mtime_ns) the way os.walk classifies entries"""
+    files = []
+    subdirs = []
+    mtime = os.stat(dir_path).st_mtime_ns
+    with os.scandir(dir_path) as it:
+        for entry in it:
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                # Like os.walk(followlinks=False), never descend into symlinked dirs
+                if not entry.is_symlink():
+                    subdirs.append(entry.name)
+            else:
+                files.append(entry.name)
+    return files, subdirs, mtime
+
+
+def default_lister(root_path, rel_dir):
+    """List a directory relative to its search root"""
+    return list_dir(root_path if rel_dir == '.' else os.path.join(root_path, rel_dir))
+
+
+class ParallelWalker:
+    """Walk several directory trees concurrently on a bounded thread pool"""
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        self.workers = max(1, int(workers))
+
+    def walk(self, root_paths, lister=default_lister):
+        """Yield (root_path, rel_dir, listing) for every reachable directory
+
+        lister(root_path, rel_dir) returns (files, subdirs, ...) and may
+        raise OSError for directories that cannot be read; those are skipped
+        like os.walk does. Directories are yielded in completion order.
+        """
+        results = queue.Queue()
+        lock = threading.Lock()
+        pending = [0]
+        stopped = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='walker')
+
+        def submit(root_path, rel_dir):
+            with lock:
+                pending[0] += 1
+            executor.submit(task, root_path, rel_dir)
+
+        def task(root_path, rel_dir):
+            try:
+                if stopped.is_set():
+                    return
+                try:
+                    listing = lister(root_path, rel_dir)
+                except OSError:
+                    listing = None
+                if listing is None:
+                    return
+                for subdir in listing[1]:
+                    if subdir == QUARANTINE_DIR:
+                        # Staged deletes are never walked, at any depth
+                        continue
+                    submit(root_path, subdir if rel_dir == '.' else os.path.join(rel_dir, subdir))
+                results.put((root_path, rel_dir, listing))
+            except BaseException as e:
+                results.put(e)
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    done = pending[0] == 0
+                if done:
+                    results.put(None)
+
+        try:
+            if not root_paths:
+                return
+            for root_path in root_paths:
+                submit(root_path, '.')
+            while True:
+                item = results.get()
+                if item is None:
+                    with lock:
+                        if pending[0] == 0:
+                            break
+                    continue
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            stopped.set()
+            executor.shutdown(wait=True, cancel_futures=True)
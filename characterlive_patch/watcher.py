@@ -0,0 +1,227 @@
+"""
+Watch a folder for new MP3/LRC files
+
+Changes are picked up with inotify where the C library provides it and by
+polling the folder mtime otherwise; the folder is only re-listed when its
+mtime moves, so an idle watch costs one stat per poll interval. New names
+are debounced, and a file is only handed on once its size and mtime stop
+changing between two checks, so downloads still being written are left
+alone until they finish. Files the transfer renames inside the folder are
+reported to ignore(), so they do not start another transfer.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+
+DEFAULT_DEBOUNCE = 2.0
+DEFAULT_POLL_INTERVAL = 2.0
+IDLE_WAKEUP = 1.0
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class InotifySource:
+    """Changed names reported by Linux inotify"""
+
+    name = 'inotify'
+
+    def __init__(self, folder):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MODIFY
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {folder}")
+        self.folder = folder
+
+    def wait(self, timeout):
+        """Block up to timeout seconds; return changed names, or None when a full rescan is needed"""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+        names = set()
+        offset = 0
+        while offset + INOTIFY_EVENT.size <= len(data):
+            wd, mask, cookie, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            if mask & IN_Q_OVERFLOW:
+                return None
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if name:
+                names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        """Release the inotify descriptor"""
+        os.close(self.fd)
+
+
+class PollingSource:
+    """Changed names found by re-listing the folder whenever its mtime moves"""
+
+    name = 'polling'
+
+    def __init__(self, folder, stop_event, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.folder = folder
+        self.stop_event = stop_event
+        self.poll_interval = poll_interval
+        self.folder_mtime = None
+        self.snapshot = {}
+        self.rescan()
+
+    def rescan(self):
+        """List the folder, returning names that are new or whose size/mtime changed"""
+        self.folder_mtime = os.stat(self.folder).st_mtime_ns
+        snapshot = {}
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.is_file():
+                    stat_result = entry.stat()
+                    snapshot[entry.name] = (stat_result.st_size, stat_result.st_mtime_ns)
+        changed = {name for name, state in snapshot.items() if self.snapshot.get(name) != state}
+        self.snapshot = snapshot
+        return changed
+
+    def wait(self, timeout):
+        """Sleep up to timeout seconds; return changed names"""
+        self.stop_event.wait(min(timeout, self.poll_interval))
+        if self.stop_event.is_set():
+            return set()
+        if os.stat(self.folder).st_mtime_ns == self.folder_mtime:
+            return set()
+        return self.rescan()
+
+    def close(self):
+        """Nothing to release for polling"""
+
+
+class FolderWatcher:
+    """Call on_batch(names) with new, fully written files that land in a folder"""
+
+    def __init__(self, folder, on_batch, extensions=('.mp3', '.lrc'), debounce=DEFAULT_DEBOUNCE,
+                 poll_interval=DEFAULT_POLL_INTERVAL, on_error=None):
+        self.folder = folder
+        self.on_batch = on_batch
+        self.extensions = tuple(extensions)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.on_error = on_error
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.backend = None
+        # name -> (size, mtime) of files written by the caller itself, not handed on unless they change
+        self.ignored = {}
+        self.ignored_lock = threading.Lock()
+
+    def open_source(self):
+        """Use inotify when available, else mtime polling"""
+        if sys.platform.startswith('linux'):
+            try:
+                return InotifySource(self.folder)
+            except (OSError, AttributeError):
+                pass
+        return PollingSource(self.folder, self.stop_event, self.poll_interval)
+
+    def start(self):
+        """Start watching on a background thread"""
+        source = self.open_source()
+        self.backend = source.name
+        self.thread = threading.Thread(target=self.run, args=(source,), name='folder-watcher', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=None):
+        """Stop watching and wait for the thread to exit"""
+        self.stop_event.set()
+        if self.thread is not None and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+
+    def ignore(self, path):
+        """Do not hand on a file the caller itself just wrote, unless it changes again; safe from any thread"""
+        folder, name = os.path.split(os.path.abspath(path))
+        if os.path.normcase(folder) != os.path.normcase(os.path.abspath(self.folder)):
+            return
+        state = self.stat(name)
+        if state is not None:
+            with self.ignored_lock:
+                self.ignored[name] = state
+
+    def wanted(self, name):
+        """Whether a file name has a watched extension (temp files starting with '.' are ignored)"""
+        return os.path.splitext(name)[1].lower() in self.extensions and not name.startswith('.')
+
+    def stat(self, name):
+        """Get (size, mtime) of a file in the folder, or None if it is gone"""
+        try:
+            stat_result = os.stat(os.path.join(self.folder, name))
+        except OSError:
+            return None
+        return stat_result.st_size, stat_result.st_mtime_ns
+
+    def run(self, source):
+        """Watch loop: collect changed names, debounce, and hand on files that stopped growing"""
+        # name -> time of the last change seen
+        pending = {}
+        # name -> (size, mtime) seen at the previous stability check
+        observed = {}
+        try:
+            while not self.stop_event.is_set():
+                timeout = self.debounce if pending else IDLE_WAKEUP
+                names = source.wait(timeout)
+                now = time.monotonic()
+                if names is None:
+                    # inotify queue overflowed: treat everything in the folder as changed
+                    names = set(os.listdir(self.folder))
+                for name in names:
+                    if self.wanted(name):
+                        pending[name] = now
+                        observed.pop(name, None)
+
+                # Debounce: wait for a quiet period before looking at files
+                if not pending or now - max(pending.values()) < self.debounce:
+                    continue
+
+                ready = []
+                for name in list(pending):
+                    state = self.stat(name)
+                    if state is None:
+                        # Removed or renamed away before it settled
+                        del pending[name]
+                        observed.pop(name, None)
+                    elif observed.get(name) == state:
+                        with self.ignored_lock:
+                            ignored = self.ignored.pop(name, None)
+                        if ignored != state:
+                            ready.append(name)
+                        del pending[name]
+                        del observed[name]
+                    else:
+                        # Still growing (or first check): look again after another debounce period
+                        observed[name] = state
+                        pending[name] = now
+                if ready and not self.stop_event.is_set():
+                    self.on_batch(sorted(ready))
+        except Exception as e:
+            if self.on_error is not None:
+                self.on_error(e)
+        finally:
+            source.close()
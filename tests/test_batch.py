@@ -0,0 +1,42 @@
+import random
+
+from characterlive_patch.batch import AhoCorasick, load_song_names, parse_song_names
+
+
+def brute_force(patterns, text):
+    return {index for index, pattern in enumerate(patterns) if pattern in text}
+
+
+def test_overlapping_and_nested_patterns():
+    patterns = ['he', 'she', 'his', 'hers', 'a', 'aa', 'aaa', 'love song', 'song']
+    automaton = AhoCorasick(patterns)
+    for text in ('ushers', 'ahishers', 'aaaa', 'a', 'my love song.mp3', 'songs', 'xyz', ''):
+        assert automaton.search(text) == brute_force(patterns, text), text
+
+
+def test_failure_links_across_shared_prefixes():
+    patterns = ['abcd', 'bce', 'cf', 'bc']
+    automaton = AhoCorasick(patterns)
+    assert automaton.search('abcf') == {2, 3}
+    assert automaton.search('abce') == {1, 3}
+    assert automaton.search('xabcdx') == {0, 3}
+
+
+def test_agrees_with_brute_force_on_random_input():
+    rng = random.Random(1)
+    for _ in range(200):
+        patterns = list({''.join(rng.choice('abc') for _ in range(rng.randint(1, 4))) for _ in range(rng.randint(1, 8))})
+        text = ''.join(rng.choice('abcd') for _ in range(rng.randint(0, 30)))
+        assert AhoCorasick(patterns).search(text) == brute_force(patterns, text), (patterns, text)
+
+
+def test_parse_song_names_keeps_order_and_drops_duplicates():
+    assert parse_song_names("  Lemon \n\nカタオモイ\nLemon\n") == ['Lemon', 'カタオモイ']
+    assert parse_song_names('name,artist\n"a, b",x\n,empty\nname\n', csv_format=True) == ['name', 'a, b']
+
+
+def test_load_song_names(tmp_path):
+    (tmp_path / 'names.txt').write_text('\ufeffLemon\r\nがらくた\r\n', encoding='utf-8')
+    (tmp_path / 'names.csv').write_text('Lemon,米津玄師\nがらくた,米津玄師\n', encoding='utf-8')
+    assert load_song_names(str(tmp_path / 'names.txt')) == ['Lemon', 'がらくた']
+    assert load_song_names(str(tmp_path / 'names.csv')) == ['Lemon', 'がらくた']
@@ -0,0 +1,33 @@
+import json
+
+import pytest
+
+from characterlive_patch.__main__ import main
+
+
+def run(tmp_path, capsys, *args):
+    config = tmp_path / 'config.json'
+    config.write_text(json.dumps({'characterlive_path': str(tmp_path / 'cl'), 'singsong_path': str(tmp_path / 'ss')}))
+    code = main(['delete', '--config', str(config), *args])
+    return code, [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+@pytest.mark.parametrize('names', [[''], [' ', '  ']])
+def test_blank_song_names_are_rejected(tmp_path, capsys, names):
+    (tmp_path / 'cl' / 'songs').mkdir(parents=True)
+    (tmp_path / 'cl' / 'songs' / 'a.mp3').write_bytes(b'x')
+    with pytest.raises(SystemExit) as exc:
+        run(tmp_path, capsys, *names)
+    assert exc.value.code == 2
+    assert (tmp_path / 'cl' / 'songs' / 'a.mp3').exists()
+
+
+def test_song_names_are_stripped_and_deduplicated(tmp_path, capsys):
+    (tmp_path / 'cl' / 'songs').mkdir(parents=True)
+    (tmp_path / 'cl' / 'songs' / 'Foo.mp3').write_bytes(b'x')
+    (tmp_path / 'cl' / 'songs' / 'Bar.mp3').write_bytes(b'x')
+    code, events = run(tmp_path, capsys, ' Foo ', 'Foo', '', '--dry-run')
+    assert code == 0
+    summary = events[-1]
+    assert [song['song_name'] for song in summary['songs']] == ['Foo']
+    assert [event['relative_path'] for event in events if event['event'] == 'matched'] == ['Foo.mp3']
@@ -0,0 +1,129 @@
+import os
+import threading
+import time
+
+import pytest
+
+from characterlive_patch import copier
+from characterlive_patch.copier import CopyEngine, copy_file_atomic, temp_path_for
+from characterlive_patch.jobs import Cancelled, JobControl
+
+
+def make_source(tmp_path, name='a.mp3', size=300000):
+    path = tmp_path / name
+    path.write_bytes(os.urandom(size))
+    os.utime(path, (1000000000, 1000000000))
+    return path
+
+
+def test_copy_keeps_content_and_mtime(tmp_path):
+    source = make_source(tmp_path)
+    dest = tmp_path / 'out.mp3'
+    copied = []
+    copy_file_atomic(str(source), str(dest), copied.append)
+    assert dest.read_bytes() == source.read_bytes()
+    assert dest.stat().st_mtime == 1000000000
+    assert sum(copied) == source.stat().st_size
+    assert not os.path.exists(temp_path_for(str(dest)))
+
+
+def test_buffered_fallback_without_kernel_copy(tmp_path, monkeypatch):
+    monkeypatch.delattr(os, 'copy_file_range', raising=False)
+    monkeypatch.delattr(os, 'sendfile', raising=False)
+    monkeypatch.setattr(copier, 'BUFFER_SIZE', 4096)
+    source = make_source(tmp_path)
+    dest = tmp_path / 'out.mp3'
+    copied = []
+    copy_file_atomic(str(source), str(dest), copied.append)
+    assert dest.read_bytes() == source.read_bytes()
+    assert max(copied) == 4096 and sum(copied) == source.stat().st_size
+
+
+def test_unsupported_kernel_copy_falls_back(tmp_path, monkeypatch):
+    def unsupported(*args):
+        raise OSError("not supported")
+    monkeypatch.setattr(os, 'copy_file_range', unsupported, raising=False)
+    monkeypatch.setattr(os, 'sendfile', unsupported, raising=False)
+    source = make_source(tmp_path)
+    dest = tmp_path / 'out.mp3'
+    copy_file_atomic(str(source), str(dest))
+    assert dest.read_bytes() == source.read_bytes()
+
+
+def test_failed_copy_leaves_no_temp_file_and_keeps_the_destination(tmp_path):
+    source = make_source(tmp_path)
+    dest = tmp_path / 'out.mp3'
+    dest.write_bytes(b'old')
+
+    def fail(count):
+        raise OSError("disk full")
+    with pytest.raises(OSError):
+        copy_file_atomic(str(source), str(dest), fail)
+    assert dest.read_bytes() == b'old'
+    assert not os.path.exists(temp_path_for(str(dest)))
+
+
+def test_progress_stats():
+    stats = CopyEngine.progress_stats(250, 1000, 1, 4, 2.0)
+    assert stats['bytes_per_sec'] == 125.0
+    assert stats['eta_seconds'] == 6.0
+    assert (stats['files_done'], stats['files_total']) == (1, 4)
+    assert CopyEngine.progress_stats(0, 1000, 0, 4, 0.0)['eta_seconds'] is None
+    assert CopyEngine.progress_stats(1200, 1000, 4, 4, 1.0)['eta_seconds'] == 0.0
+
+
+def test_run_copies_everything_and_reports_failures(tmp_path):
+    jobs = []
+    for i in range(5):
+        source = make_source(tmp_path, f'{i}.mp3', 1000)
+        jobs.append((str(source), str(tmp_path / f'out{i}.mp3'), i))
+    jobs.append((str(tmp_path / 'missing.mp3'), str(tmp_path / 'out.mp3'), 'missing'))
+    results = list(CopyEngine(3).run(jobs))
+    assert sorted(result[1][2] for result in results if result[0] == 'done') == [0, 1, 2, 3, 4]
+    assert [result[1][2] for result in results if result[0] == 'failed'] == ['missing']
+    progress = [result[1] for result in results if result[0] == 'progress']
+    assert progress[-1]['bytes_done'] == progress[-1]['bytes_total'] == 5000
+    assert progress[-1]['files_done'] == 6
+
+
+def slow_copies(monkeypatch, chunks=200):
+    """Replace copying with one that takes chunks * 10 ms and records which copies started"""
+    started = []
+
+    def slow_copy(src_path, dest_path, on_bytes=lambda n: None):
+        started.append(src_path)
+        temp_path = temp_path_for(dest_path)
+        open(temp_path, 'wb').close()
+        try:
+            for _ in range(chunks):
+                time.sleep(0.01)
+                on_bytes(1)
+        finally:
+            os.remove(temp_path)
+    monkeypatch.setattr(copier, 'copy_file_atomic', slow_copy)
+    return started
+
+
+def test_cancel_stops_copies_and_raises(tmp_path, monkeypatch):
+    started = slow_copies(monkeypatch)
+    jobs = [(str(make_source(tmp_path, f'{i}.mp3', 10)), str(tmp_path / f'out{i}.mp3'), i) for i in range(10)]
+    control = JobControl()
+    threading.Timer(0.1, control.cancel).start()
+    began = time.monotonic()
+    with pytest.raises(Cancelled):
+        list(CopyEngine(2).run(jobs, control=control))
+    assert time.monotonic() - began < 1.5
+    assert len(started) == 2
+    assert not any(name.endswith(copier.TEMP_SUFFIX) for name in os.listdir(tmp_path))
+
+
+def test_closing_the_generator_stops_the_copies(tmp_path, monkeypatch):
+    started = slow_copies(monkeypatch)
+    jobs = [(str(make_source(tmp_path, f'{i}.mp3', 10)), str(tmp_path / f'out{i}.mp3'), i) for i in range(10)]
+    results = CopyEngine(2).run(jobs)
+    assert next(results)[0] == 'progress'
+    began = time.monotonic()
+    results.close()
+    assert time.monotonic() - began < 1.5
+    assert len(started) == 2
+    assert not any(name.endswith(copier.TEMP_SUFFIX) for name in os.listdir(tmp_path))
@@ -0,0 +1,79 @@
+import os
+
+from characterlive_patch.engine import PatchEngine
+from characterlive_patch.hashcache import HEAD_TAIL_BYTES, HashCache
+
+
+SIZE = 3 * HEAD_TAIL_BYTES
+
+
+def content(middle=b'a'):
+    # Differs only outside the head/tail window, so only a full hash tells them apart
+    return b'h' * HEAD_TAIL_BYTES + middle * HEAD_TAIL_BYTES + b't' * HEAD_TAIL_BYTES
+
+
+def test_same_content_compares_size_then_head_tail_then_full_hash(tmp_path):
+    a, b, c, d = (tmp_path / name for name in 'abcd')
+    a.write_bytes(content())
+    b.write_bytes(content())
+    c.write_bytes(content(b'c'))
+    d.write_bytes(content()[:-1])
+    cache = HashCache(str(tmp_path / 'hash_cache.json'))
+    assert cache.same_content(str(a), str(d)) is False
+    assert cache.hashed_bytes == 0
+    assert cache.same_content(str(a), str(b)) is True
+    assert cache.same_content(str(a), str(c)) is False
+    assert cache.hashed_bytes == 3 * 2 * HEAD_TAIL_BYTES + 3 * SIZE
+
+
+def test_small_files_need_no_full_hash(tmp_path):
+    a, b = tmp_path / 'a', tmp_path / 'b'
+    a.write_bytes(b'x' * 100)
+    b.write_bytes(b'x' * 100)
+    cache = HashCache(str(tmp_path / 'hash_cache.json'))
+    assert cache.same_content(str(a), str(b)) is True
+    assert cache.hashed_bytes == 200
+
+
+def test_hashes_are_cached_until_the_file_changes(tmp_path):
+    path = tmp_path / 'a'
+    path.write_bytes(content())
+    cache = HashCache(str(tmp_path / 'hash_cache.json'))
+    full = cache.full_hash(str(path))
+    cache.save()
+
+    cache = HashCache(str(tmp_path / 'hash_cache.json'))
+    assert cache.load()
+    assert cache.full_hash(str(path)) == full
+    assert cache.hashed_bytes == 0
+
+    path.write_bytes(content(b'c'))
+    os.utime(path, ns=(1, 1))
+    assert cache.full_hash(str(path)) != full
+    assert cache.hashed_bytes == SIZE
+
+
+def test_transfer_reports_duplicates_and_collisions(tmp_path):
+    source = tmp_path / 'mp3'
+    download = tmp_path / 'cl' / 'songs' / 'download'
+    source.mkdir()
+    download.mkdir(parents=True)
+    (tmp_path / 'data').mkdir()
+    (download / 'Song.mp3').write_bytes(content())
+    (source / 'Other Name.mp3').write_bytes(content())
+    (source / 'Song.mp3').write_bytes(content(b'c'))
+    (source / 'New.LRC').write_bytes(b'[00:01.00]la')
+    engine = PatchEngine(str(tmp_path / 'data'))
+
+    events = list(engine.transfer(str(tmp_path / 'cl'), str(source), dedup=True))
+    summary = events[-1]
+    assert (summary['copied'], summary['duplicates'], summary['collisions']) == (1, 1, 1)
+    assert summary['hashed_bytes'] > 0
+    assert [event['existing'] for event in events if event['event'] == 'skipped'] == ['Song.mp3']
+    assert [event['file'] for event in events if event['event'] == 'collision'] == ['Song.mp3']
+    assert sorted(os.listdir(download)) == ['New.lrc', 'Song.mp3']
+
+    # A second run hashes nothing and reports this run's bytes, not the cache's lifetime total
+    events = list(engine.transfer(str(tmp_path / 'cl'), str(source), dedup=True))
+    assert events[-1]['hashed_bytes'] == 0
+    assert events[-1]['copied'] == 0
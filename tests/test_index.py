@@ -0,0 +1,106 @@
+import os
+import threading
+
+from characterlive_patch import index as index_module
+from characterlive_patch.index import SongIndex
+from characterlive_patch.walker import ParallelWalker
+
+
+def make_tree(root):
+    for name in ('a.mp3', 'x/b.mp3', 'x/y/c.wav', 'z/d.lrc'):
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x')
+
+
+def listed(song_index, root):
+    return sorted(os.path.relpath(os.path.join(dir_path, file), root) for dir_path, file in song_index.iter_files(str(root)))
+
+
+def test_refresh_picks_up_changes_made_outside_the_tool(tmp_path):
+    root = tmp_path / 'root'
+    make_tree(root)
+    song_index = SongIndex(str(tmp_path / 'song_index.json'))
+    assert song_index.refresh(str(root)) == (4, 0, 0, 0)
+    assert listed(song_index, root) == ['a.mp3', 'x/b.mp3', 'x/y/c.wav', 'z/d.lrc']
+
+    (root / 'x' / 'y' / 'new.mp3').write_bytes(b'x')
+    (root / 'z' / 'd.lrc').unlink()
+    (root / 'z').rmdir()
+    assert song_index.refresh(str(root)) == (2, 1, 1, 0)
+    assert listed(song_index, root) == ['a.mp3', 'x/b.mp3', 'x/y/c.wav', 'x/y/new.mp3']
+
+
+def test_unchanged_directories_are_not_listed_again(tmp_path, monkeypatch):
+    root = tmp_path / 'root'
+    make_tree(root)
+    song_index = SongIndex(str(tmp_path / 'song_index.json'))
+    song_index.refresh(str(root))
+    song_index.save()
+    generation = song_index.generation
+
+    listed_dirs = []
+    list_dir = index_module.list_dir
+    monkeypatch.setattr(index_module, 'list_dir', lambda path: listed_dirs.append(path) or list_dir(path))
+    assert song_index.refresh(str(root), ParallelWalker(2)) == (0, 4, 0, 0)
+    assert listed_dirs == []
+    assert song_index.generation == generation and not song_index.dirty
+
+
+def test_index_persists_between_runs(tmp_path):
+    root = tmp_path / 'root'
+    make_tree(root)
+    song_index = SongIndex(str(tmp_path / 'song_index.json'))
+    song_index.refresh(str(root))
+    song_index.save()
+
+    reopened = SongIndex(str(tmp_path / 'song_index.json'))
+    assert reopened.load()
+    assert listed(reopened, root) == listed(song_index, root)
+    assert reopened.refresh(str(root)) == (0, 4, 0, 0)
+
+    (tmp_path / 'song_index.json').write_text('{"version": 1, "roots"')
+    assert not SongIndex(str(tmp_path / 'song_index.json')).load()
+
+
+def test_rebuild_rescans_everything(tmp_path):
+    root = tmp_path / 'root'
+    make_tree(root)
+    song_index = SongIndex(str(tmp_path / 'song_index.json'))
+    song_index.refresh(str(root))
+    song_index.save()
+
+    song_index.clear()
+    assert not os.path.exists(tmp_path / 'song_index.json')
+    assert listed(song_index, root) == []
+    assert song_index.refresh(str(root)) == (4, 0, 0, 0)
+
+
+def test_discard_and_find(tmp_path):
+    root = tmp_path / 'root'
+    make_tree(root)
+    song_index = SongIndex(str(tmp_path / 'song_index.json'))
+    song_index.refresh(str(root))
+    assert sorted(song_index.find(str(root), 'B')) == [str(root / 'x' / 'b.mp3')]
+    assert list(song_index.find(str(root), 'b.mp', exact=True)) == []
+
+    generation = song_index.generation
+    song_index.discard(str(root), str(root / 'x' / 'b.mp3'))
+    assert song_index.generation == generation + 1
+    assert 'x/b.mp3' not in listed(song_index, root)
+
+
+def test_iter_files_does_not_hold_the_lock(tmp_path):
+    root = tmp_path / 'root'
+    make_tree(root)
+    song_index = SongIndex(str(tmp_path / 'song_index.json'))
+    song_index.refresh(str(root))
+    files = song_index.iter_files(str(root))
+    next(files)
+
+    # A consumer parked mid-iteration must not block writers on other threads
+    thread = threading.Thread(target=song_index.discard, args=(str(root), str(root / 'a.mp3')), daemon=True)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(list(files)) == 3
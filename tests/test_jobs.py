@@ -0,0 +1,118 @@
+import threading
+import time
+
+import pytest
+
+from characterlive_patch.jobs import Cancelled, JobControl, JobScheduler
+
+
+def blocking_job(started, release, log=None, name=None):
+    def func(job):
+        if log is not None:
+            log.append(name)
+        started.set()
+        while not release.wait(0.01):
+            job.check()
+    return func
+
+
+def test_jobs_sharing_a_resource_run_one_at_a_time():
+    scheduler = JobScheduler()
+    log = []
+    release = threading.Event()
+    first_started = threading.Event()
+    first = scheduler.submit('first', blocking_job(first_started, release, log, 'first'), ['volume:1'])
+    second = scheduler.submit('second', lambda job: log.append('second'), ['volume:1'])
+    other = scheduler.submit('other', lambda job: log.append('other'), ['volume:2'])
+    assert first_started.wait(5)
+    assert scheduler.wait(0.2) is False
+    assert (first.state, second.state) == ('running', 'queued')
+    assert other.state in ('running', 'done')
+
+    release.set()
+    assert scheduler.wait(5)
+    assert [job.state for job in (first, second, other)] == ['done', 'done', 'done']
+    assert log.index('first') < log.index('second')
+
+
+def test_limits_and_submission_order():
+    scheduler = JobScheduler(limits={'volume': 2})
+    release = threading.Event()
+    started = [threading.Event() for _ in range(3)]
+    jobs = [scheduler.submit(f'job{i}', blocking_job(started[i], release), ['volume:1']) for i in range(3)]
+    # A later job must not overtake the blocked one on the resource they share
+    late = scheduler.submit('late', lambda job: None, ['volume:1', 'index'])
+    assert started[0].wait(5) and started[1].wait(5)
+    assert [job.state for job in jobs + [late]] == ['running', 'running', 'queued', 'queued']
+    assert scheduler.jobs()[:2] == jobs[:2]
+    release.set()
+    assert scheduler.wait(5)
+    assert all(job.state == 'done' for job in jobs + [late])
+    assert late.started >= jobs[2].started
+
+
+def test_cancel_queued_and_running_jobs():
+    scheduler = JobScheduler()
+    started = threading.Event()
+    ran = []
+    running = scheduler.submit('running', blocking_job(started, threading.Event()), ['index'])
+    queued = scheduler.submit('queued', lambda job: ran.append(job), ['index'])
+    assert started.wait(5)
+
+    scheduler.cancel(queued)
+    assert queued.state == 'cancelled' and queued.cancelled
+    scheduler.cancel(running)
+    assert scheduler.wait(5)
+    assert running.state == 'cancelled'
+    assert ran == []
+    assert scheduler.idle()
+
+
+def test_failed_jobs_keep_their_error():
+    scheduler = JobScheduler()
+    job = scheduler.submit('fails', lambda job: 1 / 0)
+    assert scheduler.wait(5)
+    assert job.state == 'failed'
+    assert 'division' in job.error
+
+
+def test_shutdown_cancels_everything_and_times_out_on_stuck_jobs():
+    scheduler = JobScheduler()
+    started = threading.Event()
+    stuck = threading.Event()
+    running = scheduler.submit('running', blocking_job(started, threading.Event()), ['index'])
+    queued = scheduler.submit('queued', lambda job: None, ['index'])
+    ignores_cancel = scheduler.submit('stuck', lambda job: stuck.wait(5), ['other'])
+    assert started.wait(5)
+
+    began = time.monotonic()
+    assert scheduler.shutdown(0.2) is False
+    assert time.monotonic() - began < 2
+    assert (running.state, queued.state) == ('cancelled', 'cancelled')
+    assert ignores_cancel.cancelled and ignores_cancel.state == 'running'
+    stuck.set()
+    assert scheduler.wait(5)
+    assert ignores_cancel.state == 'done'
+
+
+def test_job_control():
+    control = JobControl()
+    control.check()
+    control.progress(1, 4)
+    assert control.fraction == 0.25
+    control.progress(5, 4)
+    assert control.fraction == 1.0
+    control.progress(0, 0)
+    assert control.fraction is None
+    control.cancel()
+    with pytest.raises(Cancelled):
+        control.check()
+
+
+def test_on_change_is_called_for_every_transition():
+    changes = []
+    scheduler = JobScheduler(on_change=lambda: changes.append(1))
+    scheduler.submit('job', lambda job: None)
+    assert scheduler.wait(5)
+    time.sleep(0.05)
+    assert len(changes) >= 2
@@ -0,0 +1,129 @@
+import os
+
+from characterlive_patch import logpump
+from characterlive_patch.logpump import LogPump
+
+
+class FakeRoot:
+    """Records after() calls instead of running a Tk main loop"""
+
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, ms, func):
+        self.scheduled.append((ms, func))
+
+
+class FakeText:
+    """The parts of a Tk text widget the pump uses, holding its lines"""
+
+    def __init__(self):
+        # A Tk text widget always ends with one newline
+        self.text = '\n'
+        self.updates = 0
+
+    def config(self, state):
+        self.state = state
+
+    def insert(self, index, text):
+        self.text = self.text[:-1] + text + '\n'
+        self.updates += 1
+
+    def delete(self, start, end):
+        first = int(start.split('.')[0])
+        last = int(end.split('.')[0])
+        lines = self.text.split('\n')
+        self.text = '\n'.join(lines[:first - 1] + lines[last - 1:])
+
+    def see(self, index):
+        pass
+
+    def lines(self):
+        return self.text.split('\n')[:-2]
+
+
+def attached_pump(max_lines=logpump.DEFAULT_MAX_LINES, log_file=None):
+    pump = LogPump(FakeRoot(), log_file, max_lines=max_lines)
+    widget = FakeText()
+    pump.attach(widget)
+    return pump, widget
+
+
+def test_queued_messages_are_inserted_in_one_batch():
+    pump, widget = attached_pump()
+    for i in range(100):
+        pump.put(f'line {i}')
+    pump.flush()
+    assert widget.updates == 1
+    assert widget.lines() == [f'line {i}' for i in range(100)]
+    assert widget.state == 'disabled'
+    pump.flush()
+    assert widget.updates == 1
+
+
+def test_drain_reschedules_itself():
+    pump, widget = attached_pump()
+    assert pump.root.scheduled == [(pump.interval_ms, pump.drain)]
+    pump.put('a')
+    pump.drain()
+    assert widget.lines() == ['a']
+    assert len(pump.root.scheduled) == 2
+
+
+def test_ring_buffer_keeps_the_last_lines():
+    pump, widget = attached_pump(max_lines=10)
+    for batch in range(3):
+        for i in range(4):
+            pump.put(f'{batch}.{i}')
+        pump.flush()
+    assert widget.lines() == [f'{batch}.{i}' for batch in range(3) for i in range(4)][-10:]
+    assert pump.line_count == 10
+
+    # A batch larger than the buffer is trimmed before it is inserted
+    for i in range(25):
+        pump.put(f'big {i}')
+    pump.flush()
+    assert widget.lines() == [f'big {i}' for i in range(15, 25)]
+    assert pump.line_count == 10
+
+
+def test_default_ring_buffer_size():
+    pump, widget = attached_pump()
+    for i in range(logpump.DEFAULT_MAX_LINES + 500):
+        pump.put(str(i))
+        if i % 1000 == 0:
+            pump.flush()
+    pump.flush()
+    lines = widget.lines()
+    assert len(lines) == logpump.DEFAULT_MAX_LINES
+    assert lines[-1] == str(logpump.DEFAULT_MAX_LINES + 499)
+
+
+def test_log_file_keeps_everything_and_rotates(tmp_path, monkeypatch):
+    monkeypatch.setattr(logpump, 'LOG_FILE_MAX_BYTES', 1000)
+    log_file = str(tmp_path / 'logs' / 'patch.log')
+    pump, widget = attached_pump(max_lines=5, log_file=log_file)
+    try:
+        for batch in range(20):
+            for i in range(5):
+                pump.put(f'batch {batch:02d} line {i} ' + 'x' * 20)
+            pump.flush()
+    finally:
+        for handler in pump.file_logger.handlers:
+            handler.close()
+    names = sorted(os.listdir(tmp_path / 'logs'))
+    assert names == ['patch.log', 'patch.log.1', 'patch.log.2', 'patch.log.3']
+    with open(log_file, encoding='utf-8') as f:
+        assert f.read().splitlines()[-1].startswith('batch 19 line 4')
+    assert all(os.path.getsize(tmp_path / 'logs' / name) <= 1000 for name in names)
+    assert len(widget.lines()) == 5
+
+
+def test_calls_run_on_flush_after_the_messages_before_them():
+    pump, widget = attached_pump()
+    seen = []
+    pump.put('before')
+    pump.call(lambda *args: seen.append((args, widget.lines())), 'Error', 'failed')
+    assert seen == []
+    pump.flush()
+    assert seen == [(('Error', 'failed'), ['before'])]
@@ -0,0 +1,77 @@
+import json
+
+from characterlive_patch.engine import PatchEngine
+from characterlive_patch.manifest import SyncManifest, TransferJournal
+
+
+def test_manifest_remembers_unchanged_files(tmp_path):
+    manifest = SyncManifest(str(tmp_path / 'sync_manifest.json'))
+    sync = manifest.sync(str(tmp_path / 'mp3'), str(tmp_path / 'download'))
+    manifest.record(sync, 'a.mp3', 10, 100, 'a.mp3', 'copied')
+    manifest.record(sync, 'b.mp3', 20, 200, 'b.mp3', 'copied')
+    manifest.record_dest_listing(sync, 300, ['a.mp3', 'b.mp3'])
+    manifest.save()
+
+    manifest = SyncManifest(str(tmp_path / 'sync_manifest.json'))
+    assert manifest.load()
+    sync = manifest.sync(str(tmp_path / 'mp3'), str(tmp_path / 'download' / '.'))
+    assert manifest.unchanged(sync, 'a.mp3', 10, 100) == 'a.mp3'
+    assert manifest.unchanged(sync, 'a.mp3', 10, 101) is None
+    assert manifest.unchanged(sync, 'c.mp3', 10, 100) is None
+    assert (sync['dest_mtime'], sync['dest_files']) == (300, ['a.mp3', 'b.mp3'])
+
+    manifest.prune(sync, ['b.mp3'])
+    assert list(sync['files']) == ['b.mp3'] and manifest.dirty
+    # Other folder pairs are separate records
+    assert manifest.sync(str(tmp_path / 'other'), str(tmp_path / 'download'))['files'] == {}
+
+
+def test_unreadable_manifest_starts_empty(tmp_path):
+    path = tmp_path / 'sync_manifest.json'
+    path.write_text('{"version": 1, "syncs"')
+    assert not SyncManifest(str(path)).load()
+    path.write_text(json.dumps({'version': 0, 'syncs': {'x': {}}}))
+    manifest = SyncManifest(str(path))
+    assert not manifest.load() and manifest.syncs == {}
+
+
+def test_journal_reports_copies_that_never_finished(tmp_path):
+    journal = TransferJournal(str(tmp_path / 'transfer_journal.jsonl'))
+    journal.open()
+    first = journal.begin('src/a', 'dst/a', 'dst/a.part')
+    second = journal.begin('src/b', 'dst/b', 'dst/b.part')
+    journal.end(first)
+    journal.file.write('{"op": "end", "id"')
+    journal.close(completed=False)
+    assert [(record['id'], record['temp']) for record in journal.pending()] == [(second, 'dst/b.part')]
+
+    journal.open()
+    journal.close()
+    assert journal.pending() == []
+
+
+def test_transfer_recovers_interrupted_copies_and_skips_unchanged_files(tmp_path):
+    source = tmp_path / 'mp3'
+    download = tmp_path / 'cl' / 'songs' / 'download'
+    source.mkdir()
+    download.mkdir(parents=True)
+    (tmp_path / 'data').mkdir()
+    (source / 'a.mp3').write_bytes(b'a' * 100)
+    (source / 'b.MP3').write_bytes(b'b' * 100)
+    engine = PatchEngine(str(tmp_path / 'data'))
+
+    # A copy of b.MP3 was in flight when the previous transfer stopped
+    partial = download / 'b.mp3.part'
+    partial.write_bytes(b'b' * 10)
+    engine.journal.open()
+    engine.journal.begin(str(source / 'b.MP3'), str(download / 'b.mp3'), str(partial))
+    engine.journal.close(completed=False)
+
+    events = list(engine.transfer(str(tmp_path / 'cl'), str(source)))
+    assert [event['removed'] for event in events if event['event'] == 'recovered'] == [[str(partial)]]
+    assert (events[-1]['copied'], events[-1]['recovered']) == (2, 1)
+    assert sorted(p.name for p in download.iterdir()) == ['a.mp3', 'b.mp3']
+    assert engine.journal.pending() == []
+
+    events = list(PatchEngine(str(tmp_path / 'data')).transfer(str(tmp_path / 'cl'), str(source)))
+    assert (events[-1]['copied'], events[-1]['unchanged']) == (0, 2)
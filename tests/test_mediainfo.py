@@ -0,0 +1,133 @@
+import struct
+
+import pytest
+
+from characterlive_patch.mediainfo import MetadataCache, decode_legacy, lyrics_overrun, read_metadata, tag_key
+
+
+# MPEG-1 Layer III, 128 kbps, 44.1 kHz: 417 byte frames of 1152 samples
+FRAME_HEADER = 0xFFFB9000
+FRAME_LENGTH = 417
+
+
+def synchsafe(n):
+    return bytes([(n >> 21) & 0x7f, (n >> 14) & 0x7f, (n >> 7) & 0x7f, n & 0x7f])
+
+
+def text_frame(frame_id, text, major=3, encoding=3):
+    data = bytes([encoding]) + (text.encode('utf-16') if encoding == 1 else text.encode('utf-8' if encoding == 3 else 'latin-1'))
+    size = synchsafe(len(data)) if major == 4 else struct.pack('>I', len(data))
+    return frame_id.encode() + size + b'\0\0' + data
+
+
+def id3v2(frames, major=3, padding=64):
+    body = b''.join(frames) + b'\0' * padding
+    return b'ID3' + bytes([major, 0, 0]) + synchsafe(len(body)) + body
+
+
+def id3v1(title, artist=b''):
+    return b'TAG' + title.ljust(30, b'\0') + artist.ljust(30, b'\0') + b'\0' * 65
+
+
+def cbr_frames(count):
+    return (struct.pack('>I', FRAME_HEADER) + b'\x55' * (FRAME_LENGTH - 4)) * count
+
+
+def xing_frame(frames, stream_bytes):
+    frame = bytearray(struct.pack('>I', FRAME_HEADER) + b'\0' * (FRAME_LENGTH - 4))
+    frame[36:52] = b'Xing' + struct.pack('>III', 3, frames, stream_bytes)
+    return bytes(frame)
+
+
+def write(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_id3v23_utf16_tags_and_cbr_duration(tmp_path):
+    tags = id3v2([text_frame('TIT2', 'カタオモイ', encoding=1), text_frame('TPE1', 'Aimer', encoding=1)])
+    path = write(tmp_path, 'a.mp3', tags + cbr_frames(100))
+    metadata = read_metadata(path)
+    assert metadata['title'] == 'カタオモイ'
+    assert metadata['artist'] == 'Aimer'
+    assert metadata['bitrate'] == 128
+    assert metadata['duration'] == pytest.approx(100 * FRAME_LENGTH * 8 / 128000)
+
+
+def test_id3v24_utf8_tags_skip_large_frames(tmp_path):
+    picture = b'APIC' + synchsafe(300000) + b'\0\0' + b'\0' * 300000
+    tags = id3v2([picture, text_frame('TIT2', 'がらくた', major=4)], major=4)
+    path = write(tmp_path, 'b.mp3', tags + cbr_frames(10))
+    assert read_metadata(path)['title'] == 'がらくた'
+
+
+def test_xing_header_gives_vbr_duration(tmp_path):
+    path = write(tmp_path, 'c.mp3', xing_frame(1000, 500000) + cbr_frames(20))
+    metadata = read_metadata(path)
+    assert metadata['duration'] == pytest.approx(1000 * 1152 / 44100)
+
+
+def test_id3v1_legacy_encoding(tmp_path):
+    path = write(tmp_path, 'd.mp3', cbr_frames(10) + id3v1('晴天'.encode('gbk'), b'Jay'))
+    metadata = read_metadata(path)
+    assert metadata['title'] == '晴天'
+    assert metadata['artist'] == 'Jay'
+    assert tag_key(metadata) == ('jay', '晴天')
+
+
+def test_id3v1_shift_jis_is_not_read_as_gbk(tmp_path):
+    # Both decode without an error as GBK, into rare characters
+    path = write(tmp_path, 'f.mp3', cbr_frames(10) + id3v1('千本桜'.encode('shift_jis'), 'さくらんぼ'.encode('shift_jis')))
+    metadata = read_metadata(path)
+    assert metadata['title'] == '千本桜'
+    assert metadata['artist'] == 'さくらんぼ'
+
+
+@pytest.mark.parametrize('text, encoding', [
+    ('七里香', 'gbk'), ('周杰伦 - 稻香', 'gbk'), ('龍', 'gbk'),
+    ('夜に駆ける', 'shift_jis'), ('東京', 'shift_jis'), ('ハルジオン', 'shift_jis'),
+])
+def test_legacy_encoding_is_chosen_by_content(text, encoding):
+    assert decode_legacy(text.encode(encoding)) == text
+
+
+def test_shift_jis_lrc(tmp_path):
+    lyrics = '[ti:千本桜]\n[ar:黒うさP]\n[00:01.00]大胆不敵にハイカラ革命\n'
+    path = write(tmp_path, 'g.lrc', lyrics.encode('shift_jis'))
+    metadata = read_metadata(path)
+    assert (metadata['title'], metadata['artist']) == ('千本桜', '黒うさP')
+
+
+def test_lrc_duration_honours_offset(tmp_path):
+    lyrics = '[ti:Lemon]\n[ar:米津玄師]\n[offset:500]\n[00:01.00]a\n[03:30.50]b\n'
+    path = write(tmp_path, 'e.lrc', lyrics.encode('utf-8'))
+    metadata = read_metadata(path)
+    assert metadata['title'] == 'Lemon'
+    assert metadata['artist'] == '米津玄師'
+    assert metadata['duration'] == pytest.approx(210.0)
+
+
+def test_lyrics_overrun():
+    assert lyrics_overrun({'duration': 200.0}, {'duration': 199.0}) is None
+    assert lyrics_overrun({'duration': 210.0}, {'duration': 200.0}) == pytest.approx(10.0)
+    assert lyrics_overrun({}, {'duration': 200.0}) is None
+
+
+def test_cache_reuses_metadata_until_the_file_changes(tmp_path):
+    path = write(tmp_path, 'f.mp3', id3v2([text_frame('TIT2', 'One')]) + cbr_frames(5))
+    cache = MetadataCache(str(tmp_path / 'metadata_cache.json'))
+    assert cache.get_many([(path, None, None)])[path]['title'] == 'One'
+    cache.save()
+
+    reloaded = MetadataCache(str(tmp_path / 'metadata_cache.json'))
+    reloaded.load()
+    stat_result = (tmp_path / 'f.mp3').stat()
+    assert reloaded.cached(path, stat_result.st_size, stat_result.st_mtime_ns)['title'] == 'One'
+    assert reloaded.cached(path, stat_result.st_size + 1, stat_result.st_mtime_ns) is None
+
+
+def test_unreadable_files_map_to_none(tmp_path):
+    cache = MetadataCache(str(tmp_path / 'metadata_cache.json'))
+    missing = str(tmp_path / 'missing.mp3')
+    assert cache.get_many([(missing, None, None)]) == {missing: None}
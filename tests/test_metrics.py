@@ -0,0 +1,127 @@
+import json
+
+from characterlive_patch import metrics
+from characterlive_patch.metrics import MAX_RUNS, Metrics, MetricsStore, prometheus_label, prometheus_text
+
+
+def report(operation, seconds=1.5, timestamp=1000.0, phases=None, roots=None):
+    return {
+        'operation': operation,
+        'seconds': seconds,
+        'timestamp': timestamp,
+        'phases': phases or {},
+        'roots': roots or {},
+    }
+
+
+def test_add_sums_phases_and_roots():
+    run = Metrics('delete')
+    run.add('walk', 0.5, 'a', files=2)
+    run.add('walk', 0.25, 'b', files=3, errors=1)
+    run.add('remove', 0.1)
+    run.label_roots({'a': 'CharacterLive'})
+    data = run.report()
+    assert data['operation'] == 'delete'
+    assert data['phases']['walk'] == {'seconds': 0.75, 'files': 5, 'errors': 1}
+    assert data['phases']['remove'] == {'seconds': 0.1}
+    assert data['roots'] == {
+        'CharacterLive': {'walk': {'seconds': 0.5, 'files': 2}},
+        'b': {'walk': {'seconds': 0.25, 'files': 3, 'errors': 1}},
+    }
+    json.dumps(data)
+
+
+def test_phase_times_a_block_even_when_it_raises():
+    run = Metrics('transfer')
+    try:
+        with run.phase('copy', bytes=10):
+            raise OSError("disk full")
+    except OSError:
+        pass
+    copy = run.report()['phases']['copy']
+    assert copy['bytes'] == 10
+    assert copy['seconds'] >= 0
+
+
+def test_prometheus_label_escaping():
+    assert prometheus_label('plain') == 'plain'
+    assert prometheus_label('C:\\Songs') == 'C:\\\\Songs'
+    assert prometheus_label('say "hi"') == 'say \\"hi\\"'
+    assert prometheus_label('two\nlines') == 'two\\nlines'
+    assert prometheus_label('\\"\n') == '\\\\\\"\\n'
+
+
+def test_prometheus_text_format():
+    text = prometheus_text([report(
+        'delete',
+        phases={'walk': {'seconds': 0.25, 'files': 7, 'bytes': 100}},
+        roots={'D:\\cl "x"': {'walk': {'seconds': 0.125, 'files': 7}}},
+    )])
+    assert text.endswith('\n')
+    lines = text.splitlines()
+    assert lines[:2] == [
+        "# HELP clpatch_run_seconds Wall time of the last run of an operation",
+        "# TYPE clpatch_run_seconds gauge",
+    ]
+    assert 'clpatch_run_seconds{operation="delete"} 1.500000' in lines
+    assert 'clpatch_run_timestamp_seconds{operation="delete"} 1000.000' in lines
+    assert 'clpatch_phase_seconds{operation="delete",phase="walk"} 0.250000' in lines
+    assert 'clpatch_phase_seconds{operation="delete",phase="walk",root="D:\\\\cl \\"x\\""} 0.125000' in lines
+    assert 'clpatch_phase_total{operation="delete",phase="walk",counter="files"} 7' in lines
+    assert 'clpatch_phase_total{operation="delete",phase="walk",counter="bytes"} 100' in lines
+    assert 'clpatch_phase_total{operation="delete",phase="walk",root="D:\\\\cl \\"x\\"",counter="files"} 7' in lines
+    # Every sample follows the HELP and TYPE lines of its metric family
+    families = [line.split()[2] for line in lines if line.startswith('# TYPE')]
+    assert families == ['clpatch_run_seconds', 'clpatch_run_timestamp_seconds', 'clpatch_phase_seconds', 'clpatch_phase_total']
+    current = None
+    for line in lines:
+        if line.startswith('# TYPE'):
+            current = line.split()[2]
+        elif not line.startswith('#'):
+            assert line.split('{')[0] == current
+
+
+def test_store_keeps_the_newest_runs(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, 'MAX_RUNS', 5)
+    store = MetricsStore(str(tmp_path / 'metrics.json'))
+    for number in range(8):
+        store.append(report(f'run{number}'))
+    assert [run['operation'] for run in store.load()] == ['run3', 'run4', 'run5', 'run6', 'run7']
+    assert not (tmp_path / 'metrics.json.tmp').exists()
+
+
+def test_store_limit_is_500_runs(tmp_path):
+    assert MAX_RUNS == 500
+    metrics_file = tmp_path / 'metrics.json'
+    runs = [report(f'run{number}') for number in range(MAX_RUNS)]
+    metrics_file.write_text(json.dumps({'version': metrics.METRICS_VERSION, 'runs': runs}), encoding='utf-8')
+    store = MetricsStore(str(metrics_file))
+    store.append(report('newest'))
+    stored = store.load()
+    assert len(stored) == MAX_RUNS
+    assert stored[0]['operation'] == 'run1'
+    assert stored[-1]['operation'] == 'newest'
+
+
+def test_store_ignores_unreadable_or_foreign_files(tmp_path):
+    metrics_file = tmp_path / 'metrics.json'
+    store = MetricsStore(str(metrics_file))
+    assert store.load() == []
+    metrics_file.write_text('{not json', encoding='utf-8')
+    assert store.load() == []
+    metrics_file.write_text(json.dumps({'version': 99, 'runs': [report('old')]}), encoding='utf-8')
+    assert store.load() == []
+    store.append(report('new'))
+    assert [run['operation'] for run in store.load()] == ['new']
+
+
+def test_store_writes_latest_run_per_operation_as_prometheus(tmp_path):
+    store = MetricsStore(str(tmp_path / 'metrics.json'), str(tmp_path / 'metrics.prom'))
+    store.append(report('delete', seconds=1.0))
+    assert not (tmp_path / 'metrics.prom').exists()
+    store.append(report('transfer', seconds=2.0), prometheus=True)
+    store.append(report('delete', seconds=3.0), prometheus=True)
+    text = (tmp_path / 'metrics.prom').read_text(encoding='utf-8')
+    assert 'clpatch_run_seconds{operation="delete"} 3.000000' in text
+    assert 'clpatch_run_seconds{operation="transfer"} 2.000000' in text
+    assert text.count('clpatch_run_seconds{') == 2
@@ -0,0 +1,99 @@
+from characterlive_patch import names
+from characterlive_patch.batch import BatchMatcher
+from characterlive_patch.index import song_name_matcher
+from characterlive_patch.engine import PatchEngine
+from characterlive_patch.names import VERIFY_LIMIT, NameIndex, fold_name, name_key
+
+
+FILES = [
+    'Lemon.mp3', 'lemon.lrc', 'Ｌｅｍｏｎ (cover).wav', 'LEMON_vocals.wav',
+    'カタオモイ.mp3', 'ｶﾀｵﾓｲ.lrc', 'がらくた.mp3', 'がらくた.lrc',
+    'Artist - Lemon.mp3', 'mp3.txt', 'a.mp3', 'Straße.mp3', 'STRASSE.lrc',
+]
+
+
+def build(files):
+    index = NameIndex()
+    for file in files:
+        index.add('/root', '/root', file)
+    return index
+
+
+def brute_force(files, song_name, exact):
+    matcher = song_name_matcher(song_name, exact)
+    return sorted(file_id for file_id, file in enumerate(files) if matcher(file))
+
+
+def test_name_key_folds_width_case_and_composition():
+    assert name_key('Ｌｅｍｏｎ') == name_key('LEMON') == 'lemon'
+    assert name_key('ｶﾀｵﾓｲ') == name_key('カタオモイ')
+    assert name_key('が') == name_key('が')
+    assert name_key('Straße') == name_key('STRASSE')
+
+
+def test_search_agrees_with_matcher():
+    index = build(FILES)
+    for song_name in ('lemon', 'Ｌemon', 'カタオモイ', 'がらくた', 'mp3', 'a', 'em', 'strasse', 'missing', ''):
+        for exact in (False, True):
+            assert index.search(song_name, exact) == brute_force(FILES, song_name, exact), (song_name, exact)
+
+
+def test_count_and_paths():
+    index = build(FILES)
+    assert index.count('lemon') == 5
+    assert index.count('lemon', exact=True) == 2
+    assert index.paths(index.search('lemon', exact=True)) == [('/root', '/root/Lemon.mp3'), ('/root', '/root/lemon.lrc')]
+
+
+def test_long_posting_lists_are_verified():
+    files = [f'song{i:05d}.mp3' for i in range(VERIFY_LIMIT * 4)] + ['ongs.mp3']
+    index = build(files)
+    assert index.search('ongs') == [len(files) - 1]
+    assert index.count('song001') == 100
+    assert index.count('song01023') == 1
+
+
+def test_count_within_agrees_with_count_below_the_limit():
+    index = build(FILES)
+    for song_name in ('lemon', 'カタオモイ', 'mp3', 'a', 'missing', ''):
+        for exact in (False, True):
+            assert index.count_within(song_name, exact) == (index.count(song_name, exact), True)
+
+
+def test_count_within_stops_at_the_limit():
+    index = build([f'song{i:05d}.wav' for i in range(5000)])
+    assert index.count_within('wav', limit=1000) == (1000, False)
+    assert index.count_within('song000', limit=99) == (99, False)
+    assert index.count_within('song000', limit=100) == (100, True)
+    assert index.count_within('song0499', limit=10) == (10, True)
+
+
+def test_count_within_stops_at_the_budget(monkeypatch):
+    # A clock that moves one second per reading runs out of budget at the first look
+    clock = iter(range(10 ** 6))
+    monkeypatch.setattr(names.time, 'perf_counter', lambda: next(clock))
+    index = build([f'song{i:05d}.wav' for i in range(5000)])
+    assert index.count_within('wav', limit=10 ** 6, budget=0.5) == (names.COUNT_CLOCK_STRIDE, False)
+
+
+def test_rebuilding_the_name_index_empties_the_fold_cache(tmp_path):
+    (tmp_path / 'cl' / 'songs').mkdir(parents=True)
+    (tmp_path / 'cl' / 'songs' / 'ヨルシカ.mp3').write_bytes(b'x')
+    (tmp_path / 'data').mkdir()
+    name_key('ＬＯＶＥ ソング')
+    assert fold_name.cache_info().currsize > 0
+    engine = PatchEngine(str(tmp_path / 'data'))
+    list(engine.index_names(str(tmp_path / 'cl'), str(tmp_path / 'ss')))
+    assert fold_name.cache_info().currsize == 1
+    assert engine.name_index.count_within('ﾖﾙｼｶ') == (1, True)
+    # ASCII names are not cached
+    cached = fold_name.cache_info().currsize
+    name_key('plain ascii')
+    assert fold_name.cache_info().currsize == cached
+
+
+def test_batch_matcher_uses_keys():
+    matcher = BatchMatcher(['Lemon', 'カタオモイ'], exact=False)
+    assert matcher.match('Ｌｅｍｏｎ.mp3') == ['Lemon']
+    assert matcher.match('ｶﾀｵﾓｲ.lrc') == ['カタオモイ']
+    assert not matcher.match('other.mp3')
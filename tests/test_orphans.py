@@ -0,0 +1,52 @@
+import os
+
+from characterlive_patch.engine import PatchEngine
+from characterlive_patch.orphans import DOWNLOAD, MP3_STORAGE, SINGSONG_OUTPUT, SINGSONG_SONGS, analyze
+
+
+def entries(root, *names):
+    return [(root, os.path.join(root, name)) for name in names]
+
+
+def categories(findings):
+    return sorted((finding['category'], finding['song'], finding['location']) for finding in findings)
+
+
+def test_analyze_reports_each_category():
+    listings = {
+        DOWNLOAD: entries('/dl', 'Artist - Used.mp3', 'Artist - Used.lrc', 'Unused.mp3', 'Unused.lrc', 'NoLyrics.mp3'),
+        MP3_STORAGE: entries('/mp3', 'Lonely.lrc'),
+        SINGSONG_SONGS: entries('/ss/songs', os.path.join('Used', 'Used_vocals.wav')),
+        SINGSONG_OUTPUT: entries('/ss/output', 'Used (live)_mix.wav', 'Gone_mix.wav'),
+    }
+    assert categories(analyze(listings)) == [
+        ('lrc-without-mp3', 'Lonely', MP3_STORAGE),
+        ('mp3-without-lrc', 'NoLyrics', DOWNLOAD),
+        ('output-without-source', 'Gone_mix', SINGSONG_OUTPUT),
+        ('unused-download', 'NoLyrics', DOWNLOAD),
+        ('unused-download', 'Unused', DOWNLOAD),
+    ]
+
+
+def test_derived_files_belong_to_the_longest_song_key():
+    listings = {
+        DOWNLOAD: entries('/dl', 'Song.mp3', 'Song.lrc', 'Song 2.mp3', 'Song 2.lrc'),
+        SINGSONG_OUTPUT: entries('/ss/output', 'Song 2_mix.wav'),
+    }
+    assert categories(analyze(listings)) == [('unused-download', 'Song', DOWNLOAD)]
+
+
+def test_files_staged_below_a_search_root_are_not_matched_again(tmp_path):
+    # Orphan deletes stage into songs/download/.quarantine, one level below the songs root
+    download = tmp_path / 'cl' / 'songs' / 'download'
+    download.mkdir(parents=True)
+    (tmp_path / 'ss').mkdir()
+    song = download / 'Foo.mp3'
+    song.write_bytes(b'x')
+    (tmp_path / 'data').mkdir()
+    engine = PatchEngine(str(tmp_path / 'data'), workers=2)
+    events = list(engine.delete_files([(DOWNLOAD, str(download), str(song))], label='orphans', staged=True))
+    assert events[-1]['processed'] == 1 and not song.exists()
+
+    events = list(engine.delete_songs(str(tmp_path / 'cl'), str(tmp_path / 'ss'), ['Foo'], dry_run=True))
+    assert [event for event in events if event['event'] == 'matched'] == []
@@ -0,0 +1,132 @@
+import os
+
+from characterlive_patch.quarantine import QUARANTINE_DIR, SIZE_GRACE_SECONDS, Quarantine
+
+
+def make_files(root, *names):
+    paths = []
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x' * 10)
+        paths.append(str(path))
+    return paths
+
+
+def stage_all(quarantine, root, paths, label='test'):
+    undo_id = quarantine.begin(label)
+    for path in paths:
+        quarantine.stage(undo_id, 'root', str(root), path)
+    quarantine.end(undo_id)
+    return undo_id
+
+
+def test_stage_and_restore(tmp_path):
+    root = tmp_path / 'root'
+    paths = make_files(root, 'a.mp3', 'sub/b.lrc')
+    quarantine = Quarantine(str(tmp_path / 'quarantine_journal.jsonl'))
+    undo_id = quarantine.begin('two files')
+    for path in paths:
+        quarantine.stage(undo_id, 'root', str(root), path)
+    # Operations still being staged are not offered for undo
+    assert quarantine.list_operations() == []
+    quarantine.end(undo_id)
+
+    assert not any(os.path.exists(path) for path in paths)
+    assert os.path.exists(root / QUARANTINE_DIR / undo_id / 'sub' / 'b.lrc')
+    [op] = quarantine.list_operations()
+    assert (op['id'], op['label'], op['files'], op['bytes']) == (undo_id, 'two files', 2, 20)
+
+    assert [error for record, error in quarantine.restore(undo_id)] == [None, None]
+    assert all(os.path.exists(path) for path in paths)
+    assert not os.path.exists(root / QUARANTINE_DIR)
+    assert quarantine.list_operations() == []
+
+
+def test_journal_survives_reopen_and_torn_line(tmp_path):
+    root = tmp_path / 'root'
+    journal = tmp_path / 'quarantine_journal.jsonl'
+    quarantine = Quarantine(str(journal))
+    undo_id = stage_all(quarantine, root, make_files(root, 'a.mp3'))
+    quarantine.close()
+    with open(journal, 'a', encoding='utf-8') as f:
+        f.write('{"op": "stage", "id"')
+
+    reopened = Quarantine(str(journal))
+    reopened.load()
+    assert [op['id'] for op in reopened.list_operations()] == [undo_id]
+
+
+def test_restore_skips_files_that_were_never_moved(tmp_path):
+    root = tmp_path / 'root'
+    [path] = make_files(root, 'a.mp3')
+    quarantine = Quarantine(str(tmp_path / 'quarantine_journal.jsonl'))
+    undo_id = quarantine.begin('crashed')
+    # A crash between the stage record and the rename
+    quarantine.write({
+        'op': 'stage', 'id': undo_id, 'root': 'root', 'root_path': str(root), 'original': path,
+        'quarantine': str(root / QUARANTINE_DIR / undo_id / 'a.mp3'), 'size': 10,
+    })
+    quarantine.end(undo_id)
+
+    assert list(quarantine.restore(undo_id)) == []
+    assert os.path.exists(path)
+    assert quarantine.list_operations() == []
+
+
+def test_restore_keeps_files_whose_name_was_reused(tmp_path):
+    root = tmp_path / 'root'
+    [path] = make_files(root, 'a.mp3')
+    quarantine = Quarantine(str(tmp_path / 'quarantine_journal.jsonl'))
+    undo_id = stage_all(quarantine, root, [path])
+    make_files(root, 'a.mp3')
+
+    [(record, error)] = quarantine.restore(undo_id)
+    assert error
+    assert os.path.exists(record['quarantine'])
+    assert quarantine.list_operations()[0]['files'] == 1
+
+
+def test_expired_by_age_then_size(tmp_path):
+    root = tmp_path / 'root'
+    quarantine = Quarantine(str(tmp_path / 'quarantine_journal.jsonl'))
+    old = stage_all(quarantine, root, make_files(root, 'old.mp3'))
+    new = stage_all(quarantine, root, make_files(root, 'new.mp3'))
+    quarantine.operations[old]['time'] -= 10 * 86400
+    quarantine.operations[new]['time'] -= 2 * 86400
+
+    assert quarantine.expired(max_age_days=7, max_bytes=None) == [old]
+    assert quarantine.expired(max_age_days=None, max_bytes=10) == [old]
+    assert quarantine.expired(max_age_days=None, max_bytes=None) == []
+    # The newest operation is never taken by the size limit
+    assert quarantine.expired(max_age_days=None, max_bytes=0) == [old]
+    assert quarantine.expired(max_age_days=1, max_bytes=0) == [old, new]
+
+
+def test_size_limit_spares_recent_operations(tmp_path):
+    root = tmp_path / 'root'
+    quarantine = Quarantine(str(tmp_path / 'quarantine_journal.jsonl'))
+    big = stage_all(quarantine, root, make_files(root, 'big1.mp3', 'big2.mp3', 'big3.mp3'))
+    # A single operation larger than the limit stays restorable
+    assert quarantine.expired(max_age_days=None, max_bytes=10) == []
+
+    recent = stage_all(quarantine, root, make_files(root, 'recent.mp3'))
+    newest = stage_all(quarantine, root, make_files(root, 'newest.mp3'))
+    quarantine.operations[big]['time'] -= 3 * 86400
+    quarantine.operations[recent]['time'] -= SIZE_GRACE_SECONDS - 60
+    assert quarantine.expired(max_age_days=None, max_bytes=10) == [big]
+    later = quarantine.operations[newest]['time'] + SIZE_GRACE_SECONDS
+    assert quarantine.expired(max_age_days=None, max_bytes=10, now=later) == [big, recent]
+
+
+def test_purge_deletes_for_good(tmp_path):
+    root = tmp_path / 'root'
+    quarantine = Quarantine(str(tmp_path / 'quarantine_journal.jsonl'))
+    undo_id = stage_all(quarantine, root, make_files(root, 'a.mp3', 'b.mp3'))
+
+    assert quarantine.purge(undo_id) == (2, 20)
+    assert not os.path.exists(root / QUARANTINE_DIR)
+    assert os.listdir(root) == []
+    reopened = Quarantine(str(tmp_path / 'quarantine_journal.jsonl'))
+    reopened.load()
+    assert reopened.list_operations() == []
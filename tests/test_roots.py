@@ -0,0 +1,60 @@
+import os
+
+import pytest
+
+from characterlive_patch.roots import DEFAULT_SEARCH_ROOTS, RootRules, resolve_search_roots
+
+
+def test_exclude_prunes_directories_and_files():
+    rules = RootRules(exclude=['logs', 'dataset*', '*.tmp'])
+    files, subdirs, skipped = rules.apply('.', ['a.wav', 'b.tmp'], ['logs', 'dataset_raw', 'raw'])
+    assert files == ['a.wav']
+    assert subdirs == ['raw']
+    assert skipped == 2
+
+
+def test_globs_with_a_slash_match_the_relative_path():
+    rules = RootRules(exclude=['raw/old'])
+    assert rules.apply('.', [], ['old'])[1] == ['old']
+    assert rules.apply('raw', [], ['old', 'new'])[1] == ['new']
+    assert rules.apply(os.path.join('raw', 'x'), [], ['old'])[1] == ['old']
+
+
+def test_include_keeps_only_matching_files():
+    rules = RootRules(include=['*.mp3', '*.lrc'])
+    files, subdirs, skipped = rules.apply('.', ['a.mp3', 'a.lrc', 'cover.jpg'], ['sub'])
+    assert files == ['a.mp3', 'a.lrc']
+    assert subdirs == ['sub']
+    assert skipped == 0
+
+
+def test_max_depth_stops_listing_subdirectories():
+    rules = RootRules(max_depth=1)
+    assert rules.apply('.', [], ['a', 'b'])[1:] == (['a', 'b'], 0)
+    assert rules.apply('a', ['f.mp3'], ['deeper']) == (['f.mp3'], [], 1)
+
+
+def test_default_roots_resolve_against_project_paths():
+    roots = resolve_search_roots(DEFAULT_SEARCH_ROOTS, {'characterlive_path': '/cl', 'singsong_path': '/ss', 'sovits_path': None})
+    assert [(name, path) for name, path, rules in roots] == [
+        ('characterLive/songs', os.path.join('/cl', 'songs')),
+        ('singsong/songs', os.path.join('/ss', 'songs')),
+        ('singsong/output', os.path.join('/ss', 'output')),
+    ]
+
+
+def test_absolute_roots_and_names():
+    [(name, path, rules)] = resolve_search_roots([{'path': '/music', 'include': ['*.mp3'], 'max_depth': 2}], {})
+    assert (name, path, rules.include, rules.max_depth) == ('/music', '/music', ['*.mp3'], 2)
+
+
+@pytest.mark.parametrize('entry', [
+    {'name': 'no path'},
+    {'path': 'x', 'project': 'unknown'},
+    {'path': 'x', 'max_depth': -1},
+    {'path': 'x', 'max_depth': 'deep'},
+    'songs',
+])
+def test_malformed_entries_raise(entry):
+    with pytest.raises(ValueError):
+        resolve_search_roots([entry], {'characterlive_path': '/cl'})
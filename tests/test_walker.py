@@ -0,0 +1,103 @@
+import os
+import threading
+
+import pytest
+
+from characterlive_patch.quarantine import QUARANTINE_DIR
+from characterlive_patch.walker import ParallelWalker, default_lister, list_dir
+
+
+def make_tree(root, names):
+    for name in names:
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'x')
+
+
+def os_walk(root):
+    return sorted(
+        (os.path.relpath(dir_path, root), sorted(files))
+        for dir_path, subdirs, files in os.walk(root)
+    )
+
+
+def walked(root_paths, workers=4, lister=default_lister):
+    return sorted(
+        (rel_dir, sorted(listing[0]))
+        for root_path, rel_dir, listing in ParallelWalker(workers).walk(root_paths, lister)
+    )
+
+
+def test_walk_matches_os_walk(tmp_path):
+    make_tree(tmp_path, ['a.mp3', 'x/b.mp3', 'x/y/z/c.wav', 'w/d.lrc', 'w/v/u/t/s/e.mp3'])
+    (tmp_path / 'empty').mkdir()
+    for workers in (1, 4, 16):
+        assert walked([str(tmp_path)], workers) == os_walk(tmp_path)
+
+
+def test_several_roots_and_none(tmp_path):
+    make_tree(tmp_path, ['one/a.mp3', 'one/sub/b.mp3', 'two/c.mp3'])
+    results = list(ParallelWalker(2).walk([str(tmp_path / 'one'), str(tmp_path / 'two')]))
+    assert sorted((os.path.basename(root), rel_dir) for root, rel_dir, listing in results) == [
+        ('one', '.'), ('one', 'sub'), ('two', '.'),
+    ]
+    assert list(ParallelWalker(2).walk([])) == []
+
+
+def test_symlinked_directories_are_not_followed(tmp_path):
+    make_tree(tmp_path, ['real/a.mp3'])
+    os.symlink(tmp_path / 'real', tmp_path / 'link', target_is_directory=True)
+    files, subdirs, mtime = list_dir(str(tmp_path))
+    assert (files, subdirs) == ([], ['real'])
+    assert [rel_dir for rel_dir, files in walked([str(tmp_path)])] == ['.', 'real']
+
+
+def test_unreadable_directories_are_skipped(tmp_path):
+    make_tree(tmp_path, ['a.mp3', 'locked/b.mp3', 'locked/deeper/c.mp3', 'open/d.mp3'])
+
+    def lister(root_path, rel_dir):
+        if rel_dir == 'locked':
+            raise PermissionError(rel_dir)
+        return default_lister(root_path, rel_dir)
+    assert walked([str(tmp_path)], lister=lister) == [('.', ['a.mp3']), ('open', ['d.mp3'])]
+    assert walked([str(tmp_path / 'missing')]) == []
+
+
+def test_excluded_folders_are_never_listed_at_any_depth(tmp_path):
+    make_tree(tmp_path, ['a.mp3', 'x/logs/a.log', 'x/y/logs/deep/b.log', 'x/y/c.mp3'])
+    listed = []
+
+    def lister(root_path, rel_dir):
+        listed.append(rel_dir)
+        files, subdirs, mtime = default_lister(root_path, rel_dir)
+        return files, [subdir for subdir in subdirs if subdir != 'logs'], mtime
+    assert walked([str(tmp_path)], lister=lister) == [('.', ['a.mp3']), ('x', []), (os.path.join('x', 'y'), ['c.mp3'])]
+    assert not any('logs' in rel_dir for rel_dir in listed)
+
+
+def test_lister_errors_other_than_oserror_are_raised(tmp_path):
+    make_tree(tmp_path, ['x/a.mp3'])
+
+    def lister(root_path, rel_dir):
+        if rel_dir == 'x':
+            raise ValueError("broken")
+        return default_lister(root_path, rel_dir)
+    with pytest.raises(ValueError):
+        list(ParallelWalker(2).walk([str(tmp_path)], lister))
+
+
+def test_closing_the_walk_early_stops_the_workers(tmp_path):
+    make_tree(tmp_path, [f'd{i}/e{j}/f.mp3' for i in range(20) for j in range(20)])
+    before = threading.active_count()
+    walk = ParallelWalker(4).walk([str(tmp_path)])
+    next(walk)
+    walk.close()
+    assert threading.active_count() <= before
+
+
+def test_quarantine_folders_are_not_walked_at_any_depth(tmp_path):
+    make_tree(tmp_path, [
+        'a.mp3', f'{QUARANTINE_DIR}/id/a.mp3',
+        'songs/download/b.mp3', f'songs/download/{QUARANTINE_DIR}/id/b.mp3',
+    ])
+    assert [rel_dir for rel_dir, files in walked([str(tmp_path)])] == ['.', 'songs', os.path.join('songs', 'download')]
@@ -0,0 +1,101 @@
+import os
+import queue
+import shutil
+import threading
+import time
+
+from characterlive_patch.watcher import FolderWatcher, PollingSource
+
+
+DEBOUNCE = 0.1
+POLL = 0.02
+
+
+def polling_watcher(folder, **kwargs):
+    batches = queue.Queue()
+    watcher = FolderWatcher(str(folder), batches.put, debounce=DEBOUNCE, poll_interval=POLL, **kwargs)
+    watcher.open_source = lambda: PollingSource(watcher.folder, watcher.stop_event, watcher.poll_interval)
+    watcher.start()
+    return watcher, batches
+
+
+def no_batch(batches, wait=DEBOUNCE * 5):
+    try:
+        batch = batches.get(timeout=wait)
+    except queue.Empty:
+        return True
+    raise AssertionError(f"unexpected batch {batch}")
+
+
+def test_polling_source_reports_new_and_changed_files(tmp_path):
+    (tmp_path / 'old.mp3').write_bytes(b'x')
+    source = PollingSource(str(tmp_path), threading.Event(), poll_interval=0)
+    assert source.wait(0) == set()
+    (tmp_path / 'new.mp3').write_bytes(b'x')
+    (tmp_path / 'sub').mkdir()
+    assert source.wait(0) == {'new.mp3'}
+    assert source.wait(0) == set()
+    (tmp_path / 'old.mp3').write_bytes(b'xx')
+    (tmp_path / 'other.lrc').write_bytes(b'x')
+    assert source.wait(0) == {'old.mp3', 'other.lrc'}
+
+
+def test_new_files_are_handed_on_once(tmp_path):
+    watcher, batches = polling_watcher(tmp_path)
+    try:
+        assert watcher.backend == 'polling'
+        (tmp_path / 'a.mp3').write_bytes(b'x')
+        (tmp_path / 'a.LRC').write_bytes(b'x')
+        (tmp_path / 'cover.jpg').write_bytes(b'x')
+        (tmp_path / '.a.mp3.clpatch-part').write_bytes(b'x')
+        assert batches.get(timeout=5) == ['a.LRC', 'a.mp3']
+        assert no_batch(batches)
+    finally:
+        watcher.stop(5)
+    assert not watcher.thread.is_alive()
+
+
+def test_growing_files_wait_until_they_stop_changing(tmp_path):
+    watcher, batches = polling_watcher(tmp_path)
+    try:
+        path = tmp_path / 'download.mp3'
+        with open(path, 'wb') as f:
+            for _ in range(8):
+                f.write(b'x' * 1000)
+                f.flush()
+                time.sleep(DEBOUNCE / 2)
+        finished = time.monotonic()
+        assert batches.get(timeout=5) == ['download.mp3']
+        assert time.monotonic() - finished >= DEBOUNCE
+        assert os.path.getsize(path) == 8000
+    finally:
+        watcher.stop(5)
+
+
+def test_ignored_files_are_not_handed_on_unless_they_change(tmp_path):
+    watcher, batches = polling_watcher(tmp_path)
+    try:
+        (tmp_path / 'renamed.mp3').write_bytes(b'x')
+        watcher.ignore(str(tmp_path / 'renamed.mp3'))
+        # Files outside the watched folder are not recorded
+        watcher.ignore(str(tmp_path.parent / 'elsewhere.mp3'))
+        assert no_batch(batches)
+        assert watcher.ignored == {}
+
+        (tmp_path / 'again.mp3').write_bytes(b'x')
+        watcher.ignore(str(tmp_path / 'again.mp3'))
+        (tmp_path / 'again.mp3').write_bytes(b'changed')
+        assert batches.get(timeout=5) == ['again.mp3']
+    finally:
+        watcher.stop(5)
+
+
+def test_errors_stop_the_watcher_and_are_reported(tmp_path):
+    folder = tmp_path / 'watched'
+    folder.mkdir()
+    errors = queue.Queue()
+    watcher, batches = polling_watcher(folder, on_error=errors.put)
+    shutil.rmtree(folder)
+    assert isinstance(errors.get(timeout=5), OSError)
+    watcher.thread.join(5)
+    assert not watcher.thread.is_alive()